@@ -1,22 +1,47 @@
 import os
 import shutil
+import signal
 import subprocess
 from datetime import datetime
 import constants as C
 import psutil
+from sampler_engine import InProcessSampler
+from rollup import RollupEngine, rollup_file
+from run_store import RunStore
 
 class MonitorManager:
-    def __init__(self):
+    def __init__(self, publish=None):
         self.process = None
+        # publish(msg_type, row) 回调，inprocess 模式下样本直接交给它 (通常是广播器)
+        self.sampler = InProcessSampler(publish) if publish else None
+        self.rollups = None          # 当前 inprocess 运行的 RollupEngine，可供查询
         self.is_running = False
         self.backup_dir = "backups"  # Folder to store old logs
         self.max_backups = 5         # Keep only the last 5 sets of logs
+        self.run_store = RunStore(self.backup_dir)   # 运行摘要索引，备份被删后仍可做基线对比
         self.current_config = {
             "exe": C.DEFAULT_EXE,
             "interval": C.DEFAULT_INTERVAL,
-            "limit": C.DEFAULT_TREND_LIMIT
+            "limit": C.DEFAULT_TREND_LIMIT,
+            "mode": C.DEFAULT_MONITOR_MODE,
+            "persist": C.DEFAULT_PERSIST_CSV,
+            "fast_proc": C.DEFAULT_FAST_PROC,
+            "rollup": C.DEFAULT_ROLLUP,
+            "tree": C.DEFAULT_TREE_MODE,
+            "memory_detail": C.DEFAULT_MEMORY_DETAIL
         }
 
+    @property
+    def in_process(self):
+        return self.current_config["mode"] == "inprocess" and self.sampler is not None
+
+    @staticmethod
+    def run_files():
+        """All files one monitoring run produces in the working directory."""
+        return ([C.DEFAULT_RAW_FILE, C.DEFAULT_TREND_FILE, C.LAUNCH_INFO_FILE, C.DEFAULT_TREE_FILE,
+                 C.DEFAULT_MEMORY_REGION_FILE]
+                + [rollup_file(r) for r in C.ROLLUP_RESOLUTIONS])
+
     def backup_and_clean(self):
         """Backs up old CSV files to a subfolder and keeps only the most recent ones."""
         if not os.path.exists(self.backup_dir):
@@ -25,28 +50,45 @@ class MonitorManager:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # 1. Move current files to backup folder
-        for file in [C.DEFAULT_RAW_FILE, C.DEFAULT_TREND_FILE]:
+        moved = {}
+        for file in self.run_files():
             if os.path.exists(file):
                 backup_name = os.path.join(self.backup_dir, f"backup_{timestamp}_{file}")
                 try:
                     shutil.move(file, backup_name) # Move instead of copy+remove
+                    moved[file] = backup_name
                     print(f"DEBUG: Moved {file} to {backup_name}")
                 except Exception as e:
                     print(f"DEBUG: Backup error: {e}")
 
-        # 2. Cleanup old backups (Keep only the latest N)
+        # 2. Register the archived run (summary + compact rollup) in the run index
+        if C.DEFAULT_TREND_FILE in moved:
+            try:
+                entry = self.run_store.register(moved[C.DEFAULT_TREND_FILE], exe=self.current_config["exe"],
+                                                files=list(moved.values()))
+                if entry:
+                    print(f"DEBUG: Indexed run {entry['id']} (passed={entry['passed']})")
+            except Exception as e:
+                print(f"DEBUG: Run index error: {e}")
+
+        # 3. Cleanup old backups (Keep only the latest N sets)
         try:
-            # List all files in backup dir sorted by creation time
-            all_backups = sorted(
-                [os.path.join(self.backup_dir, f) for f in os.listdir(self.backup_dir)],
-                key=os.path.getctime
-            )
-            
-            # If we have more than (max_backups * 2 files), delete the oldest ones
-            while len(all_backups) > (self.max_backups * 2):
-                oldest_file = all_backups.pop(0)
-                os.remove(oldest_file)
-                print(f"DEBUG: Deleted old backup: {oldest_file}")
+            # Group files by their "backup_YYYYmmdd_HHMMSS" prefix — one group per run
+            prefix_len = len(f"backup_{timestamp}")
+            sets = {}
+            for f in os.listdir(self.backup_dir):
+                if f.startswith("backup_"):
+                    sets.setdefault(f[:prefix_len], []).append(os.path.join(self.backup_dir, f))
+
+            # If we have more than max_backups sets, delete the oldest ones
+            deleted = []
+            for key in sorted(sets)[:-self.max_backups]:
+                for oldest_file in sets[key]:
+                    os.remove(oldest_file)
+                    deleted.append(oldest_file)
+                    print(f"DEBUG: Deleted old backup: {oldest_file}")
+            if deleted:
+                self.run_store.forget_files(deleted)
         except Exception as e:
             print(f"DEBUG: Cleanup error: {e}")
 
@@ -56,7 +98,28 @@ class MonitorManager:
             return False, "Monitor is already running."
         
         self.backup_and_clean()
-        
+
+        if self.in_process:
+            persist = self.current_config["persist"]
+            self.rollups = RollupEngine()
+            if persist and self.current_config["rollup"]:
+                self.rollups.add_csv_sinks(threaded=True)
+            self.sampler.start(
+                exe_name=self.current_config["exe"],
+                interval_sec=self.current_config["interval"],
+                trend_limit=self.current_config["limit"],
+                raw_csv=C.DEFAULT_RAW_FILE if persist else None,
+                trend_csv=C.DEFAULT_TREND_FILE if persist else None,
+                fast_proc=self.current_config["fast_proc"],
+                rollups=self.rollups,
+                tree=self.current_config["tree"],
+                tree_csv=C.DEFAULT_TREE_FILE if persist else None,
+                memory_detail=self.current_config["memory_detail"],
+                memory_regions_csv=C.DEFAULT_MEMORY_REGION_FILE if persist else None,
+            )
+            self.is_running = True
+            return True, "Monitor started (in-process sampler)"
+
         cmd = [
             "python", "run_monitor.py",
             "--exe", self.current_config["exe"],
@@ -65,9 +128,18 @@ class MonitorManager:
             "--raw", C.DEFAULT_RAW_FILE,
             "--trend", C.DEFAULT_TREND_FILE
         ]
+        if self.current_config["fast_proc"]:
+            cmd.append("--fast_proc")
+        if self.current_config["rollup"]:
+            cmd.append("--rollup")
+        if self.current_config["tree"]:
+            cmd += ["--tree", "--tree_csv", C.DEFAULT_TREE_FILE]
+        if self.current_config["memory_detail"]:
+            cmd += ["--memory_detail", "--memory_regions", C.DEFAULT_MEMORY_REGION_FILE]
         
         try:
             if os.name == 'nt':
+                cmd += ["--stop_file", C.MONITOR_STOP_FILE]
                 self.process = subprocess.Popen(cmd, creationflags=subprocess.CREATE_NEW_CONSOLE)
             else:
                 self.process = subprocess.Popen(cmd, start_new_session=True)
@@ -78,21 +150,57 @@ class MonitorManager:
 
     def stop(self):
         """停止监控进程"""
-        if not self.is_running or not self.process:
+        if not self.is_running:
             return False, "Monitor is not running."
-        
+
+        if self.in_process:
+            # 采样线程可能已经自己结束 (如目标全部退出)；仍然回收线程并清除运行状态，否则 start() 永远被拒绝
+            alive = self.sampler.is_alive
+            self.sampler.stop()
+            self.is_running = False
+            return True, "Stopped successfully." if alive else "Sampler had already stopped."
+
+        if not self.process:
+            self.is_running = False
+            return False, "Monitor is not running."
+
         try:
-            # 强制杀死进程树
+            # 结束监控启动的进程，再让监控自己退出
             parent = psutil.Process(self.process.pid)
             for child in parent.children(recursive=True):
                 child.terminate()
-            parent.terminate()
-            
+            if os.name == 'nt':
+                # terminate() 在 Windows 上是 TerminateProcess，finally 不会执行：改用停止文件
+                open(C.MONITOR_STOP_FILE, 'w').close()
+            else:
+                parent.terminate()
+            # 等待子进程把缓冲的 CSV 行写完再返回，超时才强制结束
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            finally:
+                if os.path.exists(C.MONITOR_STOP_FILE):
+                    os.remove(C.MONITOR_STOP_FILE)
+
             self.is_running = False
             return True, "Stopped successfully."
         except Exception as e:
             return False, f"Stop error: {str(e)}"
 
+    def notify_started(self, pids):
+        """
+        启动器钩子：目标进程刚被启动时调用。inprocess 模式共享同一个进程表
+        (启动器已 announce)；子进程模式下发 SIGUSR1，让 run_monitor 立即刷新进程表。
+        """
+        if not self.is_running or self.in_process or not self.process or not hasattr(signal, "SIGUSR1"):
+            return
+        try:
+            os.kill(self.process.pid, signal.SIGUSR1)
+            print(f"DEBUG: Notified monitor of started PIDs {pids}")
+        except OSError as e:
+            print(f"DEBUG: Notify error: {e}")
+
     def configure(self, new_config):
         """更新配置"""
         if self.is_running:
@@ -1,7 +1,18 @@
+import asyncio
 import subprocess
 import os
 import sys
+import time
+from collections import deque
 import psutil
+import build_cache
+import constants as C
+from csv_sink import CsvSink
+from process_cache import get_table
+from timestamps import format_timestamp
+
+BUILD_ERROR_LINES = 20   # 构建失败时在消息里附带的最后几行输出
+GEN_SCRIPT = os.path.join("utilLocal", "GenerateStrategy", "generate_code.py")
 
 class TradingManager:
     def __init__(self, project_root="../.."):
@@ -17,65 +28,221 @@ class TradingManager:
             self.exe_name = "trading_system"
         self.exe_path = os.path.join(self.project_root, "output", self.exe_name)
         self.market_script = os.path.join(self.project_root, "src", "MarketFetch.py")
+        # 交易系统运行时的全部进程，可直接作为监控目标 (",".join(...) 传给 --exe)
+        self.monitor_targets = [self.exe_name, os.path.basename(self.market_script)]
+        self.procs = []              # start_processes 最近启动的进程 (Popen)
+        self.pids = []
+        # 每次构建各阶段的耗时
+        self.metrics = CsvSink(C.BUILD_METRICS_FILE, C.BUILD_METRICS_COLUMNS)
 
-    def update_and_build(self):
-        """通用构建函数：支持 Windows 路径注入和 Linux 标准环境"""
-        try:
-            # 1. 获取当前环境变量副本
-            my_env = os.environ.copy()
-            
-            # --- 关键：仅在 Windows (nt) 下注入 MinGW 路径 ---
-            if os.name == 'nt': 
-                # 这里填入你电脑上真实的 MinGW bin 目录
-                mingw_path = r"C:\ProgramData\mingw64\mingw64\bin" 
-                if mingw_path not in my_env["PATH"]:
-                    my_env["PATH"] = mingw_path + os.pathsep + my_env["PATH"]
-            # ----------------------------------------------
-
-            # 2. Git Pull (带上环境变量)
+    def build_env(self):
+        """获取当前环境变量副本；仅在 Windows (nt) 下注入 MinGW 路径"""
+        my_env = os.environ.copy()
+        if os.name == 'nt':
+            # 这里填入你电脑上真实的 MinGW bin 目录
+            mingw_path = r"C:\ProgramData\mingw64\mingw64\bin"
+            if mingw_path not in my_env["PATH"]:
+                my_env["PATH"] = mingw_path + os.pathsep + my_env["PATH"]
+        return my_env
+
+    def update_steps(self):
+        """{stage: (command, failure label)} before code generation; failure label None = result ignored"""
+        return {
             # 1. 先清理本地改动
-            subprocess.run(["git", "checkout", "--", "."], cwd=self.project_root, env=my_env)
-            subprocess.run(["git", "submodule", "foreach", "--recursive", "git", "checkout", "--", "."], 
-                           cwd=self.project_root, env=my_env)
+            "git checkout":     (["git", "checkout", "--", "."], None),
+            "submodule reset":  (["git", "submodule", "foreach", "--recursive", "git", "checkout", "--", "."], None),
+            # 2. 再 pull 主仓库 (先 fetch，上游有新提交才 pull)
+            "git fetch":        (["git", "fetch"], "GIT FAILED"),
+            "git pull":         (["git", "pull"], "GIT FAILED"),
+            # 3. pull 之后再更新子模块
+            "submodule update": (["git", "submodule", "update", "--init", "--recursive"], "SUBMODULE FAILED"),
+            "submodule sync":   (["git", "submodule", "update"], "GIT FAILED"),
+        }
 
-            # 2. 再 pull 主仓库
-            res_git = subprocess.run(["git", "pull"], cwd=self.project_root, 
-                                     capture_output=True, text=True, env=my_env)
-            if res_git.returncode != 0:
-                return False, f"GIT FAILED: {res_git.stderr}"
+    def generate_cmd(self):
+        return [self.python_exe, GEN_SCRIPT]
 
-            # 3. pull 之后再更新子模块
-            res_sub = subprocess.run(["git", "submodule", "update", "--init", "--recursive"], 
-                                     cwd=self.project_root, capture_output=True, text=True, env=my_env)
-            if res_sub.returncode != 0:
-                return False, f"SUBMODULE FAILED: {res_sub.stderr}"
-            if res_git.returncode != 0:
-                return False, f"GIT FAILED: {res_git.stderr}"
-                
-            res_git = subprocess.run(["git", "submodule", "update"], cwd=self.project_root, 
-                                     capture_output=True, text=True, env=my_env)
-            if res_git.returncode != 0:
-                return False, f"GIT FAILED: {res_git.stderr}"
-
-            # 3. Generate Code
-            gen_script = os.path.join("utilLocal", "GenerateStrategy", "generate_code.py")
-            res_gen = subprocess.run([self.python_exe, gen_script], cwd=self.project_root, 
-                                     capture_output=True, text=True, env=my_env)
-            if res_gen.returncode != 0:
-                return False, f"CODE GEN FAILED: {res_gen.stderr}"
-
-            # 4. Make All
-            # 在 Windows 下建议先 clean，防止旧的 .o 文件干扰链接 [cite: 8, 9]
-            subprocess.run(["make", "clean"], cwd=self.project_root, env=my_env)
-            
-            res_make = subprocess.run(["make", "all"], cwd=self.project_root, 
-                                      capture_output=True, text=True, env=my_env)
-            if res_make.returncode != 0:
-                return False, f"MAKE FAILED: {res_make.stderr}"
-            
-            return True, "BUILD SUCCESSFUL: System is up to date."
+    async def _capture(self, cmd, env):
+        """(returncode, 完整输出)；命令不存在时返回 (-1, "")"""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, cwd=self.project_root, env=env,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+            out, _ = await proc.communicate()
+            return proc.returncode, out.decode(errors='replace')
+        except OSError:
+            return -1, ""
+
+    async def rev_parse(self, ref, env):
+        """提交 SHA；ref 不存在 (如没有上游分支) 时返回 None"""
+        code, out = await self._capture(["git", "rev-parse", ref], env)
+        return out.strip() if code == 0 else None
+
+    async def toolchain_fingerprint(self, env):
+        """make / 编译器版本 + Makefile 内容的哈希；变化时需要 make clean"""
+        makefile = os.path.join(self.project_root, "Makefile")
+        parts = [(await self._capture(["make", "--version"], env))[1],
+                 (await self._capture([env.get("CXX", "g++"), "--version"], env))[1],
+                 await asyncio.to_thread(build_cache.sha1_file, makefile) if os.path.exists(makefile) else ""]
+        return build_cache.digest(parts)
+
+    async def update_and_build_async(self, log=None, full=False):
+        """
+        同一条构建流水线，以 asyncio 子进程运行，不阻塞事件循环。
+        log: 可选的 async 回调，逐行接收各阶段的 stdout/stderr 以及阶段耗时。
+        full: True 时强制重新生成代码并 make clean 全量重建；否则只有工具链或生成代码变化时才 clean。
+        输入未变的阶段 (没有本地改动 / 已是上游提交 / 子模块已在记录的提交 / 生成器输入未变) 会被跳过。
+        返回 (success, message)，message 列出跳过的阶段，末尾附带每个阶段的耗时；
+        每个阶段的耗时同时追加到 BUILD_METRICS_FILE。
+        """
+        async def emit(text):
+            if log is not None:
+                await log(text)
+
+        build_id = format_timestamp()
+        timings, skipped = [], []
+
+        def record(stage, seconds, returncode, status):
+            timings.append(f"{stage} {'skipped' if status == 'skipped' else f'{seconds:.1f}s'}")
+            self.metrics.write([format_timestamp(), build_id, stage,
+                                round(seconds, 3), returncode, status])
+
+        async def run(stage, cmd, fail_label):
+            """运行一个阶段；失败且有 failure label 时返回失败消息，否则返回 None"""
+            await emit(f"▶ {stage}: {' '.join(cmd)}")
+            started = time.monotonic()
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, cwd=self.project_root, env=my_env,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+            tail = deque(maxlen=BUILD_ERROR_LINES)
+            async for raw in proc.stdout:
+                line = raw.decode(errors='replace').rstrip()
+                tail.append(line)
+                await emit(f"[{stage}] {line}")
+            returncode = await proc.wait()
+            elapsed = time.monotonic() - started
+            record(stage, elapsed, returncode, "ok" if returncode == 0 else "failed")
+            await emit(f"{'✔' if returncode == 0 else '✖'} {stage} ({elapsed:.1f}s, exit {returncode})")
+            if returncode != 0 and fail_label:
+                return f"{fail_label}: " + "\n".join(tail) + f" [{', '.join(timings)}]"
+            return None
+
+        async def skip(stage, reason):
+            skipped.append(stage)
+            record(stage, 0.0, "", "skipped")
+            await emit(f"⏭ {stage} skipped ({reason})")
+
+        my_env = self.build_env()
+        make_args = []
+        if C.BUILD_USE_CCACHE:
+            my_env, make_args, wrapper = build_cache.use_ccache(my_env)
+            if wrapper:
+                await emit(f"using {wrapper}")
+        state = build_cache.BuildState(C.BUILD_STATE_FILE)
+        try:
+            steps = self.update_steps()
+            # 1. 只有存在本地改动时才清理。子模块的改动要在子模块里查：
+            #    主仓库的 git status 看不到设置了 ignore= 的子模块里的改动
+            checks = {
+                "git checkout":    ["git", "status", "--porcelain", "--untracked-files=no"],
+                "submodule reset": ["git", "submodule", "--quiet", "foreach", "--recursive",
+                                    "git", "status", "--porcelain", "--untracked-files=no"],
+            }
+            for stage, check in checks.items():
+                code, dirty = await self._capture(check, my_env)
+                if code == 0 and not dirty.strip():
+                    await skip(stage, "no local changes")
+                    continue
+                failed = await run(stage, *steps[stage])
+                if failed:
+                    return False, failed
+
+            # 2. 已经是上游的提交时不 pull (BUILD_FETCH 关闭时不访问网络，和上次 fetch 到的上游比较)
+            if C.BUILD_FETCH:
+                failed = await run("git fetch", *steps["git fetch"])
+                if failed:
+                    return False, failed
+            else:
+                await skip("git fetch", "BUILD_FETCH is off")
+            head = await self.rev_parse("HEAD", my_env)
+            upstream = await self.rev_parse("@{u}", my_env)
+            if head and head == upstream:
+                await skip("git pull", f"already at {head[:8]}")
+            else:
+                failed = await run("git pull", *steps["git pull"])
+                if failed:
+                    return False, failed
+                head = await self.rev_parse("HEAD", my_env)
+
+            # 3. 只有子模块未初始化或不在记录的提交上时才更新
+            code, status = await self._capture(["git", "submodule", "status", "--recursive"], my_env)
+            subs = build_cache.parse_submodules(status)
+            if code == 0 and all(flag == " " for flag, _ in subs.values()):
+                for stage in ("submodule update", "submodule sync"):
+                    await skip(stage, "submodules at recorded commits")
+            else:
+                for stage in ("submodule update", "submodule sync"):
+                    failed = await run(stage, *steps[stage])
+                    if failed:
+                        return False, failed
+                code, status = await self._capture(["git", "submodule", "status", "--recursive"], my_env)
+                subs = build_cache.parse_submodules(status)
+            submodules = {path: sha for path, (_, sha) in subs.items()}
+
+            # 4. Generate Code — 输入 (提交 SHA + 生成器目录) 未变且输出完好时跳过；
+            #    重新生成时内容未变的文件保留旧 mtime。
+            #    只跟踪生成器的输出目录 (不含本工具的工作目录)；遍历和哈希放到线程里，不阻塞事件循环
+            gen_dirs, exclude = C.BUILD_GENERATED_DIRS, [os.getcwd()]
+            gen_digest = await asyncio.to_thread(build_cache.tree_digest, self.project_root, os.path.dirname(GEN_SCRIPT))
+            inputs = build_cache.digest([head or ""] + [f"{p}={sha}" for p, sha in sorted(submodules.items())]
+                                        + [gen_digest])
+            if (head and not full and inputs == state.data.get("generator_inputs")
+                    and await asyncio.to_thread(state.generated_intact, self.project_root, gen_dirs)):
+                generated_changed = False
+                await skip("generate code", "inputs unchanged")
+            else:
+                before = await asyncio.to_thread(build_cache.snapshot, self.project_root, gen_dirs, exclude)
+                failed = await run("generate code", self.generate_cmd(), "CODE GEN FAILED")
+                if failed:
+                    return False, failed
+                generated_changed, written, unchanged = await asyncio.to_thread(
+                    state.track_generated, self.project_root, gen_dirs, before, exclude)
+                await emit(f"generate code wrote {written} files, {unchanged} unchanged")
+
+            # 5. 只有工具链或生成代码变化时才 make clean，防止旧的 .o 文件干扰链接
+            toolchain = await self.toolchain_fingerprint(my_env)
+            if full or not C.DEFAULT_INCREMENTAL_BUILD:
+                reason = "full rebuild requested"
+            elif "toolchain" not in state.data:
+                reason = "no previous build"
+            elif state.data["toolchain"] != toolchain:
+                reason = "toolchain changed"
+            elif generated_changed:
+                reason = "generated code changed"
+            else:
+                reason = None
+            if reason:
+                await emit(f"make clean: {reason}")
+                await run("make clean", ["make", "clean"], None)
+            else:
+                await skip("make clean", "toolchain and generated code unchanged")
+
+            failed = await run("make all", ["make", "all", f"-j{build_cache.make_jobs()}"] + make_args, "MAKE FAILED")
+            if failed:
+                return False, failed
+
+            state.data.update(head=head, submodules=submodules, generator_inputs=inputs, toolchain=toolchain)
+            state.save()
+            note = f" Skipped: {', '.join(skipped)}." if skipped else ""
+            return True, f"BUILD SUCCESSFUL: System is up to date.{note} [{', '.join(timings)}]"
         except Exception as e:
             return False, f"SYSTEM ERROR: {str(e)}"
+        finally:
+            self.metrics.close()
+
+    def update_and_build(self, full=False):
+        """通用构建函数：支持 Windows 路径注入和 Linux 标准环境 (同步调用，用于脚本/测试)"""
+        return asyncio.run(self.update_and_build_async(full=full))
 
     def start_processes(self):
         """Start trading and market data processes."""
@@ -83,13 +250,20 @@ class TradingManager:
             # Start core processes
             p_exe = subprocess.Popen([self.exe_path], cwd=self.project_root)
             p_py = subprocess.Popen([self.python_exe, self.market_script], cwd=self.project_root)
+            # 保留 Popen 句柄 (stop_processes 回收退出码)；
+            # 通知进程表：正在等待这些进程的监控立即开始采样，不必等下一次刷新
+            self.procs = [p_exe, p_py]
+            self.pids = [p.pid for p in self.procs]
+            table = get_table()
+            for pid in self.pids:
+                table.announce(pid)
             return True, f"SUCCESS: System started (EXE PID: {p_exe.pid})"
         except Exception as e:
             return False, f"ERROR: Failed to start processes: {str(e)}"
 
     def stop_processes(self):
-        """Clean up all related processes."""
-        targets = [self.exe_name, "MarketFetch.py"]
+        """Clean up all related processes. Blocks while reaping (server_main runs it in a thread)."""
+        targets = self.monitor_targets
         count = 0
         for proc in psutil.process_iter(['name', 'cmdline']):
             try:
@@ -99,4 +273,14 @@ class TradingManager:
                     proc.terminate()
                     count += 1
             except: continue
-        return True, f"STOPPED: Terminated {count} related processes"
\ No newline at end of file
+        # 回收自己启动的进程 (不留僵尸进程)，并报告退出码
+        codes = []
+        for p in self.procs:
+            try:
+                codes.append(p.wait(timeout=5))
+            except subprocess.TimeoutExpired:
+                p.kill()
+                codes.append(p.wait())
+        self.procs = []
+        exits = f" (exit codes: {', '.join(map(str, codes))})" if codes else ""
+        return True, f"STOPPED: Terminated {count} related processes{exits}"
\ No newline at end of file
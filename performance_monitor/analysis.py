@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+analysis.py
+-----------
+NumPy-backed analysis of trend data for check_regression.py.
+
+Trend data is loaded as one array per column (from a trend CSV, a rollup
+CSV or a binary sample store) and every metric is analysed in a single
+vectorized pass: peak, least-squares slope, R² and a 95% confidence
+interval for the slope.
+
+OnlineRegression keeps running sums instead of the data, so the same
+statistics can be updated chunk by chunk (bounded memory) or point by
+point while the monitor is still writing.
+"""
+
+import csv
+from collections import namedtuple
+import numpy as np
+
+# Metric keys used throughout check_regression, in report order
+METRICS = ["ctx_vol", "ctx_invol", "avg_memory", "avg_threads", "avg_handles"]
+
+# Source column per metric for each supported file layout
+_TREND_SOURCE  = {"ctx_vol": "avg_ctx_vol", "ctx_invol": "avg_ctx_invol", "avg_memory": "avg_memory",
+                  "avg_threads": "avg_threads", "avg_handles": "avg_handles"}
+_ROLLUP_SOURCE = {"ctx_vol": "ctx_vol_per_sec_mean", "ctx_invol": "ctx_invol_per_sec_mean",
+                  "avg_memory": "memory_mb_mean", "avg_threads": "threads_mean", "avg_handles": "handles_mean"}
+
+MetricStats = namedtuple("MetricStats", ["n", "peak", "slope", "intercept", "r2", "ci_low", "ci_high"])
+
+# Two-sided 95% Student-t critical values by degrees of freedom (1..30); normal beyond
+_T95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def t95(df):
+    if df < 1:
+        return float('inf')
+    return _T95[df - 1] if df <= len(_T95) else 1.96
+
+
+# ── Loading ──────────────────────────────────────────────────────────────────
+def iter_trend_chunks(path, chunk_rows=50000):
+    """
+    Yield dicts of column arrays, chunk_rows rows at a time:
+    {'timestamp': str array, 'name': str array, <metric>: float64 array, ...}
+    """
+    if path.endswith('.bin'):
+        yield _load_bin(path)
+        return
+
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        source = _ROLLUP_SOURCE if "memory_mb_mean" in header else _TREND_SOURCE
+        idx = {m: header.index(c) for m, c in source.items() if c in header}
+        ts_idx   = header.index("timestamp") if "timestamp" in header else None
+        name_idx = header.index("name") if "name" in header else None
+        width    = len(header)
+
+        chunk = []
+        for row in reader:
+            if len(row) < width:
+                continue
+            chunk.append(row[:width])
+            if len(chunk) >= chunk_rows:
+                yield _columns(chunk, idx, ts_idx, name_idx)
+                chunk = []
+        if chunk:
+            yield _columns(chunk, idx, ts_idx, name_idx)
+
+
+def _columns(rows, idx, ts_idx, name_idx):
+    columns = list(zip(*rows))
+    n = len(rows)
+    cols = {
+        "timestamp": np.array(columns[ts_idx], dtype=str) if ts_idx is not None else np.full(n, ""),
+        "name":      np.array(columns[name_idx], dtype=str) if name_idx is not None else np.full(n, ""),
+    }
+    valid = np.ones(n, dtype=bool)
+    for m in METRICS:
+        if m not in idx:
+            cols[m] = np.zeros(n)
+            continue
+        try:
+            cols[m] = np.array(columns[idx[m]], dtype=np.float64)
+        except ValueError:
+            cols[m] = np.array([_to_float(v) for v in columns[idx[m]]])
+            valid &= ~np.isnan(cols[m])
+    if not valid.all():
+        # Skip malformed rows, as the old DictReader loader did
+        cols = {k: v[valid] for k, v in cols.items()}
+    return cols
+
+
+def _to_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def _load_bin(path):
+    import sample_store
+    data  = sample_store.load(path)
+    names = np.array(sample_store.load_names(path) or [""])
+    cols  = {"timestamp": data["timestamp"],
+             "name": names[np.minimum(data["name"], len(names) - 1)] if "name" in data.dtype.names
+                     else np.full(len(data), "")}
+    for m, c in _TREND_SOURCE.items():
+        cols[m] = data[c].astype(np.float64)
+    return cols
+
+
+def load_trend(path):
+    """Load a whole trend file as column arrays."""
+    chunks = list(iter_trend_chunks(path))
+    if not chunks:
+        return {k: np.array([]) for k in ["timestamp", "name"] + METRICS}
+    return {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+
+
+def row_values(row):
+    """Metric values of one trend-CSV row (a dict, e.g. from CsvTailReader), in METRICS order."""
+    return [float(row[_TREND_SOURCE[m]]) for m in METRICS]
+
+
+def split_by_target(cols):
+    """{name: columns} for each monitored process, keeping first-seen order."""
+    names, first = np.unique(cols["name"], return_index=True)
+    order = names[np.argsort(first)]
+    if len(order) <= 1:
+        return {(order[0] if len(order) else ""): cols}
+    return {n: {k: v[cols["name"] == n] for k, v in cols.items()} for n in order}
+
+
+# ── Batch analysis ───────────────────────────────────────────────────────────
+def analyze(cols, metrics=METRICS):
+    """Peak, least-squares slope (per trend point), R² and 95% CI for all metrics at once."""
+    Y = np.vstack([cols[m] for m in metrics]).astype(np.float64)    # shape (metrics, points)
+    n = Y.shape[1]
+    if n == 0:
+        return {m: MetricStats(0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0) for m in metrics}
+
+    x   = np.arange(n, dtype=np.float64)
+    dx  = x - x.mean()
+    sxx = dx @ dx
+    y_mean = Y.mean(axis=1)
+    dY  = Y - y_mean[:, None]
+
+    slope     = (dY @ dx) / sxx if sxx else np.zeros(len(metrics))
+    intercept = y_mean - slope * x.mean()
+    ss_tot    = np.einsum('ij,ij->i', dY, dY)
+    resid     = dY - slope[:, None] * dx
+    ss_res    = np.einsum('ij,ij->i', resid, resid)
+    return _pack(metrics, n, Y.max(axis=1), slope, intercept, ss_res, ss_tot, sxx)
+
+
+def _pack(metrics, n, peak, slope, intercept, ss_res, ss_tot, sxx):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(ss_tot > 0, 1.0 - ss_res / ss_tot, 0.0)
+        se = np.sqrt(np.maximum(ss_res, 0) / (n - 2) / sxx) if n > 2 and sxx else np.full(len(metrics), np.inf)
+    half = t95(n - 2) * se
+    return {m: MetricStats(int(n), float(peak[i]), float(slope[i]), float(intercept[i]), float(r2[i]),
+                           float(slope[i] - half[i]), float(slope[i] + half[i]))
+            for i, m in enumerate(metrics)}
+
+
+def linear_slope(values):
+    """Least-squares slope of a single series. Positive = upward trend."""
+    return analyze({"v": np.asarray(values, dtype=np.float64)}, ["v"])["v"].slope
+
+
+# ── Incremental analysis ─────────────────────────────────────────────────────
+class OnlineRegression:
+    """
+    Running-sum least squares over all metrics at once.
+
+    x is the trend-point index (0, 1, 2, ...), as in analyze(). Memory is
+    O(metrics) no matter how many points are added.
+    """
+
+    def __init__(self, metrics=METRICS):
+        self.metrics = list(metrics)
+        m = len(self.metrics)
+        self.n   = 0
+        self.sx  = 0.0
+        self.sxx = 0.0
+        self.sy  = np.zeros(m)
+        self.syy = np.zeros(m)
+        self.sxy = np.zeros(m)
+        self.peak = np.full(m, -np.inf)
+        self.last = np.zeros(m)
+
+    def update(self, values):
+        """Add one point; values is a sequence in self.metrics order (or a dict)."""
+        if isinstance(values, dict):
+            values = [values[k] for k in self.metrics]
+        y = np.asarray(values, dtype=np.float64)
+        x = float(self.n)
+        self.n   += 1
+        self.sx  += x
+        self.sxx += x * x
+        self.sy  += y
+        self.syy += y * y
+        self.sxy += x * y
+        self.peak = np.maximum(self.peak, y)
+        self.last = y
+
+    def update_many(self, cols):
+        """Add a chunk of points given as column arrays."""
+        Y = np.vstack([cols[m] for m in self.metrics]).astype(np.float64)
+        k = Y.shape[1]
+        if k == 0:
+            return
+        x = np.arange(self.n, self.n + k, dtype=np.float64)
+        self.n   += k
+        self.sx  += x.sum()
+        self.sxx += x @ x
+        self.sy  += Y.sum(axis=1)
+        self.syy += np.einsum('ij,ij->i', Y, Y)
+        self.sxy += Y @ x
+        self.peak = np.maximum(self.peak, Y.max(axis=1))
+        self.last = Y[:, -1]
+
+    def result(self):
+        n = self.n
+        if n == 0:
+            return {m: MetricStats(0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0) for m in self.metrics}
+        ss_xx = self.sxx - self.sx * self.sx / n
+        ss_xy = self.sxy - self.sx * self.sy / n
+        ss_yy = self.syy - self.sy * self.sy / n
+        slope = ss_xy / ss_xx if ss_xx else np.zeros(len(self.metrics))
+        intercept = (self.sy - slope * self.sx) / n
+        ss_res = ss_yy - slope * ss_xy
+        return _pack(self.metrics, n, self.peak, slope, intercept, ss_res, ss_yy, ss_xx)
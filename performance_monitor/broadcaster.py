@@ -0,0 +1,162 @@
+import asyncio
+from collections import deque
+import constants as C
+from downsample import downsample_records
+
+# 单条消息类型 -> 批量帧类型
+BATCH_TYPES = {"realtime": "realtime_batch", "trend_push": "trend_batch"}
+
+
+def to_frames(messages, max_size=C.BATCH_MAX_SIZE):
+    """Group consecutive messages of the same type into batch frames of at most max_size samples."""
+    frames = []
+    for msg in messages:
+        batch_type = BATCH_TYPES.get(msg["type"], msg["type"])
+        last = frames[-1] if frames else None
+        if last and last["type"] == batch_type and len(last["data"]) < max_size:
+            last["data"].append(msg["data"])
+        else:
+            frames.append({"type": batch_type, "data": [msg["data"]]})
+    return frames
+
+
+class Subscriber:
+    """A single client's bounded outbox. When full, the oldest message is dropped."""
+
+    def __init__(self, maxsize=C.SUBSCRIBER_QUEUE_SIZE, replay=None):
+        self.queue = asyncio.Queue(maxsize)
+        self.replay = replay or []   # history snapshot taken at subscribe time
+        self.dropped = 0
+
+    def push(self, msg):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(msg)
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def get_batch(self, max_size=C.BATCH_MAX_SIZE, window=C.BATCH_WINDOW):
+        """Wait for one message, then keep collecting until max_size or the time window is used up."""
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + window
+        while len(batch) < max_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+
+class Broadcaster:
+    """
+    Server-side pub/sub hub.
+
+    Owns one reader per data source and polls each of them once per tick,
+    no matter how many clients are connected. Every parsed row is published
+    once and fanned out to all subscribers' queues. A bounded history per
+    source is kept so that a new subscriber can be brought up to date; a
+    source with replay_points set replays a downsampled copy of it, so the
+    replay stays the same size however long the run is.
+
+    The readers are polled on a worker thread (file I/O never blocks the
+    event loop); the rows are published back on the loop.
+    """
+
+    def __init__(self, poll_interval=C.BROADCAST_POLL_INTERVAL, queue_size=C.SUBSCRIBER_QUEUE_SIZE):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.sources = []        # [(msg_type, reader)]
+        self.history = {}        # msg_type -> deque of rows
+        self.replay_spec = {}    # msg_type -> (replay_points, metrics) for downsampled replays
+        self.subscribers = set()
+        self.polling = True      # False while an in-process sampler publishes directly
+        self._generation = 0     # bumped by reset(): rows read before it are dropped
+        self._rewound = 0        # generation the readers were last rewound for
+        self._task = None
+        self._loop = None
+
+    def add_source(self, msg_type, reader, history_limit, replay_points=None, metrics=None):
+        self.sources.append((msg_type, reader))
+        self.history[msg_type] = deque(maxlen=history_limit)
+        if replay_points:
+            self.replay_spec[msg_type] = (replay_points, metrics or [])
+
+    # ── Subscriptions ────────────────────────────────────────────────────────
+    def subscribe(self):
+        replay = [{"type": t, "data": row}
+                  for t, rows in self.history.items() for row in self.replay_rows(t, rows)]
+        sub = Subscriber(self.queue_size, replay)
+        self.subscribers.add(sub)
+        return sub
+
+    def replay_rows(self, msg_type, rows):
+        if msg_type not in self.replay_spec:
+            return rows
+        points, metrics = self.replay_spec[msg_type]
+        return downsample_records(list(rows), metrics, points, C.DOWNSAMPLE_METHOD)
+
+    def unsubscribe(self, sub):
+        self.subscribers.discard(sub)
+
+    # ── Publishing ───────────────────────────────────────────────────────────
+    def publish(self, msg_type, row):
+        self.history[msg_type].append(row)
+        msg = {"type": msg_type, "data": row}
+        for sub in self.subscribers:
+            sub.push(msg)
+
+    def publish_threadsafe(self, msg_type, row):
+        """publish() from a non-event-loop thread (e.g. the in-process sampler)."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.publish, msg_type, row)
+
+    def read_sources(self, generation=None):
+        """Poll every reader: [(msg_type, rows)]. Blocking file I/O, so run it off the loop."""
+        generation = self._generation if generation is None else generation
+        if self._rewound != generation:
+            self._rewound = generation
+            for _, reader in self.sources:
+                reader.reset()
+        return [(msg_type, reader.poll()) for msg_type, reader in self.sources]
+
+    def poll_once(self):
+        if not self.polling:
+            return
+        self._publish_all(self.read_sources())
+
+    def _publish_all(self, polled):
+        for msg_type, rows in polled:
+            for row in rows:
+                self.publish(msg_type, row)
+
+    def reset(self):
+        """Drop history and rewind readers (on their next read), e.g. when a new monitoring run starts."""
+        self._generation += 1
+        for history in self.history.values():
+            history.clear()
+
+    async def run(self):
+        while True:
+            try:
+                if self.polling:
+                    generation = self._generation
+                    polled = await asyncio.to_thread(self.read_sources, generation)
+                    if generation == self._generation:   # not from the file of a previous run
+                        self._publish_all(polled)
+            except Exception as e:
+                print(f"Broadcaster poll error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self.run())
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+build_cache.py
+--------------
+State kept between builds so TradingManager can skip work that is already done.
+
+  {"head":             commit SHA of the project repo,
+   "submodules":       {path: commit SHA} from `git submodule status --recursive`,
+   "generator_inputs": hash of the SHAs above and the generator's own directory,
+   "toolchain":        hash of `make --version`, the compiler's --version and the Makefile,
+   "generated":        hash over the content of every file the code generator wrote,
+   "files":            {path relative to the project: [sha1, mtime_ns]} of those files}
+
+generate_code.py rewrites its output on every run, which bumps the mtimes
+and makes `make` recompile everything that includes it. track_generated()
+hashes the files the generator touched in its output directories
+(BUILD_GENERATED_DIRS; never the whole project, which on Windows contains
+this tools checkout and its CSVs); a file whose content is the same as last
+time gets its old mtime back, so an incremental make only rebuilds what
+really changed. `make clean` is only needed when the toolchain or the
+generated code changed, and the generator itself only needs to run when
+its inputs changed and its output is still on disk.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import constants as C
+
+SKIP_DIRS = {".git", "output"}   # 不参与快照的目录 (版本库元数据 / 编译产物)
+
+
+def sha1_file(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def digest(parts):
+    """Stable hash over a list of strings."""
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part.encode('utf-8', errors='replace'))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def tree_digest(root, rel_dir):
+    """Hash over the paths and contents of every file under root/rel_dir."""
+    base = os.path.join(root, rel_dir)
+    parts = []
+    for dirpath, dirnames, filenames in os.walk(base):
+        dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+        for name in sorted(filenames):
+            full = os.path.join(dirpath, name)
+            parts.append(f"{os.path.relpath(full, base)}={sha1_file(full)}")
+    return digest(parts)
+
+
+def parse_submodules(text):
+    """
+    `git submodule status --recursive` -> {path: (flag, sha)}.
+    flag " " = at the recorded commit, "-" = not initialized,
+    "+" = different commit checked out, "U" = merge conflicts.
+    """
+    subs = {}
+    for line in text.splitlines():
+        if len(line) > 41:
+            fields = line[1:].split()
+            subs[fields[1]] = (line[0], fields[0])
+    return subs
+
+
+def snapshot(root, dirs, exclude=()):
+    """
+    {path relative to root: (mtime_ns, size)} of every file under root/<dir>
+    for each of dirs; directories in exclude (absolute paths) are skipped.
+    """
+    files = {}
+    exclude = {os.path.normcase(os.path.abspath(d)) for d in exclude}
+    for rel_dir in dirs:
+        _walk(root, os.path.join(root, rel_dir), exclude, files)
+    return files
+
+
+def _walk(root, base, exclude, files):
+    if os.path.normcase(os.path.abspath(base)) in exclude:
+        return
+    for dirpath, dirnames, filenames in os.walk(base):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS
+                       and os.path.normcase(os.path.abspath(os.path.join(dirpath, d))) not in exclude]
+        for name in filenames:
+            full = os.path.join(dirpath, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            files[os.path.relpath(full, root)] = (st.st_mtime_ns, st.st_size)
+
+
+def in_dirs(rel, dirs):
+    """True if the root-relative path rel lies under one of dirs."""
+    rel = os.path.normpath(rel)
+    for d in dirs:
+        d = os.path.normpath(d)
+        if d == os.curdir or rel.startswith(d + os.sep):
+            return True
+    return False
+
+
+def make_jobs():
+    """CPUs this process may run on (affinity / cgroup cpusets in CI containers), not every host CPU."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def use_ccache(env):
+    """
+    (env, extra make arguments, description) with ccache in front of the compiler.
+    The masquerade directory is preferred (works whatever the Makefile calls);
+    otherwise CC/CXX are overridden on the make command line.
+    """
+    for d in C.CCACHE_DIRS:
+        if os.path.isdir(d):
+            env["PATH"] = d + os.pathsep + env["PATH"]
+            return env, [], f"ccache ({d})"
+    exe = shutil.which("ccache", path=env.get("PATH"))
+    if exe:
+        return env, [f"CC={exe} {env.get('CC', 'gcc')}", f"CXX={exe} {env.get('CXX', 'g++')}"], "ccache (CC/CXX)"
+    return env, [], None
+
+
+class BuildState:
+    def __init__(self, path=C.BUILD_STATE_FILE):
+        self.path = path
+        self.data = self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            print(f"DEBUG: Build state unreadable ({e}), next build is a full one")
+            return {}
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.path)
+
+    def generated_intact(self, root, dirs):
+        """True if every file the generator wrote last time in dirs is still on disk, unmodified."""
+        files = {rel: v for rel, v in self.data.get("files", {}).items() if in_dirs(rel, dirs)}
+        if not files:
+            return False
+        for rel, (sha, _) in files.items():
+            full = os.path.join(root, rel)
+            if not os.path.exists(full) or sha1_file(full) != sha:
+                return False
+        return True
+
+    def track_generated(self, root, dirs, before, exclude=()):
+        """
+        Compare dirs with a snapshot() of them taken before the generator ran.
+        Returns (generated code changed, files written, files left untouched).
+        The new hashes are only kept in memory; save() after a successful build.
+        """
+        after = snapshot(root, dirs, exclude)
+        written = [rel for rel, st in after.items() if before.get(rel) != st]
+        # 只保留输出目录里仍然存在的文件 (旧版本的状态可能记录了整个项目里变化的文件；
+        # 生成器不再写的文件被删除后不能让 generated_intact() 一直失败)
+        files = {rel: v for rel, v in self.data.get("files", {}).items() if in_dirs(rel, dirs) and rel in after}
+        unchanged = 0
+        for rel in written:
+            full = os.path.join(root, rel)
+            sha = sha1_file(full)
+            old = files.get(rel)
+            if old and old[0] == sha:
+                os.utime(full, ns=(old[1], old[1]))   # 内容未变: 恢复旧 mtime，make 不会重编
+                unchanged += 1
+            else:
+                files[rel] = [sha, after[rel][0]]
+        generated = digest([f"{rel}={v[0]}" for rel, v in sorted(files.items())])
+        changed = generated != self.data.get("generated")
+        self.data["files"], self.data["generated"] = files, generated
+        return changed, len(written), unchanged
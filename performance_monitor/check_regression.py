@@ -17,11 +17,48 @@ Metrics checked:
   a thread voluntarily yielding (waiting on I/O) is normal behaviour.
   Only involuntary (forced preemption) indicates scheduling pressure.
 
+  When the trend CSV holds several monitored processes (name column),
+  each one is checked on its own; any failing target fails the run.
+
+  The data is analysed as NumPy column arrays (see analysis.py); each slope
+  is reported with its R² and 95% confidence interval. --chunk_rows scores
+  the file in fixed-size chunks with running sums, so memory stays flat on
+  long soak runs.
+
+  Leak detection (see leak_detection.py):
+    --warmup N        ignore the first N trend points of every target
+    --method          slope estimator: ls (least squares, default) or
+                      theil-sen (robust to spikes and outliers)
+    --window W        also fail if any W-point window grows faster than
+                      the slope threshold (catches late-starting leaks)
+  A change point — where a metric started growing — is reported with each
+  trend failure. --json_out writes the full result as JSON.
+
+  Live gate (--live): tails the trend CSV while the monitor is still
+  writing it and scores every new trend point with running sums. The run
+  is aborted (exit 1, --abort_pid terminated) as soon as a breach is
+  confirmed: a limit exceeded, or the slope's 95% CI lower bound above the
+  slope threshold, on --confirm consecutive points. When --abort_pid exits,
+  --timeout expires or Ctrl+C is pressed, the normal end-of-run check runs
+  on the whole file, with --method/--window, --compare, --json_out and
+  --record as without --live (an aborted run writes its JSON too).
+
+  Baseline (--compare): mean and peak of every checked metric are compared
+  with the median of the last --baseline_runs passing runs of the same
+  process in the run index (see run_store.py); more than --tolerance above
+  it fails. --record adds this run and its verdict to the index.
+
 Exit 0 = PASS, Exit 1 = FAIL (blocks merge in CI/CD)
 
 Usage:
   python3 check_regression.py --trend_csv build_result/trend_performance.csv
 
+  # binary trend store (see sample_store.py) works the same way:
+  python3 check_regression.py --trend_csv build_result/trend_performance.bin
+
+  # or pick a rollup resolution that fits the run length (see rollup.py):
+  python3 check_regression.py --trend_csv build_result/rollup_60s.csv
+
   # with custom thresholds:
   python3 check_regression.py --trend_csv build_result/trend_performance.csv \
       --ctx_invol_limit 500  \
@@ -29,12 +66,36 @@ Usage:
       --thread_limit 60      \
       --handle_limit 500     \
       --slope_threshold 0.05
+
+  # skip 30 warm-up points, robust slope, 60-point windows, JSON report:
+  python3 check_regression.py --trend_csv build_result/trend_performance.csv \
+      --warmup 30 --method theil-sen --window 60 --json_out build_result/regression.json
+
+  # live gate next to a running monitor, stop the test app on a confirmed breach:
+  python3 check_regression.py --trend_csv trend_performance.csv --live \
+      --abort_pid 4242 --timeout 3600
+
+  # compare against yesterday's builds instead of hand-tuned limits, then record this run:
+  python3 check_regression.py --trend_csv trend_performance.csv --compare --record \
+      --store backups --baseline_runs 5 --tolerance 0.15
+
+  # very large trend files, bounded memory (no leak detection):
+  python3 check_regression.py --trend_csv build_result/trend_performance.csv --chunk_rows 100000
 """
 
 import argparse
-import csv
+import json
+import math
 import sys
 import os
+import time
+import psutil
+import analysis
+import leak_detection
+import run_store
+import constants as C
+from csv_tail import CsvTailReader
+from analysis import load_trend, split_by_target, iter_trend_chunks, OnlineRegression
 
 # ── Default thresholds ───────────────────────────────────────────────────────
 DEFAULT_CTX_INVOL_LIMIT  = 500    # involuntary ctx switches/sec absolute ceiling
@@ -42,58 +103,61 @@ DEFAULT_MEM_LIMIT        = 200.0  # MB
 DEFAULT_THREAD_LIMIT     = 60
 DEFAULT_HANDLE_LIMIT     = 500
 DEFAULT_SLOPE_THRESHOLD  = 0.05   # per trend-point; lower = stricter
+DEFAULT_WARMUP           = 0      # trend points skipped at the start of each target
+DEFAULT_WINDOW           = 0      # rolling-slope window in trend points (0 = off)
+DEFAULT_CONFIRM          = 3      # live: consecutive breaching points before aborting
+LIVE_MIN_POINTS          = 10     # live: points needed before a slope can be confirmed
+LIVE_POLL_INTERVAL       = 0.5    # seconds
 
 
-def load_trend_csv(path):
-    rows = []
-    with open(path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                rows.append({
-                    'timestamp':   row.get('timestamp', ''),
-                    'ctx_vol':     float(row.get('avg_ctx_vol',   0)),
-                    'ctx_invol':   float(row.get('avg_ctx_invol', 0)),
-                    'avg_memory':  float(row.get('avg_memory',    0)),
-                    'avg_threads': float(row.get('avg_threads',   0)),
-                    'avg_handles': float(row.get('avg_handles',   0)),
-                })
-            except ValueError:
-                continue
-    return rows
+def trim_warmup(cols, warmup):
+    return {k: v[warmup:] for k, v in cols.items()} if warmup else cols
+
+
+def load_targets(path, warmup=0):
+    """{name: column arrays} for every target, warm-up removed."""
+    return {name: trim_warmup(cols, warmup) for name, cols in split_by_target(load_trend(path)).items()}
+
+
+def analyze_file(path, chunk_rows=None, warmup=0):
+    """{name: {metric: MetricStats}} for every target in the trend file."""
+    if not chunk_rows:
+        return {name: analysis.analyze(cols) for name, cols in load_targets(path, warmup).items()}
+
+    online = {}
+    seen   = {}
+    for chunk in iter_trend_chunks(path, chunk_rows):
+        for name, cols in split_by_target(chunk).items():
+            skip = max(0, warmup - seen.get(name, 0))
+            seen[name] = seen.get(name, 0) + len(cols["name"])
+            online.setdefault(name, OnlineRegression()).update_many(trim_warmup(cols, skip))
+    return {name: reg.result() for name, reg in online.items()}
 
 
 def linear_slope(values):
     """Least-squares slope. Positive = upward trend."""
-    n = len(values)
-    if n < 2:
-        return 0.0
-    x_mean = (n - 1) / 2.0
-    y_mean = sum(values) / n
-    num = sum((i - x_mean) * (v - y_mean) for i, v in enumerate(values))
-    den = sum((i - x_mean) ** 2 for i in range(n))
-    return num / den if den != 0 else 0.0
+    return analysis.linear_slope(values)
 
 
-def check(rows, ctx_invol_limit, mem_limit, thread_limit, handle_limit, slope_threshold):
+def check(stats, ctx_invol_limit, mem_limit, thread_limit, handle_limit, slope_threshold, detection=None):
+    """
+    stats = {metric: MetricStats} for one target (see analysis.analyze).
+    detection = leak_detection.detect() result for the same target, if any:
+    its slope replaces the least-squares one and window slopes are checked too.
+    """
     failures = []
     info     = []
 
-    ctx_invol_vals = [r['ctx_invol']   for r in rows]
-    mem_vals       = [r['avg_memory']  for r in rows]
-    thread_vals    = [r['avg_threads'] for r in rows]
-    handle_vals    = [r['avg_handles'] for r in rows]
-
     # ── 1. Absolute threshold ────────────────────────────────────────────────
     checks = [
-        ("ctx_invol/s", ctx_invol_vals, ctx_invol_limit, ".0f", "ctx switches/sec"),
-        ("memory",      mem_vals,       mem_limit,        ".1f", "MB"),
-        ("threads",     thread_vals,    thread_limit,     "d",   ""),
-        ("handles",     handle_vals,    handle_limit,     "d",   ""),
+        ("ctx_invol/s", "ctx_invol",   ctx_invol_limit, ".0f", "ctx switches/sec"),
+        ("memory",      "avg_memory",  mem_limit,        ".1f", "MB"),
+        ("threads",     "avg_threads", thread_limit,     "d",   ""),
+        ("handles",     "avg_handles", handle_limit,     "d",   ""),
     ]
 
-    for name, vals, limit, fmt, unit in checks:
-        peak = max(vals)
+    for name, metric, limit, fmt, unit in checks:
+        peak = stats[metric].peak
         peak_str  = format(int(peak) if fmt == 'd' else peak, fmt if fmt != 'd' else '.0f')
         limit_str = format(int(limit) if fmt == 'd' else limit, fmt if fmt != 'd' else '.0f')
         if peak > limit:
@@ -108,26 +172,302 @@ def check(rows, ctx_invol_limit, mem_limit, thread_limit, handle_limit, slope_th
     # ── 2. Upward trend (slope) ──────────────────────────────────────────────
     # voluntary ctx switches intentionally skipped (see module docstring)
     slope_checks = [
-        ("ctx_invol/s", ctx_invol_vals, "ctx switches/sec"),
-        ("memory",      mem_vals,       "MB/pt"),
-        ("threads",     thread_vals,    "/pt"),
-        ("handles",     handle_vals,    "/pt"),
+        ("ctx_invol/s", "ctx_invol",   "ctx switches/sec"),
+        ("memory",      "avg_memory",  "MB/pt"),
+        ("threads",     "avg_threads", "/pt"),
+        ("handles",     "avg_handles", "/pt"),
     ]
 
-    for name, vals, unit in slope_checks:
-        slope = linear_slope(vals)
+    for name, metric, unit in slope_checks:
+        s = stats[metric]
+        d = (detection or {}).get(metric, {})
+        slope = d.get("slope", s.slope)
+        fit = f"R²={s.r2:.2f}  95% CI=[{s.ci_low:.4f}, {s.ci_high:.4f}]"
+        if d.get("method", "ls") != "ls":
+            fit = f"({d['method']})  " + fit
         if slope > slope_threshold:
             failures.append(
-                f"  ❌ UPWARD TREND      {name:<14} slope={slope:.4f}{unit}  threshold={slope_threshold}"
+                f"  ❌ UPWARD TREND      {name:<14} slope={slope:.4f}{unit}  threshold={slope_threshold}  {fit}"
+                + _growth_since(d, slope_threshold)
+            )
+        elif d.get("max_window_slope", 0.0) > slope_threshold:
+            failures.append(
+                f"  ❌ WINDOW TREND      {name:<14} slope={d['max_window_slope']:.4f}{unit} over "
+                f"{d['window']} pts from {d['max_window_start']}  threshold={slope_threshold}"
+                + _growth_since(d, slope_threshold)
             )
         else:
             info.append(
-                f"  ✅ {name:<14}  slope={slope:.4f}  (stable)"
+                f"  ✅ {name:<14}  slope={slope:.4f}  (stable)  {fit}"
             )
 
     return (len(failures) == 0), info, failures
 
 
+def _growth_since(detection, slope_threshold):
+    cp = detection.get("change_point")
+    if not cp or cp["slope_after"] <= slope_threshold:
+        return ""
+    return (f"\n       ↳ growth started at point {cp['index']} ({cp['timestamp']}), "
+            f"slope after={cp['slope_after']:.4f}")
+
+
+def _finite(value):
+    return value if math.isfinite(value) else None
+
+
+def _report(args, results, detection, target_failures, baseline=None):
+    """Machine-readable version of the console report."""
+    targets = {}
+    for name, stats in results.items():
+        metrics = {}
+        for m, s in stats.items():
+            metrics[m] = {"points": s.n, "peak": s.peak, "slope": s.slope, "intercept": s.intercept,
+                          "r2": s.r2, "ci95": [_finite(s.ci_low), _finite(s.ci_high)]}
+            if m in detection.get(name, {}):
+                metrics[m]["detection"] = detection[name][m]
+        targets[name] = {"passed": not target_failures.get(name), "metrics": metrics,
+                         "failures": [f.strip().lstrip("❌").strip() for f in target_failures.get(name, [])]}
+        if baseline and name in baseline:
+            targets[name]["baseline"] = baseline[name][2]
+    return {
+        "trend_file": args.trend_csv,
+        "passed":     not any(target_failures.values()),
+        "thresholds": {"ctx_invol": args.ctx_invol_limit, "memory": args.mem_limit,
+                       "threads": args.thread_limit, "handles": args.handle_limit,
+                       "slope": args.slope_threshold},
+        "warmup":     args.warmup,
+        "method":     args.method,
+        "window":     args.window,
+        "targets":    targets,
+    }
+
+
+def _write_json(path, report):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"  JSON report   : {path}")
+
+
+# ── Live gate ────────────────────────────────────────────────────────────────
+_LIVE_CHECKS = [
+    ("ctx_invol/s", "ctx_invol",   "ctx_invol_limit"),
+    ("memory",      "avg_memory",  "mem_limit"),
+    ("threads",     "avg_threads", "thread_limit"),
+    ("handles",     "avg_handles", "handle_limit"),
+]
+
+
+class LiveTarget:
+    """Running regression plus breach streaks for one monitored process."""
+
+    def __init__(self):
+        self.online  = OnlineRegression()
+        self.seen    = 0
+        self.streaks = {}
+
+    def observe(self, values, args):
+        """Add one trend point; return the breaches confirmed on it."""
+        self.online.update(values)
+        point = dict(zip(self.online.metrics, values))
+        stats = self.online.result()
+
+        breaches = {}
+        for name, metric, limit_arg in _LIVE_CHECKS:
+            limit = getattr(args, limit_arg)
+            if point[metric] > limit:
+                breaches[f"limit:{metric}"] = f"THRESHOLD BREACH  {name:<14} value={point[metric]:.1f}  limit={limit}"
+            s = stats[metric]
+            if s.n >= LIVE_MIN_POINTS and s.ci_low > args.slope_threshold:
+                breaches[f"slope:{metric}"] = (f"UPWARD TREND      {name:<14} slope={s.slope:.4f}  "
+                                               f"95% CI=[{s.ci_low:.4f}, {s.ci_high:.4f}]  "
+                                               f"threshold={args.slope_threshold}")
+
+        self.streaks = {k: self.streaks.get(k, 0) + 1 for k in breaches}
+        return [f"  ❌ {text}  (confirmed on {self.streaks[k]} points)"
+                for k, text in breaches.items() if self.streaks[k] >= args.confirm]
+
+
+def _abort(pid):
+    try:
+        parent = psutil.Process(pid)
+        procs = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return
+    for p in procs:
+        try:
+            p.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    _, alive = psutil.wait_procs(procs, timeout=5)
+    for p in alive:
+        p.kill()
+
+
+def run_live(args):
+    reader  = CsvTailReader(args.trend_csv, C.TREND_COLUMNS, min_fields=6)
+    targets = {}
+    started = time.monotonic()
+    print(f"  Live gate     : tailing {args.trend_csv}  confirm={args.confirm} points"
+          + (f"  abort_pid={args.abort_pid}" if args.abort_pid else "")
+          + (f"  timeout={args.timeout}s" if args.timeout else ""))
+
+    def drain():
+        for row in reader.poll():
+            try:
+                values = analysis.row_values(row)
+            except (KeyError, ValueError):
+                continue
+            name   = row.get('name') or ''
+            target = targets.setdefault(name, LiveTarget())
+            target.seen += 1
+            if target.seen <= args.warmup:
+                continue
+            confirmed = target.observe(values, args)
+            if confirmed:
+                return name, confirmed
+        return None
+
+    try:
+        while True:
+            breach = drain()
+            if breach:
+                name, lines = breach
+                print("-" * 60)
+                print(f"  Target        : {name}  aborted after {time.monotonic() - started:.1f}s")
+                for line in lines: print(line)
+                if args.abort_pid:
+                    _abort(args.abort_pid)
+                    print(f"  Terminated    : pid {args.abort_pid}")
+                if args.json_out:
+                    report = _report(args, {n: t.online.result() for n, t in targets.items()}, {}, {name: lines})
+                    report["aborted"] = True
+                    _write_json(args.json_out, report)
+                print("=" * 60)
+                print(f"  RESULT: ❌ FAIL — {len(lines)} confirmed issue(s), run stopped early")
+                print("=" * 60)
+                return 1
+            if args.abort_pid and not psutil.pid_exists(args.abort_pid):
+                print(f"  pid {args.abort_pid} exited — running the end-of-run check")
+                time.sleep(C.CSV_FLUSH_INTERVAL)    # let the monitor flush its last rows
+                break
+            if args.timeout and time.monotonic() - started >= args.timeout:
+                print(f"  Timeout ({args.timeout}s) — running the end-of-run check")
+                break
+            time.sleep(LIVE_POLL_INTERVAL)
+    except KeyboardInterrupt:
+        print("  Interrupted — running the end-of-run check")
+    if drain():
+        print("  ⚠️  breach confirmed on the last rows; see the end-of-run check below")
+    if not os.path.exists(args.trend_csv):
+        print(f"❌ FATAL: trend CSV never appeared: {args.trend_csv}")
+        return 1
+
+    # the end-of-run check is the batch check of the whole file (detection, baseline, JSON report)
+    results, detection, baseline = evaluate(args)
+    return _final_verdict(args, results, detection, args.json_out, baseline)
+
+
+def evaluate(args):
+    """(results, detection, baseline) for the whole trend file, as the end-of-run check scores it."""
+    detection = {}
+    if args.chunk_rows:
+        if args.method != "ls" or args.window:
+            print("⚠️  --method/--window need the whole series; ignored with --chunk_rows")
+        results = analyze_file(args.trend_csv, args.chunk_rows, args.warmup)
+    else:
+        targets   = load_targets(args.trend_csv, args.warmup)
+        results   = {name: analysis.analyze(cols) for name, cols in targets.items()}
+        detection = {name: leak_detection.detect(cols, analysis.METRICS, args.method, args.window, args.warmup,
+                                                 args.slope_threshold)
+                     for name, cols in targets.items()}
+    baseline = compare_with_baseline(args, results) if args.compare else None
+    return results, detection, baseline
+
+
+def compare_with_baseline(args, results):
+    """
+    {name: (info, failures, report)} against the run index; targets without a
+    baseline are left out. This run is never part of its own baseline, even
+    if it was --record'ed before.
+    """
+    store = run_store.RunStore(args.store)
+    current_id = run_store.file_run_id(args.trend_csv)
+    out = {}
+    for name, stats in results.items():
+        baseline, runs_used = store.baseline(name, args.baseline_runs, exclude_id=current_id)
+        if baseline is None:
+            print(f"  ⚠️  no passing baseline runs for '{name}' in {store.path}")
+            continue
+        summary = run_store.summarize(stats)
+        info, failures = run_store.compare(summary, baseline, runs_used, args.tolerance)
+        out[name] = (info, failures, {"runs": runs_used, "tolerance": args.tolerance,
+                                      "baseline": baseline, "current": summary})
+    return out
+
+
+def _final_verdict(args, results, detection=None, json_out=None, baseline=None):
+    """Per-target check() and the RESULT banner; returns the exit code."""
+    detection = detection or {}
+    baseline  = baseline or {}
+    total = sum(stats[analysis.METRICS[0]].n for stats in results.values())
+    if total < 2:
+        print(f"❌ FATAL: not enough data points ({total}) — need at least 2")
+        return 1
+
+    print(f"  Data points   : {total}")
+    print(f"  Thresholds    : ctx_invol={args.ctx_invol_limit}/s  "
+          f"mem={args.mem_limit}MB  threads={args.thread_limit}  handles={args.handle_limit}")
+    print(f"  Slope limit   : {args.slope_threshold} per trend-point ({args.method})")
+    if args.warmup or args.window:
+        print(f"  Warm-up       : {args.warmup} points skipped   window={args.window or 'off'}")
+    print(f"  Note          : voluntary ctx switches monitored but not slope-checked")
+
+    passed   = True
+    failures = []
+    by_target = {}
+    for name, stats in results.items():
+        points = stats[analysis.METRICS[0]].n
+        print("-" * 60)
+        if len(results) > 1:
+            print(f"  Target        : {name}  ({points} points)")
+        if points < 2:
+            print(f"  ⚠️  skipped — not enough data points ({points})")
+            continue
+
+        target_passed, info, target_failures = check(
+            stats,
+            ctx_invol_limit = args.ctx_invol_limit,
+            mem_limit       = args.mem_limit,
+            thread_limit    = args.thread_limit,
+            handle_limit    = args.handle_limit,
+            slope_threshold = args.slope_threshold,
+            detection       = detection.get(name),
+        )
+        if name in baseline:
+            info            += baseline[name][0]
+            target_failures += baseline[name][1]
+            target_passed    = target_passed and not baseline[name][1]
+
+        for line in info:            print(line)
+        for line in target_failures: print(line)
+        passed    = passed and target_passed
+        failures += target_failures
+        by_target[name] = target_failures
+
+    if json_out:
+        _write_json(json_out, _report(args, results, detection, by_target, baseline))
+
+    print("=" * 60)
+    if passed:
+        print("  RESULT: ✅ PASS — no regression detected")
+        print("=" * 60)
+        return 0
+    print(f"  RESULT: ❌ FAIL — {len(failures)} issue(s) found")
+    print("=" * 60)
+    return 1
+
+
 def main():
     parser = argparse.ArgumentParser(description="CI/CD Performance Regression Checker")
     parser.add_argument("--trend_csv",        type=str,   required=True)
@@ -136,50 +476,53 @@ def main():
     parser.add_argument("--thread_limit",     type=int,   default=DEFAULT_THREAD_LIMIT)
     parser.add_argument("--handle_limit",     type=int,   default=DEFAULT_HANDLE_LIMIT)
     parser.add_argument("--slope_threshold",  type=float, default=DEFAULT_SLOPE_THRESHOLD)
+    parser.add_argument("--chunk_rows",       type=int,   default=0,
+                        help="Score the file N rows at a time with running sums (0 = load it whole)")
+    parser.add_argument("--warmup",           type=int,   default=DEFAULT_WARMUP,
+                        help="Ignore the first N trend points of every target")
+    parser.add_argument("--method",           choices=leak_detection.METHODS, default="ls",
+                        help="Slope estimator used for the upward-trend check")
+    parser.add_argument("--window",           type=int,   default=DEFAULT_WINDOW,
+                        help="Also check the steepest W-point rolling slope (0 = off)")
+    parser.add_argument("--json_out",         type=str,   default=None,
+                        help="Write the result as JSON to this path")
+    parser.add_argument("--compare",          action="store_true",
+                        help="Also compare with the median of recent passing runs in the run index")
+    parser.add_argument("--record",           action="store_true",
+                        help="Add this run and its verdict to the run index")
+    parser.add_argument("--store",            type=str,   default="backups",
+                        help="Directory holding the run index (index.json)")
+    parser.add_argument("--baseline_runs",    type=int,   default=C.DEFAULT_BASELINE_RUNS)
+    parser.add_argument("--tolerance",        type=float, default=C.DEFAULT_BASELINE_TOLERANCE,
+                        help="Allowed increase over the baseline (0.15 = 15%%)")
+    parser.add_argument("--live",             action="store_true",
+                        help="Tail the trend CSV during the run and stop early on a confirmed breach")
+    parser.add_argument("--confirm",          type=int,   default=DEFAULT_CONFIRM,
+                        help="Live: consecutive breaching points needed to abort")
+    parser.add_argument("--abort_pid",        type=int,   default=None,
+                        help="Live: process tree to terminate on a confirmed breach; the gate ends when it exits")
+    parser.add_argument("--timeout",          type=float, default=None,
+                        help="Live: seconds after which the end-of-run check runs")
     args = parser.parse_args()
 
     print("=" * 60)
     print("  Performance Regression Check")
     print("=" * 60)
 
-    if not os.path.exists(args.trend_csv):
+    if args.live:
+        code = run_live(args)
+    elif not os.path.exists(args.trend_csv):
         print(f"❌ FATAL: trend CSV not found: {args.trend_csv}")
         sys.exit(1)
-
-    rows = load_trend_csv(args.trend_csv)
-    if len(rows) < 2:
-        print(f"❌ FATAL: not enough data points ({len(rows)}) — need at least 2")
-        sys.exit(1)
-
-    print(f"  Data points   : {len(rows)}")
-    print(f"  Thresholds    : ctx_invol={args.ctx_invol_limit}/s  "
-          f"mem={args.mem_limit}MB  threads={args.thread_limit}  handles={args.handle_limit}")
-    print(f"  Slope limit   : {args.slope_threshold} per trend-point")
-    print(f"  Note          : voluntary ctx switches monitored but not slope-checked")
-    print("-" * 60)
-
-    passed, info, failures = check(
-        rows,
-        ctx_invol_limit = args.ctx_invol_limit,
-        mem_limit       = args.mem_limit,
-        thread_limit    = args.thread_limit,
-        handle_limit    = args.handle_limit,
-        slope_threshold = args.slope_threshold,
-    )
-
-    for line in info:     print(line)
-    for line in failures: print(line)
-
-    print("=" * 60)
-    if passed:
-        print("  RESULT: ✅ PASS — no regression detected")
-        print("=" * 60)
-        sys.exit(0)
     else:
-        print(f"  RESULT: ❌ FAIL — {len(failures)} issue(s) found")
-        print("=" * 60)
-        sys.exit(1)
+        results, detection, baseline = evaluate(args)
+        code = _final_verdict(args, results, detection, args.json_out, baseline)
+    if args.record:
+        entry = run_store.RunStore(args.store).register(args.trend_csv, passed=(code == 0))
+        if entry:
+            print(f"  Recorded      : run {entry['id']} in {args.store}")
+    sys.exit(code)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,89 @@
+import os
+import time
+import platform
+from collections import namedtuple
+import psutil
+
+# One reading of a process. Counters are cumulative; the caller turns the
+# ctx switch counts into per-second rates.
+Sample = namedtuple("Sample", ["ctx_vol", "ctx_invol", "rss", "threads", "handles"])
+
+
+class PsutilCollector:
+    """
+    Portable collector. All reads for one sample happen inside
+    process.oneshot(), so psutil fetches the shared /proc (or WinAPI) data once.
+    """
+
+    def __init__(self):
+        self.samples = 0
+        self.total_cost = 0.0   # seconds spent inside collect()
+
+    @property
+    def mean_cost_ms(self):
+        return self.total_cost / self.samples * 1000 if self.samples else 0.0
+
+    def collect(self, process):
+        start = time.perf_counter()
+        try:
+            return self._collect(process)
+        finally:
+            self.total_cost += time.perf_counter() - start
+            self.samples += 1
+
+    def _collect(self, process):
+        with process.oneshot():
+            ctx = process.num_ctx_switches()
+            return Sample(ctx.voluntary, ctx.involuntary,
+                          process.memory_info().rss, process.num_threads(), self._handles(process))
+
+    def _handles(self, process):
+        return process.num_fds()
+
+
+class WindowsCollector(PsutilCollector):
+    """Windows has no fds; count kernel handles instead."""
+
+    def _handles(self, process):
+        return process.num_handles()
+
+
+class LinuxProcCollector(PsutilCollector):
+    """
+    Fast Linux path: ctx switches, RSS and thread count all come from a
+    single read of /proc/<pid>/status; the fd count is one listdir of
+    /proc/<pid>/fd.
+    """
+
+    def _collect(self, process):
+        pid = process.pid
+        try:
+            with open(f"/proc/{pid}/status", 'rb') as f:
+                status = f.read()
+            handles = len(os.listdir(f"/proc/{pid}/fd"))
+        except FileNotFoundError:
+            raise psutil.NoSuchProcess(pid)
+        except PermissionError:
+            raise psutil.AccessDenied(pid)
+
+        fields = {}
+        for line in status.split(b"\n"):
+            key, _, value = line.partition(b":")
+            fields[key] = value
+        return Sample(
+            int(fields.get(b"voluntary_ctxt_switches", 0)),
+            int(fields.get(b"nonvoluntary_ctxt_switches", 0)),
+            int(fields.get(b"VmRSS", b"0 kB").split()[0]) * 1024,   # absent for zombies
+            int(fields.get(b"Threads", 0)),
+            handles,
+        )
+
+
+def get_collector(fast=False):
+    """Pick the collector for this platform once, instead of checking on every tick."""
+    system = platform.system()
+    if system == "Windows":
+        return WindowsCollector()
+    if fast and system == "Linux":
+        return LinuxProcCollector()
+    return PsutilCollector()
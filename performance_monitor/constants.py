@@ -8,12 +8,95 @@ DEFAULT_TREND_FILE = "trend_performance.csv"
 DEFAULT_EXE = "WorkspaceTests.exe"
 DEFAULT_INTERVAL = 5
 DEFAULT_TREND_LIMIT = 3
+MIN_INTERVAL        = 0.01   # 秒，最小采样间隔 (支持小数秒)
+
+# 时间戳格式 (毫秒精度，strftime 后截掉最后 3 位微秒)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+# 采样方式: "subprocess" = 启动 run_monitor.py 子进程并轮询 CSV
+#           "inprocess"  = 在服务器进程内的线程中采样，样本直接推送给广播器
+DEFAULT_MONITOR_MODE = "subprocess"
+DEFAULT_PERSIST_CSV  = True   # inprocess 模式下是否仍然写 CSV
+DEFAULT_FAST_PROC    = False  # Linux 下直接解析 /proc/<pid>/status 采样 (更快)
 
 # CSV 表头定义
 # ctx_vol_per_sec   = voluntary context switches/sec   (线程主动让出，正常)
 # ctx_invol_per_sec = involuntary context switches/sec (被强制切走，竞争问题)
-RAW_COLUMNS   = ["timestamp", "ctx_vol_per_sec", "ctx_invol_per_sec", "threads", "handles", "memory_mb"]
-TREND_COLUMNS = ["timestamp", "avg_ctx_vol", "avg_ctx_invol", "avg_memory", "avg_threads", "avg_handles"]
+# pid / name        = 该行属于哪个被监控进程 (支持同时监控多个进程)
+# uss_mb ... file_mb = 可选的内存细分 (见 memory_detail.py)，低频采样，未开启时为空
+MEMORY_DETAIL_COLUMNS = ["uss_mb", "pss_mb", "heap_mb", "anon_mb", "file_mb"]
+RAW_COLUMNS   = (["timestamp", "ctx_vol_per_sec", "ctx_invol_per_sec", "threads", "handles", "memory_mb", "pid", "name"]
+                 + MEMORY_DETAIL_COLUMNS)
+TREND_COLUMNS = ["timestamp", "avg_ctx_vol", "avg_ctx_invol", "avg_memory", "avg_threads", "avg_handles", "pid", "name"]
+
+# CSV 写入缓冲：攒够行数或超过时间就落盘，停止时一定会落盘
+CSV_FLUSH_ROWS     = 100
+CSV_FLUSH_INTERVAL = 1.0   # 秒
+
+# 多分辨率汇总 (rollup)：每个分辨率的桶包含 min/max/mean/last/count
+ROLLUP_RESOLUTIONS  = [1, 10, 60, 600]     # 秒
+ROLLUP_HISTORY      = 2000                 # 每个分辨率在内存中保留的桶数
+ROLLUP_FILE_PATTERN = "rollup_{}s.csv"
+DEFAULT_ROLLUP      = True                 # 监控时是否写 rollup 文件
 
 # 初始加载配置
-INITIAL_LOAD_COUNT = 200  # 第一次连接时读取原始数据的行数
\ No newline at end of file
+INITIAL_LOAD_COUNT = 200  # 新连接回放的最近样本数 / 每次向前翻页加载的行数 (更早的数据走 /series)
+
+# 广播 (Broadcaster) 配置
+BROADCAST_POLL_INTERVAL = 0.5    # 秒，共享读取器轮询 CSV 的间隔
+SUBSCRIBER_QUEUE_SIZE   = 1000   # 每个客户端的待发送队列上限，满了丢弃最旧的
+BATCH_MAX_SIZE          = 500    # 每个 WebSocket 帧最多携带的样本数
+BATCH_WINDOW            = 0.05   # 秒，凑批的最长等待时间
+
+# 历史运行库 (run_store.py)：备份时登记每次运行的摘要，供基线对比
+RUN_STORE_INDEX            = "index.json"   # 位于 backups/ 目录下
+RUN_STORE_MAX_RUNS         = 200            # 索引中最多保留的运行条数
+RUN_ROLLUP_POINTS          = 60             # 每次运行保存的压缩曲线点数
+DEFAULT_BASELINE_RUNS      = 5              # 与最近 N 次通过的运行的中位数对比
+DEFAULT_BASELINE_TOLERANCE = 0.15           # 超出基线 15% 判为回归
+
+# 历史查询 (/series，见 history.py)
+SERIES_INDEX_EVERY    = 256    # 稀疏索引：每隔多少行记录一次 (时间戳, 字节偏移)
+DEFAULT_SERIES_POINTS = 1000   # 默认返回点数 (约等于图表像素宽度)
+
+# 降采样 (downsample.py)："lttb" 保留曲线形状，"minmax" 保留每个桶的极值
+DOWNSAMPLE_METHOD    = "lttb"
+REPLAY_TREND_HISTORY = 10000   # 内存中保留的 trend 点，新连接回放时降采样到 DEFAULT_SERIES_POINTS
+
+# 构建 (TradingManager / build_pipeline.py)
+DEFAULT_INCREMENTAL_BUILD = True                   # False = 每次都 make clean 全量重建
+BUILD_STATE_FILE          = ".build_state.json"    # 上次成功构建的工具链 / 生成代码指纹
+BUILD_METRICS_FILE        = "build_metrics.csv"    # 每个阶段的耗时记录
+BUILD_METRICS_COLUMNS     = ["timestamp", "build_id", "stage", "seconds", "exit_code", "status"]
+BUILD_USE_CCACHE          = True                   # 如果装了 ccache 就使用
+BUILD_GENERATED_DIRS      = ["src"]                # generate_code.py 的输出目录 (相对项目根目录)，只在这里跟踪生成的文件
+BUILD_FETCH               = True                   # 每次构建先 git fetch (需要网络)；False 时和上次 fetch 到的上游比较
+CCACHE_DIRS               = ["/usr/lib/ccache", "/usr/lib64/ccache", "/usr/local/opt/ccache/libexec"]
+
+# 进程表缓存 (process_cache.py)
+PROCESS_TABLE_TTL      = 1.0     # 后台增量刷新间隔 (秒)
+PROCESS_EVENTS         = True    # Linux: 用 netlink proc connector 在进程 exec/exit 时立即刷新 (需要 root / CAP_NET_ADMIN)
+PROCESS_EVENT_DEBOUNCE = 0.01    # 一批事件合并成一次刷新 (秒)
+PROCESS_WAIT_POLL      = 0.1     # 等待目标进程启动时、没有 proc 事件的情况下的刷新间隔 (秒)
+
+# 启动模式 (run_monitor.py -- <cmd...>)
+LAUNCH_INFO_FILE = "launch_info.json"   # 子进程的退出码和存活时间
+
+# 停止子进程监控: Windows 没有可以跨控制台发送的 SIGTERM，terminate() 会直接杀死进程、丢掉缓冲的 CSV 行，
+# 所以 MonitorManager.stop() 先创建停止文件，run_monitor.py 看到后自己退出 (超时后才强制结束)
+MONITOR_STOP_FILE = "monitor.stop"
+STOP_FILE_POLL    = 0.2    # run_monitor 检查停止文件的间隔 (秒)
+
+# 进程树模式 (process_tree.py): 目标进程 + 它 fork / 启动的所有子孙进程
+DEFAULT_TREE_MODE  = False
+DEFAULT_TREE_FILE  = "tree_raw.csv"                   # 每个成员进程一行
+TREE_COLUMNS       = RAW_COLUMNS + ["ppid", "root_pid"]
+TREE_MAX_PROCESSES = 256                              # 每个 tick 最多采样的成员数 (离根最近的优先)
+
+# 内存细分 (memory_detail.py): USS / PSS、heap / 匿名 mmap / 文件映射，以及按映射区域的增长
+DEFAULT_MEMORY_DETAIL      = False
+MEMORY_DETAIL_INTERVAL     = 10.0                  # 秒，每个进程读取一次 smaps 的间隔 (开销大，独立线程)
+DEFAULT_MEMORY_REGION_FILE = "memory_regions.csv"  # 每次增长最多的映射区域
+MEMORY_REGION_COLUMNS      = ["timestamp", "pid", "name", "region", "kind", "rss_mb", "delta_mb"]
+MEMORY_REGION_MIN_DELTA_MB = 0.1                   # 变化小于此值的区域不记录
+MEMORY_REGION_TOP          = 5                     # 每个进程每次最多记录的区域数
@@ -0,0 +1,104 @@
+import csv
+import os
+import queue
+import threading
+import time
+import constants as C
+
+
+class CsvSink:
+    """
+    Long-lived, buffered CSV appender.
+
+    The file is opened once (header written first if it is new) and kept
+    open. Rows are buffered and written out when `flush_rows` rows are
+    pending or `flush_interval` seconds have passed since the last flush,
+    and always on close(), so stopping the monitor does not lose samples.
+
+    With threaded=True rows are handed to a background writer thread through
+    an in-memory queue, so the sampler never waits on the disk.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path, columns, threaded=False,
+                 flush_rows=C.CSV_FLUSH_ROWS, flush_interval=C.CSV_FLUSH_INTERVAL):
+        self.path = path
+        self.columns = columns
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._file = None
+        self._writer = None
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._queue = None
+        self._thread = None
+        if threaded:
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._drain, name=f"CsvSink({path})", daemon=True)
+            self._thread.start()
+
+    def write(self, row):
+        if self._queue is not None:
+            self._queue.put(row)
+        else:
+            self._append(row)
+
+    def tick(self):
+        """Flush if the time budget has run out (for callers that go quiet between rows)."""
+        if self._queue is None and self._buffer and self._flush_due():
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._open()
+        self._write_rows(self._buffer)
+        self._file.flush()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(self._STOP)
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        if is_new:
+            self._writer.writerow(self.columns)
+
+    def _write_rows(self, rows):
+        self._writer.writerows(rows)
+
+    def _flush_due(self):
+        return time.monotonic() - self._last_flush >= self.flush_interval
+
+    def _append(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.flush_rows or self._flush_due():
+            self.flush()
+
+    def _drain(self):
+        while True:
+            try:
+                row = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                row = None
+            try:
+                if row is self._STOP:
+                    break
+                if row is None:
+                    self.flush()
+                else:
+                    self._append(row)
+            except Exception as e:
+                print(f"CSV write error ({self.path}): {e}")
@@ -0,0 +1,94 @@
+import os
+
+
+class CsvTailReader:
+    """
+    Incrementally tails a CSV file by byte offset.
+
+    Each poll() seeks to the last known offset and reads only the bytes
+    appended since, so the cost is proportional to the new data rather than
+    to the whole file. A trailing line without a newline is kept back until
+    it is completed. Truncation or rotation (e.g. MonitorManager.backup_and_clean
+    moving the file away and the monitor recreating it) restarts from byte 0.
+
+    With tail_rows set, a file that already exists when the reader first sees
+    it is not read from the top: the first poll returns only its last
+    tail_rows rows, found by scanning backwards from the end in blocks.
+    """
+
+    def __init__(self, path, columns, min_fields=None, tail_rows=None):
+        self.path = path
+        self.columns = columns
+        self.min_fields = min_fields if min_fields is not None else len(columns)
+        self.tail_rows = tail_rows
+        self.offset = 0
+        self._partial = b""
+        self._file_id = None
+        self._from_tail = tail_rows is not None
+
+    def reset(self):
+        """Forget the current position so the next poll starts from the top."""
+        self.offset = 0
+        self._partial = b""
+        self._file_id = None
+        self._from_tail = False   # a file seen after a reset is a new one: read it whole
+
+    def poll(self):
+        """Return the complete rows (as dicts) appended since the last poll."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.reset()
+            return []
+
+        # (dev, inode) changes when the file is moved away and recreated;
+        # a size below our offset means it was truncated in place.
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._file_id or st.st_size < self.offset:
+            from_tail = self._from_tail and self._file_id is None
+            self.reset()
+            self._file_id = file_id
+            if from_tail:
+                self.offset = self._tail_offset(st.st_size)
+
+        if st.st_size == self.offset:
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(st.st_size - self.offset)
+        self.offset += len(chunk)
+
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+        return self._parse(lines)
+
+    def _tail_offset(self, size, block=1 << 16):
+        """Byte offset where the last tail_rows complete lines of the file start (0 if it has fewer)."""
+        with open(self.path, 'rb') as f:
+            data, start, newlines = b"", size, 0
+            # tail_rows + 1 newlines: the one before the first wanted line, and
+            # one ending each wanted line (anything after the last is partial)
+            while start > 0 and newlines <= self.tail_rows:
+                end, start = start, max(0, start - block)
+                f.seek(start)
+                chunk = f.read(end - start)
+                newlines += chunk.count(b"\n")
+                data = chunk + data
+        pos = len(data)
+        for _ in range(self.tail_rows + 1):
+            pos = data.rfind(b"\n", 0, pos)
+            if pos < 0:
+                return 0
+        return start + pos + 1
+
+    def _parse(self, lines):
+        rows = []
+        for raw in lines:
+            line = raw.decode('utf-8', errors='ignore').strip()
+            if not line or line.startswith(self.columns[0]):
+                continue  # blank or header
+            vals = line.split(',')
+            if len(vals) >= self.min_fields:
+                rows.append(dict(zip(self.columns, vals)))
+        return rows
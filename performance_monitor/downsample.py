@@ -0,0 +1,101 @@
+"""
+Downsampling of chart series to a fixed number of points.
+
+  lttb    Largest-Triangle-Three-Buckets: keeps the points that preserve the
+          visual shape of a line (peaks and dips survive)
+  minmax  the minimum and maximum of every bucket: keeps every extreme,
+          good for spiky metrics
+
+Both return indices into the original series, so several metrics sharing
+one time axis can be reduced together: each metric gets an equal share of
+the point budget and the union of the chosen indices is kept.
+"""
+
+import numpy as np
+
+METHODS = ["lttb", "minmax"]
+
+
+def lttb(y, n):
+    """Indices of n points chosen by Largest-Triangle-Three-Buckets (x = sample index)."""
+    y = np.asarray(y, dtype=np.float64)
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+
+    every = (size - 2) / (n - 2)
+    chosen = np.empty(n, dtype=np.int64)
+    chosen[0], chosen[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo = int(i * every) + 1                          # current bucket
+        hi = int((i + 1) * every) + 1
+        nlo, nhi = hi, min(int((i + 2) * every) + 1, size)   # next bucket (its mean is the third vertex)
+        avg_x = (nlo + nhi - 1) / 2.0
+        avg_y = y[nlo:nhi].mean()
+        xs = np.arange(lo, hi)
+        area = np.abs((a - avg_x) * (y[lo:hi] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        chosen[i + 1] = a
+    return chosen
+
+
+def minmax(y, n):
+    """Indices of the min and max of n/2 equal buckets, plus the end points."""
+    y = np.asarray(y, dtype=np.float64)
+    size = len(y)
+    if n >= size or n < 4:
+        return np.arange(size)
+    edges = np.linspace(0, size, n // 2 + 1).astype(np.int64)
+    picks = [0, size - 1]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            picks += [lo + int(np.argmin(y[lo:hi])), lo + int(np.argmax(y[lo:hi]))]
+    return np.unique(picks)
+
+
+def indices(columns, n, method="lttb"):
+    """Sorted row indices covering every column (dict of equal-length arrays) within ~n points."""
+    if method not in METHODS:
+        raise ValueError(f"downsampling method must be one of {METHODS}")
+    pick = lttb if method == "lttb" else minmax
+    arrays = [np.nan_to_num(np.asarray(v, dtype=np.float64)) for v in columns.values()]
+    size = len(arrays[0]) if arrays else 0
+    if size <= n:
+        return np.arange(size)
+    share = max(n // len(arrays), 4)
+    return np.unique(np.concatenate([pick(a, share) for a in arrays]))
+
+
+def downsample_records(records, metrics, n, method="lttb", group="name"):
+    """
+    Reduce a list of rows to ~n rows, keeping each target (group column) as
+    its own series and the original order. Rows may be dicts (metrics and
+    group are keys) or lists (metrics and group are positions); group=None
+    treats all rows as one series.
+    """
+    if len(records) <= n:
+        return records
+    groups = {}
+    for i, r in enumerate(records):
+        groups.setdefault(_get(r, group) or "" if group is not None else "", []).append(i)
+    share = max(n // len(groups), 4)
+    keep = []
+    for rows in groups.values():
+        columns = {m: [_number(_get(records[i], m)) for i in rows] for m in metrics}
+        keep += [rows[i] for i in indices(columns, share, method)]
+    return [records[i] for i in sorted(keep)]
+
+
+def _get(record, key):
+    try:
+        return record[key]
+    except (KeyError, IndexError):
+        return None
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
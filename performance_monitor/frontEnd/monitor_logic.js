@@ -1,7 +1,9 @@
 let socket;
 let rtChart = null, trChart = null;
-let rtData = { times: [], mem: [], hnd: [], ctx_vol: [], ctx_invol: [], thr: [] };
-let trData = { times: [], mem: [], hnd: [], ctx_vol: [], ctx_invol: [], thr: [] };
+// Per-target series, keyed by the "name" column of each sample
+let rtData = {};
+let trData = {};
+let currentTarget = null;
 
 const isLocal = false;
 const renderHost = "tradesystem-v86g.onrender.com"; 
@@ -77,11 +79,25 @@ function createCharts() {
         ]
     });
 
+    // Real-time chart reads a column-keyed dataset straight from the ring buffer
+    const rtOption = getOption('REAL-TIME MONITOR');
+    delete rtOption.xAxis.data;
+    rtOption.dataset = { source: new RingBuffer(1).toSource() };
+    rtOption.series.forEach((series, k) => {
+        delete series.data;
+        series.smooth = false;
+        series.encode = { x: 'time', y: RT_FIELDS[k] };
+    });
+
     rtChart = echarts.init(document.getElementById('realtime-chart'), 'dark');
-    rtChart.setOption(getOption('REAL-TIME MONITOR'));
+    rtChart.setOption(rtOption);
+
+    // Trend chart: ECharts drops points it cannot draw (one per pixel) when rendering
+    const trOption = getOption('LONG-TERM TREND');
+    trOption.series.forEach(series => { series.sampling = 'lttb'; });
 
     trChart = echarts.init(document.getElementById('trend-chart'), 'dark');
-    trChart.setOption(getOption('LONG-TERM TREND'));
+    trChart.setOption(trOption);
 }
 
 // ── WebSocket ────────────────────────────────────────────────────────────────
@@ -92,13 +108,18 @@ function connect() {
     socket.onmessage = (event) => {
         const msg = JSON.parse(event.data);
         
-        if (msg.type === "realtime" && rtChart) {
+        if ((msg.type === "realtime" || msg.type === "realtime_batch") && rtChart) {
             updateRT(msg.data);
-        } else if ((msg.type === "trend_push" || msg.type === "history_trend") && trChart) {
+        } else if ((msg.type === "trend_push" || msg.type === "trend_batch" || msg.type === "history_trend") && trChart) {
             updateTR(msg.data);
         } else if (msg.type === "status_log") {
             const el = document.getElementById('status-indicator');
             el.innerText = msg.message;
+            // stream = one line of build output; only the final result re-enables the button
+            if (msg.stream) {
+                console.log(msg.message);
+                return;
+            }
             if (msg.message.includes("BUILD") || msg.message.includes("FAILED")) {
                 const btn = document.getElementById('btn-trade-update');
                 btn.innerText = "UPDATE & BUILD";
@@ -110,38 +131,142 @@ function connect() {
     };
 }
 
+// ── Targets ──────────────────────────────────────────────────────────────────
+// first = full timestamp of the oldest point, used to page back through /series
+const newSeries = () => ({ times: [], mem: [], hnd: [], ctx_vol: [], ctx_invol: [], thr: [], first: null });
+
+function seriesFor(store, sample) {
+    const target = sample.name || 'default';
+    if (!store[target]) {
+        store[target] = newSeries();
+        addTargetOption(target);
+    }
+    return store[target];
+}
+
+function addTargetOption(target) {
+    const select = document.getElementById('target-select');
+    if (![...select.options].some(o => o.value === target)) {
+        const option = document.createElement('option');
+        option.value = option.innerText = target;
+        select.appendChild(option);
+    }
+    if (currentTarget === null) {
+        currentTarget = target;
+        select.value = target;
+    }
+}
+
+function resetTargets() {
+    rtData = {};
+    trData = {};
+    currentTarget = null;
+    document.getElementById('target-select').innerHTML = '';
+}
+
+// ── Real-time ring buffer ────────────────────────────────────────────────────
+// Fixed-capacity window per target: one Float64Array per metric plus the
+// time labels. A new sample overwrites the oldest one in place, so nothing
+// is shifted; toSource() hands ECharts an oldest-first view of the window.
+const RT_FIELDS = ['mem', 'hnd', 'ctx_vol', 'ctx_invol', 'thr'];
+
+class RingBuffer {
+    constructor(capacity) {
+        this.capacity = Math.max(1, capacity);
+        this.head = 0;                    // next write position
+        this.length = 0;
+        this.times = new Array(this.capacity);
+        this.cols = {};
+        this.ordered = {};                // reused oldest-first copies
+        RT_FIELDS.forEach(f => {
+            this.cols[f] = new Float64Array(this.capacity);
+            this.ordered[f] = new Float64Array(this.capacity);
+        });
+    }
+
+    push(time, values) {
+        this.times[this.head] = time;
+        RT_FIELDS.forEach((f, k) => { this.cols[f][this.head] = values[k]; });
+        this.head = (this.head + 1) % this.capacity;
+        if (this.length < this.capacity) this.length++;
+    }
+
+    // Column-keyed ECharts dataset source, oldest sample first
+    toSource() {
+        const start = (this.head - this.length + this.capacity) % this.capacity;
+        const first = Math.min(this.length, this.capacity - start);   // part before wrap-around
+        const rest  = this.length - first;
+        const source = {
+            time: this.times.slice(start, start + first).concat(this.times.slice(0, rest))
+        };
+        RT_FIELDS.forEach(f => {
+            const out = this.ordered[f];
+            out.set(this.cols[f].subarray(start, start + first), 0);
+            out.set(this.cols[f].subarray(0, rest), first);
+            source[f] = out.subarray(0, this.length);
+        });
+        return source;
+    }
+
+    // New buffer with another capacity, keeping the most recent samples
+    resize(capacity) {
+        const next = new RingBuffer(capacity);
+        const src = this.toSource();
+        for (let k = Math.max(0, this.length - next.capacity); k < this.length; k++) {
+            next.push(src.time[k], RT_FIELDS.map(f => src[f][k]));
+        }
+        return next;
+    }
+}
+
+// Coalesce redraws to at most one per animation frame
+function frameThrottled(draw) {
+    let pending = false;
+    return () => {
+        if (pending) return;
+        pending = true;
+        requestAnimationFrame(() => { pending = false; draw(); });
+    };
+}
+const scheduleRT = frameThrottled(() => redrawRT());
+const scheduleTR = frameThrottled(() => redrawTR());
+
 // ── Real-time update ─────────────────────────────────────────────────────────
-function updateRT(data) {
+// Accepts a single sample or a batch; the chart is redrawn on the next frame.
+function rtCapacity() {
     const windowMin = parseFloat(document.getElementById('window-min').value) || 2;
     const interval  = parseFloat(document.getElementById('interval').value)   || 1;
-    const maxPoints = Math.floor((windowMin * 60) / interval);
-
-    rtData.times.push(data.timestamp.split(' ')[1]);
-    rtData.mem.push(Number(data.memory_mb)       || 0);
-    rtData.hnd.push(Number(data.handles)         || 0);
-    rtData.ctx_vol.push(Number(data.ctx_vol_per_sec)   || 0);
-    rtData.ctx_invol.push(Number(data.ctx_invol_per_sec) || 0);
-    rtData.thr.push(Number(data.threads) || 0);
-
-    if (rtData.times.length > maxPoints) {
-        rtData.times.shift();
-        rtData.mem.shift();
-        rtData.hnd.shift();
-        rtData.ctx_vol.shift();
-        rtData.ctx_invol.shift();
-        rtData.thr.shift();
-    }
+    return Math.floor((windowMin * 60) / interval);
+}
 
-    rtChart.setOption({
-        xAxis: { data: rtData.times },
-        series: [
-            { data: rtData.mem },
-            { data: rtData.hnd },
-            { data: rtData.ctx_vol },
-            { data: rtData.ctx_invol },
-            { data: rtData.thr }
-        ]
-    }, false);
+function updateRT(data) {
+    const capacity = rtCapacity();
+    const list = Array.isArray(data) ? data : [data];
+    list.forEach(i => {
+        const target = i.name || 'default';
+        let s = rtData[target];
+        if (!s) {
+            s = rtData[target] = new RingBuffer(capacity);
+            addTargetOption(target);
+        } else if (s.capacity !== capacity) {
+            s = rtData[target] = s.resize(capacity);
+        }
+        s.push(i.timestamp.split(' ')[1], [
+            Number(i.memory_mb)         || 0,
+            Number(i.handles)           || 0,
+            Number(i.ctx_vol_per_sec)   || 0,
+            Number(i.ctx_invol_per_sec) || 0,
+            Number(i.threads)           || 0
+        ]);
+    });
+
+    scheduleRT();
+}
+
+function redrawRT() {
+    const s = rtData[currentTarget];
+    if (!rtChart || !s) return;
+    rtChart.setOption({ dataset: { source: s.toSource() } });
 }
 
 // ── Trend update ─────────────────────────────────────────────────────────────
@@ -149,31 +274,108 @@ function updateTR(data) {
     if (!trChart) return;
     
     const list = Array.isArray(data) ? data : [data];
-    console.log("Trend Data Received:", list[0]);
+    console.log(`Trend Data Received: ${list.length} point(s)`, list[0]);
 
     list.forEach(i => {
         if (i.timestamp) {
-            trData.times.push(i.timestamp.split(' ')[1]);
-            trData.mem.push(Number(i.avg_memory)    || 0);
-            trData.hnd.push(Number(i.avg_handles)   || 0);
-            trData.ctx_vol.push(Number(i.avg_ctx_vol)   || 0);
-            trData.ctx_invol.push(Number(i.avg_ctx_invol) || 0);
-            trData.thr.push(Number(i.avg_threads) || 0);
+            const s = seriesFor(trData, i);
+            if (s.first === null) s.first = i.timestamp;
+            s.times.push(i.timestamp.split(' ')[1]);
+            s.mem.push(Number(i.avg_memory)    || 0);
+            s.hnd.push(Number(i.avg_handles)   || 0);
+            s.ctx_vol.push(Number(i.avg_ctx_vol)   || 0);
+            s.ctx_invol.push(Number(i.avg_ctx_invol) || 0);
+            s.thr.push(Number(i.avg_threads) || 0);
+            compactTrend(s);
         }
     });
 
+    scheduleTR();
+}
+
+function redrawTR() {
+    const s = trData[currentTarget];
+    if (!trChart || !s) return;
+    const smooth = s.times.length <= SMOOTH_MAX_POINTS;
     trChart.setOption({
-        xAxis: { data: trData.times },
+        xAxis: { data: s.times },
         series: [
-            { name: 'Memory(MB)',  data: trData.mem },
-            { name: 'Handles',     data: trData.hnd },
-            { name: 'Ctx Vol/s',   data: trData.ctx_vol },
-            { name: 'Ctx Invol/s', data: trData.ctx_invol },
-            { name: 'Threads',     data: trData.thr }
+            { name: 'Memory(MB)',  data: s.mem,       smooth },
+            { name: 'Handles',     data: s.hnd,       smooth },
+            { name: 'Ctx Vol/s',   data: s.ctx_vol,   smooth },
+            { name: 'Ctx Invol/s', data: s.ctx_invol, smooth },
+            { name: 'Threads',     data: s.thr,       smooth }
         ]
     });
 }
 
+// ── Trend window ─────────────────────────────────────────────────────────────
+// Trend points arrive for the whole run (plus the pages loaded from /series),
+// so once a target holds twice TREND_MAX_POINTS its series is compacted back
+// to TREND_MAX_POINTS: the min and max of every bucket of each metric are
+// kept (like downsample.minmax on the server), so peaks and leaks survive.
+const TREND_MAX_POINTS  = 1000;   // constants.DEFAULT_SERIES_POINTS
+const SMOOTH_MAX_POINTS = 200;    // longer series are drawn without smoothing
+
+function minmaxIndices(y, n, picks) {
+    const size = y.length, buckets = Math.floor(n / 2);
+    for (let b = 0; b < buckets; b++) {
+        const lo = Math.floor(b * size / buckets), hi = Math.floor((b + 1) * size / buckets);
+        if (hi <= lo) continue;
+        let min = lo, max = lo;
+        for (let k = lo + 1; k < hi; k++) {
+            if (y[k] < y[min]) min = k;
+            if (y[k] > y[max]) max = k;
+        }
+        picks.add(min);
+        picks.add(max);
+    }
+}
+
+function compactTrend(s) {
+    if (s.times.length <= 2 * TREND_MAX_POINTS) return;
+    const share = Math.max(Math.floor(TREND_MAX_POINTS / RT_FIELDS.length), 4);
+    const picks = new Set([0, s.times.length - 1]);
+    RT_FIELDS.forEach(f => minmaxIndices(s[f], share, picks));
+    const keep = [...picks].sort((a, b) => a - b);
+    ['times', ...RT_FIELDS].forEach(f => { s[f] = keep.map(k => s[f][k]); });
+}
+
+// ── History paging ───────────────────────────────────────────────────────────
+// The WebSocket only replays the latest points; older trend points are
+// fetched from /series one page at a time and prepended.
+const TREND_METRICS = ['avg_memory', 'avg_handles', 'avg_ctx_vol', 'avg_ctx_invol', 'avg_threads'];
+
+async function loadOlderTrend() {
+    const s = trData[currentTarget];
+    if (!s || s.first === null) return;
+
+    const params = new URLSearchParams({ metric: TREND_METRICS.join(','), to: s.first });
+    if (currentTarget !== 'default') params.set('name', currentTarget);
+
+    const btn = document.getElementById('btn-load-older');
+    try {
+        const response = await fetch(`${API_BASE}/series?${params}`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const page = await response.json();
+        if (page.timestamps.length) {
+            const col = (m) => page.series[m].map(v => v || 0);
+            s.times.unshift(...page.timestamps.map(t => t.split(' ')[1]));
+            s.mem.unshift(...col('avg_memory'));
+            s.hnd.unshift(...col('avg_handles'));
+            s.ctx_vol.unshift(...col('avg_ctx_vol'));
+            s.ctx_invol.unshift(...col('avg_ctx_invol'));
+            s.thr.unshift(...col('avg_threads'));
+            s.first = page.timestamps[0];
+            compactTrend(s);
+            redrawTR();
+        }
+        btn.disabled = !page.has_more;
+    } catch (err) {
+        console.error("Failed to load older trend points:", err);
+    }
+}
+
 // ── Process list ─────────────────────────────────────────────────────────────
 async function refreshProcessList() {
     try {
@@ -210,8 +412,9 @@ document.getElementById('btn-config').onclick = () => {
         type: "configure",
         data: {
             exe: exeName,
-            interval: parseInt(document.getElementById('interval').value),
-            limit: parseInt(document.getElementById('trend-limit').value)
+            interval: parseFloat(document.getElementById('interval').value),
+            limit: parseInt(document.getElementById('trend-limit').value),
+            mode: document.getElementById('monitor-mode').value
         }
     }));
 
@@ -232,8 +435,8 @@ document.getElementById('btn-config').onclick = () => {
 };
 
 document.getElementById('btn-start').onclick = () => {
-    rtData = { times: [], mem: [], hnd: [], ctx_vol: [], ctx_invol: [], thr: [] };
-    trData = { times: [], mem: [], hnd: [], ctx_vol: [], ctx_invol: [], thr: [] };
+    resetTargets();
+    document.getElementById('btn-load-older').disabled = false;
     createCharts(); 
     socket.send(JSON.stringify({ type: "start" }));
 };
@@ -245,6 +448,15 @@ document.getElementById('btn-stop').onclick = () => {
     if (trChart) { trChart.dispose(); trChart = null; }
 };
 
+document.getElementById('target-select').onchange = (e) => {
+    currentTarget = e.target.value;
+    document.getElementById('btn-load-older').disabled = false;
+    redrawRT();
+    redrawTR();
+};
+
+document.getElementById('btn-load-older').onclick = loadOlderTrend;
+
 document.getElementById('btn-refresh').onclick = async () => {
     const btn = document.getElementById('btn-refresh');
     btn.innerText = "⏳";
@@ -0,0 +1,235 @@
+import bisect
+import os
+import threading
+import constants as C
+import downsample
+from rollup import ROLLUP_METRICS, rollup_file
+from timestamps import epoch_to_timestamp, parse_timestamp
+
+# 可查询的数值列 (timestamp / pid / name 不是指标)
+_NOT_METRICS  = ("timestamp", "pid", "name")
+TREND_METRICS = [c for c in C.TREND_COLUMNS if c not in _NOT_METRICS]
+RAW_METRICS   = [c for c in C.RAW_COLUMNS if c not in _NOT_METRICS]
+
+
+class SeriesIndex:
+    """
+    Sparse (timestamp, byte offset) index over an append-only CSV.
+
+    One entry is kept every `every` rows. refresh() only scans the bytes
+    appended since the last call (rotation or truncation starts over, as in
+    CsvTailReader), so a time lookup is a bisect over the entries plus a
+    read of at most `every` rows before the first match.
+
+    Timestamps are compared as strings: TIMESTAMP_FORMAT sorts
+    lexicographically. Rollup files are only roughly time-ordered (targets
+    interleave), so each entry stores the running maximum timestamp and
+    queries filter rows individually.
+    """
+
+    def __init__(self, path, every=C.SERIES_INDEX_EVERY):
+        self.path = path
+        self.every = every
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.columns = []
+        self.times = []
+        self.offsets = []
+        self.rows = 0
+        self.scanned = 0
+        self._file_id = None
+
+    def refresh(self):
+        """Index newly appended rows; False if the file does not exist."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            return False
+
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._file_id or st.st_size < self.scanned:
+            self._reset()
+            self._file_id = file_id
+        if st.st_size == self.scanned:
+            return True
+
+        with open(self.path, 'rb') as f:
+            if self.scanned == 0:
+                header = f.readline()
+                if not header.endswith(b"\n"):
+                    return True
+                self.columns = header.decode('utf-8', errors='ignore').strip().split(',')
+                self.scanned = f.tell()
+            f.seek(self.scanned)
+            offset = self.scanned
+            latest = self.times[-1] if self.times else ""
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break                      # partial last line, index it next time
+                ts = line.split(b",", 1)[0].decode('utf-8', errors='ignore')
+                latest = max(latest, ts)
+                if self.rows % self.every == 0:
+                    self.times.append(latest)
+                    self.offsets.append(offset)
+                offset += len(line)
+                self.rows += 1
+            self.scanned = offset
+        return True
+
+    def _read(self, start, stop):
+        """
+        Parsed rows between two byte offsets (stop=None: up to the indexed end).
+        Rows with fewer fields than the header (truncated writes) are dropped.
+        """
+        stop = self.scanned if stop is None else stop
+        if start >= stop:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read(stop - start)
+        width = len(self.columns)
+        rows = (line.split(',') for line in data.decode('utf-8', errors='ignore').splitlines() if line)
+        return [r for r in rows if len(r) >= width]
+
+    def _entry_offset(self, i):
+        return self.offsets[i] if i < len(self.offsets) else None
+
+    def range(self, t_from=None, t_to=None):
+        """Rows with t_from <= timestamp <= t_to (either bound may be None)."""
+        with self._lock:
+            if not self.refresh() or not self.offsets:
+                return []
+            first = max(bisect.bisect_left(self.times, t_from) - 1, 0) if t_from else 0
+            last  = bisect.bisect_right(self.times, t_to) + 1 if t_to else len(self.offsets)
+            rows  = self._read(self.offsets[first], self._entry_offset(last))
+        return [r for r in rows if (not t_from or r[0] >= t_from) and (not t_to or r[0] <= t_to)]
+
+    def tail(self, count, before=None, keep=None):
+        """
+        (rows, has_more): the last `count` rows with timestamp < before that
+        pass keep(row), reading backwards one index span at a time.
+        """
+        with self._lock:
+            if not self.refresh() or not self.offsets:
+                return [], False
+            end = bisect.bisect_left(self.times, before) + 1 if before else len(self.offsets)
+            stop = self._entry_offset(end)
+            start = min(end, len(self.offsets))
+            rows = []
+            while start > 0 and len(rows) < count:
+                start = max(start - max(1, (count - len(rows)) // self.every + 1), 0)
+                rows = [r for r in self._read(self.offsets[start], stop)
+                        if (not before or r[0] < before) and (keep is None or keep(r))]
+        return rows[-count:], start > 0 or len(rows) > count
+
+
+class HistoryStore:
+    """
+    Time-range queries over the monitor's output files in a directory.
+
+    Raw metrics are answered from the coarsest rollup file that still gives
+    at least `points` buckets in the range, otherwise from the raw CSV;
+    trend metrics come from the trend CSV.
+    """
+
+    def __init__(self, directory="."):
+        self.directory = directory
+        self._indexes = {}
+
+    def index(self, filename):
+        if filename not in self._indexes:
+            self._indexes[filename] = SeriesIndex(os.path.join(self.directory, filename))
+        return self._indexes[filename]
+
+    def pick_resolution(self, t_from, t_to, points):
+        if not t_from or not t_to:
+            return 0
+        span = parse_timestamp(t_to) - parse_timestamp(t_from)
+        for res in sorted(C.ROLLUP_RESOLUTIONS, reverse=True):
+            if span / res >= points and os.path.exists(os.path.join(self.directory, rollup_file(res))):
+                return res
+        return 0
+
+    def series(self, metrics, t_from=None, t_to=None, resolution="auto",
+               points=C.DEFAULT_SERIES_POINTS, limit=C.INITIAL_LOAD_COUNT, name=None,
+               method=C.DOWNSAMPLE_METHOD):
+        """
+        {"resolution", "timestamps", "series": {metric: [...]}, "has_more"}.
+
+        With t_from the rows in [t_from, t_to] are returned, reduced to about
+        `points` per target with `method` (see downsample.py). Without it the last `limit` rows before t_to are returned
+        (paging backwards), and has_more tells whether older rows exist.
+        """
+        t_from, t_to = _bound(t_from), _bound(t_to)
+        if not metrics or not all(metrics):
+            raise ValueError("metric is required")
+        if all(m in TREND_METRICS for m in metrics):
+            res, filename, columns = 0, C.DEFAULT_TREND_FILE, metrics
+        else:
+            unknown = [m for m in metrics if m not in RAW_METRICS]
+            if unknown:
+                raise ValueError(f"unknown metric(s): {', '.join(unknown)} "
+                                 f"(trend: {', '.join(TREND_METRICS)}; raw: {', '.join(RAW_METRICS)})")
+            rolled = all(m in ROLLUP_METRICS for m in metrics)     # 内存细分列没有 rollup
+            if resolution == "auto":
+                res = self.pick_resolution(t_from, t_to, points) if rolled else 0
+            else:
+                res = 0 if resolution == "raw" else int(resolution)
+                if res and res not in C.ROLLUP_RESOLUTIONS:
+                    raise ValueError(f"resolution must be auto, raw or one of {C.ROLLUP_RESOLUTIONS}")
+                if res and not rolled:
+                    raise ValueError(f"only {', '.join(ROLLUP_METRICS)} have rollups; use resolution=raw")
+            filename = rollup_file(res) if res else C.DEFAULT_RAW_FILE
+            columns = [f"{m}_mean" for m in metrics] if res else metrics
+
+        index = self.index(filename)
+        keep = None
+        if name:
+            keep = lambda row: _field(index, row, "name") == name
+        if t_from:
+            rows = [r for r in index.range(t_from, t_to) if keep is None or keep(r)]
+            has_more = bool(index.offsets) and index.times[0] < t_from
+        else:
+            rows, has_more = index.tail(limit, t_to, keep)
+
+        if not index.columns:      # nothing written yet
+            return {"resolution": res, "timestamps": [], "series": {m: [] for m in metrics}, "has_more": False}
+        missing = [c for c in columns if c not in index.columns]
+        if missing:
+            raise ValueError(f"unknown metric(s) for {filename}: {', '.join(missing)}")
+        positions = [index.columns.index(c) for c in columns]
+
+        group = None if name or "name" not in index.columns else index.columns.index("name")
+        rows = downsample.downsample_records(rows, positions, points, method, group)
+        return {
+            "resolution": res,
+            "timestamps": [r[0] for r in rows],
+            "series":     {m: [_number(r[p]) for r in rows] for m, p in zip(metrics, positions)},
+            "has_more":   has_more,
+        }
+
+
+def _bound(value):
+    """POSIX seconds or a CSV timestamp (with or without milliseconds) -> CSV timestamp."""
+    if value in (None, ""):
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = parse_timestamp(str(value))
+    return epoch_to_timestamp(seconds)
+
+
+def _field(index, row, column):
+    i = index.columns.index(column) if column in index.columns else -1
+    return row[i] if 0 <= i < len(row) else ""
+
+
+def _number(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+leak_detection.py
+-----------------
+Robust trend analysis for check_regression.py.
+
+A single least-squares slope over the whole run is fooled by warm-up growth
+(caches filling, pools allocating) and dilutes a leak that only starts late
+in the run. This module works on the series after a warm-up window and
+provides:
+
+  - theil_sen()        median of pairwise slopes; exact for short series,
+                       a fixed-size random sample of pairs for long ones
+  - rolling_slopes()   least-squares slope of every window of w points, O(n)
+  - change_point()     where a flat series turned into a growing one
+                       (best "hinge" fit: flat, then linear), every
+                       position scored at once from suffix sums, O(n)
+
+detect() runs them for every metric of one target and returns a
+JSON-ready dict.
+"""
+
+import numpy as np
+from timestamps import epoch_to_timestamp
+
+THEIL_SEN_EXACT_MAX     = 2000     # up to this many points every pair is used
+THEIL_SEN_PAIRS         = 200000   # pairs sampled beyond that
+CHANGE_POINT_MIN_POINTS = 5        # points required on each side of a change point (up to and including k / after k)
+
+METHODS = ["ls", "theil-sen"]
+
+
+def ls_slope(y):
+    n = len(y)
+    if n < 2:
+        return 0.0
+    dx = np.arange(n) - (n - 1) / 2.0
+    return float(dx @ (y - y.mean()) / (dx @ dx))
+
+
+def theil_sen(y, seed=0):
+    """Median of (y[j] - y[i]) / (j - i) over pairs i < j."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n < 2:
+        return 0.0
+    if n <= THEIL_SEN_EXACT_MAX:
+        i, j = np.triu_indices(n, k=1)
+    else:
+        rng = np.random.default_rng(seed)
+        i = rng.integers(0, n, THEIL_SEN_PAIRS)
+        j = rng.integers(0, n, THEIL_SEN_PAIRS)
+        keep = i != j
+        i, j = np.minimum(i, j)[keep], np.maximum(i, j)[keep]
+    return float(np.median((y[j] - y[i]) / (j - i)))
+
+
+def rolling_slopes(y, window):
+    """Least-squares slope of y[k:k+window] for every k (running sums, O(n))."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if window < 2 or n < window:
+        return np.empty(0)
+    g   = np.arange(n, dtype=np.float64)
+    cy  = np.concatenate(([0.0], np.cumsum(y)))
+    cgy = np.concatenate(([0.0], np.cumsum(g * y)))
+    k   = np.arange(n - window + 1)
+    sy  = cy[k + window] - cy[k]
+    sxy = (cgy[k + window] - cgy[k]) - k * sy       # x measured from the window start
+    sx  = window * (window - 1) / 2.0
+    sxx = (window - 1) * window * (2 * window - 1) / 6.0
+    return (window * sxy - sx * sy) / (window * sxx - sx * sx)
+
+
+def change_point(y):
+    """
+    Best fit of y = a + b * max(0, x - k) over every k that leaves at least
+    CHANGE_POINT_MIN_POINTS points in the flat part (x <= k) and as many in
+    the growing part (x > k). Returns (k, b): the point where growth started
+    and the slope after it, or (None, 0.0) if the series is too short.
+
+    With h = max(0, x - k) and y centred, the SSE reduction over a flat line
+    is (h·y)² / var-sum(h). For m = n-1-k points after k, h is 1..m, so
+    var-sum(h) is closed-form and h·y = Σ_{x>k} x·y - k·Σ_{x>k} y comes
+    from two suffix sums: one O(n) pass instead of an O(n) fit per k.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n < 2 * CHANGE_POINT_MIN_POINTS:
+        return None, 0.0
+    yc = y - y.mean()
+    first = CHANGE_POINT_MIN_POINTS - 1                       # k + 1 points up to k
+    k  = np.arange(first, n - CHANGE_POINT_MIN_POINTS)        # n - 1 - k points after k
+    s0 = np.cumsum(yc[::-1])[::-1]                            # s0[i] = Σ_{x>=i} y
+    s1 = np.cumsum((np.arange(n) * yc)[::-1])[::-1]           # s1[i] = Σ_{x>=i} x·y
+    shy = s1[k + 1] - k * s0[k + 1]
+    m   = (n - 1 - k).astype(np.float64)
+    shh = m * (m + 1) * (2 * m + 1) / 6.0 - (m * (m + 1) / 2.0) ** 2 / n   # > 0: h has zeros and m > 0
+    best = int(np.argmax(shy * shy / shh))
+    return int(k[best]), float(shy[best] / shh[best])
+
+
+def _timestamp(ts):
+    return epoch_to_timestamp(float(ts)) if isinstance(ts, (float, np.floating)) else str(ts)
+
+
+def detect(cols, metrics, method="ls", window=0, offset=0, slope_threshold=None):
+    """
+    {metric: {...}} for one target; cols are column arrays after the warm-up
+    has been removed, offset is the number of points removed (so reported
+    indices refer to the whole run). With slope_threshold, the change point
+    is only looked for in metrics whose slope or steepest window is above it
+    (the only ones a trend failure reports it for).
+    """
+    estimator = theil_sen if method == "theil-sen" else ls_slope
+    timestamps = cols["timestamp"]
+    report = {}
+    for m in metrics:
+        y = np.asarray(cols[m], dtype=np.float64)
+        entry = {"method": method, "slope": estimator(y)}
+
+        if window:
+            slopes = rolling_slopes(y, window)
+            if len(slopes):
+                worst = int(np.argmax(slopes))
+                entry["window"] = window
+                entry["max_window_slope"] = float(slopes[worst])
+                entry["max_window_start"] = _timestamp(timestamps[worst])
+
+        steepest = max(entry["slope"], entry.get("max_window_slope", entry["slope"]))
+        if slope_threshold is not None and steepest <= slope_threshold:
+            report[m] = entry
+            continue
+        k, after = change_point(y)
+        if k is not None:
+            entry["change_point"] = {"index": k + offset, "timestamp": _timestamp(timestamps[k]),
+                                     "slope_after": after}
+        report[m] = entry
+    return report
@@ -0,0 +1,209 @@
+"""
+Slow-cadence memory detail for the sampled processes.
+
+RSS counts shared pages (libraries, page cache of mapped files), so it is
+noisy and cannot tell a malloc leak apart from a growing mmap. MemoryDetail
+reads, on its own thread and every MEMORY_DETAIL_INTERVAL seconds per
+process:
+
+  uss_mb   pages only this process uses (what it would give back on exit)
+  pss_mb   RSS with shared pages divided among the processes sharing them
+  heap_mb  resident [heap] (brk) pages: small malloc allocations
+  anon_mb  other anonymous mappings: large allocations, malloc arenas, stacks
+  file_mb  file-backed mappings: executables, libraries, mmapped files
+
+On Linux all of these come from one pass over /proc/<pid>/smaps; the
+per-mapping RSS of that pass is diffed against the previous one, and the
+regions that grew or shrank most are written to memory_regions.csv. Other
+platforms get uss/pss from psutil's memory_full_info() and no breakdown.
+
+The sampling loop only picks up the latest values (a dictionary lookup), so
+the fast metrics path does not wait for any of this.
+"""
+
+import sys
+import threading
+import time
+import psutil
+import constants as C
+from csv_sink import CsvSink
+from timestamps import epoch_to_timestamp
+
+MB = 1024 * 1024
+_SMAPS = sys.platform.startswith("linux")
+_BLANK = [""] * len(C.MEMORY_DETAIL_COLUMNS)
+
+
+def read_smaps(pid):
+    """
+    Parse /proc/<pid>/smaps into (uss, pss, {region: (kind, rss)}), in bytes.
+    A region is a file path (all its mappings together), [heap], a named
+    kernel region such as [stack], or an unnamed anonymous mapping keyed by
+    its end address (new mmaps are placed below and merged into it, so the
+    end stays put while it grows); kind is "heap", "file" or "anon".
+    """
+    uss = pss = 0
+    regions = {}
+    key = kind = None
+    with open(f"/proc/{pid}/smaps", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            field, _, rest = line.partition(" ")
+            if not field.endswith(":"):
+                # mapping header: address perms offset dev inode [pathname]
+                parts = line.split(None, 5)
+                path = parts[5].strip() if len(parts) > 5 else ""
+                if path == "[heap]":
+                    key, kind = path, "heap"
+                elif path.startswith("/"):
+                    key, kind = path, "file"
+                else:
+                    key, kind = path or "[anon] ..." + parts[0].split("-")[1], "anon"
+            elif field == "Rss:":
+                rss = int(rest.split()[0]) * 1024
+                old = regions.get(key)
+                regions[key] = (kind, rss + (old[1] if old else 0))
+            elif field == "Pss:":
+                pss += int(rest.split()[0]) * 1024
+            elif field in ("Private_Clean:", "Private_Dirty:"):
+                uss += int(rest.split()[0]) * 1024
+    return uss, pss, regions
+
+
+def breakdown(regions):
+    """{kind: resident bytes} summed over the regions of read_smaps()."""
+    totals = {"heap": 0, "anon": 0, "file": 0}
+    for kind, rss in regions.values():
+        totals[kind] += rss
+    return totals
+
+
+def total(rows):
+    """Column-wise sum of several values() results; a column nobody has yet stays blank."""
+    out = []
+    for column in zip(*rows):
+        numbers = [v for v in column if v != ""]
+        out.append(round(sum(numbers), 2) if numbers else "")
+    return out
+
+
+class _Watched:
+    __slots__ = ("process", "name", "seen", "due", "regions", "values")
+
+    def __init__(self, process, name):
+        self.process = process
+        self.name    = name
+        self.seen    = time.monotonic()   # the sampling loop last asked for it
+        self.due     = 0.0                # time.monotonic() of the next detail pass
+        self.regions = None               # {region: (kind, rss)} of the last pass
+        self.values  = _BLANK             # latest MEMORY_DETAIL_COLUMNS values
+
+
+class MemoryDetail:
+    def __init__(self, regions_csv=None, interval=C.MEMORY_DETAIL_INTERVAL, stale=None):
+        self.interval = interval
+        # a process the sampling loop stopped asking for is let go after `stale` seconds
+        self.stale    = stale or 3 * interval
+        self.passes   = 0
+        self.cost     = 0.0     # seconds spent reading, over all passes
+        self._watched = {}      # pid -> _Watched
+        self._lock    = threading.Lock()
+        self._wake    = threading.Event()
+        self._stop    = threading.Event()
+        self._sink    = CsvSink(regions_csv, C.MEMORY_REGION_COLUMNS, threaded=True) if regions_csv else None
+        self._thread  = None
+
+    @property
+    def mean_cost_ms(self):
+        return self.cost / self.passes * 1000 if self.passes else 0.0
+
+    def values(self, process, name):
+        """
+        Latest MEMORY_DETAIL_COLUMNS values for process (blank until its first
+        pass); also keeps the process watched. Never blocks on a read.
+        """
+        w = self._watched.get(process.pid)
+        if w is None or w.process != process:     # new, or the pid was reused
+            w = _Watched(process, name)
+            with self._lock:
+                self._watched[process.pid] = w
+            self._wake.set()
+        w.seen = time.monotonic()
+        return w.values
+
+    # ── Background passes ────────────────────────────────────────────────────
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="MemoryDetail", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._sink is not None:
+            self._sink.close()
+        if self.passes:
+            print(f"MemoryDetail: {self.passes} passes, {self.mean_cost_ms:.3f} ms/pass")
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                for pid in [p for p, w in self._watched.items() if now - w.seen > self.stale]:
+                    del self._watched[pid]
+                due = [w for w in self._watched.values() if w.due <= now]
+            for w in due:
+                if self._stop.is_set():
+                    return
+                self._pass(w)
+            with self._lock:
+                next_due = min((w.due for w in self._watched.values()), default=now + self.interval)
+            self._wake.wait(max(next_due - time.monotonic(), 0))
+            self._wake.clear()
+
+    def _pass(self, w):
+        w.due = time.monotonic() + self.interval
+        start = time.perf_counter()
+        try:
+            if _SMAPS:
+                uss, pss, regions = read_smaps(w.process.pid)
+                kinds = breakdown(regions)
+                if w.regions is not None:
+                    self._write_growth(w, regions)
+                w.regions = regions
+                w.values = [round(uss / MB, 2), round(pss / MB, 2), round(kinds["heap"] / MB, 2),
+                            round(kinds["anon"] / MB, 2), round(kinds["file"] / MB, 2)]
+            else:
+                info = w.process.memory_full_info()
+                pss = getattr(info, "pss", None)
+                w.values = [round(info.uss / MB, 2), "" if pss is None else round(pss / MB, 2), "", "", ""]
+        except (FileNotFoundError, ProcessLookupError, psutil.NoSuchProcess):
+            with self._lock:
+                if self._watched.get(w.process.pid) is w:
+                    del self._watched[w.process.pid]
+            return
+        except (PermissionError, psutil.AccessDenied):
+            w.due = time.monotonic() + 10 * self.interval   # not ours to read; retry rarely
+            return
+        finally:
+            self.cost += time.perf_counter() - start
+        self.passes += 1
+
+    def _write_growth(self, w, regions):
+        """Write the regions whose RSS changed most since the last pass."""
+        if self._sink is None:
+            return
+        old = w.regions
+        changes = []
+        for key in regions.keys() | old.keys():
+            kind, rss = regions.get(key) or (old[key][0], 0)
+            delta = rss - (old[key][1] if key in old else 0)
+            if abs(delta) >= C.MEMORY_REGION_MIN_DELTA_MB * MB:
+                changes.append((abs(delta), key, kind, rss, delta))
+        timestamp = epoch_to_timestamp(time.time())
+        for _, key, kind, rss, delta in sorted(changes, reverse=True)[:C.MEMORY_REGION_TOP]:
+            self._sink.write([timestamp, w.process.pid, w.name, key, kind, round(rss / MB, 2), round(delta / MB, 2)])
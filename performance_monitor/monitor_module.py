@@ -1,159 +1,416 @@
+import json
+import subprocess
+import threading
 import psutil
 import time
-import csv
-import os
-from datetime import datetime
 import constants as C
-import platform
+from csv_sink import CsvSink
+from sample_store import BinarySink
+from collectors import get_collector
+from memory_detail import MemoryDetail, total
+from process_cache import get_table
+from process_tree import ProcessTree, aggregate
+from scheduler import DeadlineScheduler
+from timestamps import epoch_to_timestamp
 
 def get_process_by_name(process_name):
-    """Find a running process by its executable name."""
-    for proc in psutil.process_iter(['name']):
-        try:
-            if proc.info['name'].lower() == process_name.lower():
-                return proc
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-    return None
+    """
+    Find a running process by its executable name (case-insensitive).
+    Script names (e.g. MarketFetch.py) are also matched against the command
+    line, since the process itself is named after the interpreter.
+    Answered from the shared process table (see process_cache.py), not a scan.
+    """
+    return get_table().find(process_name)
+
+def parse_targets(exe_name=None, target_pid=None):
+    """
+    Build the list of MonitorTargets. Both arguments may be a single value,
+    a list, or (for exe_name) a comma-separated string. PIDs take precedence.
+    """
+    if target_pid:
+        pids = target_pid if isinstance(target_pid, (list, tuple)) else [target_pid]
+        return [MonitorTarget(pid=int(p)) for p in pids]
+    names = exe_name.split(',') if isinstance(exe_name, str) else list(exe_name or [])
+    return [MonitorTarget(exe_name=n.strip()) for n in names if n.strip()]
+
+def launch_target(command):
+    """
+    Spawn `command` and return a MonitorTarget for the child. The first
+    sample is taken as soon as the spawn returns, so nothing of the child's
+    startup is missed, and a reaper thread records its exit code and lifetime.
+    """
+    t = MonitorTarget()
+    t.exited  = threading.Event()
+    t.started = time.monotonic()
+    t.popen   = subprocess.Popen(command)
+    t.pid     = t.popen.pid
+    print(f"Launched {' '.join(command)} (PID: {t.pid})")
+
+    def reap():
+        t.exit_code = t.popen.wait()
+        t.lifetime  = time.monotonic() - t.started
+        t.exited.set()
+    threading.Thread(target=reap, name=f"reap-{t.pid}", daemon=True).start()
+    return t
+
+class MonitorTarget:
+    """One followed process: how to find it, plus its per-process sampling state."""
+
+    def __init__(self, exe_name=None, pid=None):
+        self.exe_name    = exe_name
+        self.pid         = pid         # fixed PID — the target ends when it exits
+        self.process     = None
+        self.proc_name   = None        # process.name(), looked up once per attach
+        self.finished    = False
+        self.next_search = 0.0         # time.monotonic() before which we don't rescan (after errors)
+        self.waiting     = False       # "Waiting for ... to start" already printed
+        self.popen       = None        # launch mode: the child we spawned (see launch_target)
+        self.exited      = None        # threading.Event set when that child has exited
+        self.started     = None        # time.monotonic() at spawn
+        self.exit_code   = None
+        self.lifetime    = None        # seconds from spawn to exit
+        self.tree        = None        # tree mode: ProcessTree rooted at self.process
+        self.data_buffer = []
+        self.reset_baseline()
 
-def start_performance_monitor(exe_name, raw_csv, trend_csv, interval_sec=1, trend_limit=20, target_pid=None):
+    @property
+    def label(self):
+        return self.exe_name or f"PID {self.pid}"
+
+    @property
+    def name(self):
+        """Name recorded in the CSV / pushed to the dashboard."""
+        return self.exe_name or self.proc_name
+
+    def reset_baseline(self):
+        # Track previous ctx switch counts to compute per-second delta
+        self.prev_ctx_vol   = None
+        self.prev_ctx_invol = None
+        self.prev_time      = None
+
+def _wait(stop_event, seconds):
+    """Sleep for `seconds`; return True if stop_event was set meanwhile."""
+    if stop_event is None:
+        time.sleep(seconds)
+        return False
+    return stop_event.wait(seconds)
+
+def start_performance_monitor(exe_name, raw_csv, trend_csv, interval_sec=1, trend_limit=20, target_pid=None,
+                              on_raw=None, on_trend=None, stop_event=None, async_csv=False, fast_proc=False,
+                              raw_bin=None, trend_bin=None, rollups=None, launch=None, launch_info=None,
+                              tree=False, tree_csv=None, memory_detail=False, memory_regions_csv=None):
     """
-    Monitors a specific process and logs metrics to a CSV file.
+    Monitors one or more processes and logs metrics to a CSV file.
     Tracks: context switches (voluntary + involuntary), memory, threads, handles.
 
     Context switch rate (per second) is more meaningful than CPU% for
     diagnosing thread scheduling pressure and contention.
+
+    exe_name / target_pid may name several targets (see parse_targets);
+    all of them are sampled in the same tick and every record is tagged
+    with the target's pid and name.
+
+    When embedded in another process (see sampler_engine.py):
+      on_raw / on_trend  callbacks receiving each record as a dict
+      stop_event         threading.Event that ends the loop when set
+      raw_csv/trend_csv  may be None to skip CSV persistence
+      async_csv          write CSV from a background thread
+
+    fast_proc selects the /proc parsing collector on Linux (see collectors.py).
+    raw_bin / trend_bin additionally store the records in the binary
+    format of sample_store.py.
+    rollups is an optional rollup.RollupEngine fed with every raw sample;
+    it is closed (flushing its partial buckets) when the monitor stops.
+
+    launch is a command (list) to spawn and follow from spawn to exit
+    instead of exe_name / target_pid. Its exit code is returned, and it
+    is written with the lifetime to the launch_info JSON file if given.
+    If the monitor stops first, the child is terminated.
+
+    tree=True samples every target together with its descendants (see
+    process_tree.py): the raw/trend records carry the sums over the tree,
+    and tree_csv, if given, gets one row per member process.
+
+    memory_detail=True fills the uss/pss/heap/anon/file columns from a
+    slower background reader (see memory_detail.py); memory_regions_csv,
+    if given, records which mappings grew. Without it they stay blank.
     """
     print(f"Starting monitor")
-    
-    # Ensure CSV has headers if it's a new file
-    if not os.path.exists(raw_csv):
-        with open(raw_csv, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(C.RAW_COLUMNS)
 
-    process = None
-    data_buffer = []
+    raw_sinks   = _open_sinks(raw_csv,   raw_bin,   C.RAW_COLUMNS,   async_csv)
+    trend_sinks = _open_sinks(trend_csv, trend_bin, C.TREND_COLUMNS, async_csv)
+    tree_sinks  = _open_sinks(tree_csv,  None,      C.TREE_COLUMNS,  async_csv) if tree else None
+    collector   = get_collector(fast_proc)
+    detail      = MemoryDetail(memory_regions_csv, stale=3 * max(C.MEMORY_DETAIL_INTERVAL, interval_sec)).start() \
+        if memory_detail else None
+    launched    = launch_target(launch) if launch else None
+    try:
+        _monitor_loop([launched] if launched else parse_targets(exe_name, target_pid), collector,
+                      raw_sinks, trend_sinks, rollups, interval_sec, trend_limit, on_raw, on_trend, stop_event,
+                      tree_sinks, detail)
+    finally:
+        if launched:
+            _end_launch(launched, launch, launch_info)
+        # Flush buffered rows even on SIGTERM / Ctrl+C (see run_monitor.py)
+        print(f"{type(collector).__name__}: {collector.samples} samples, "
+              f"{collector.mean_cost_ms:.3f} ms/sample")
+        if detail:
+            detail.stop()
+        for sink in raw_sinks + trend_sinks + (tree_sinks or []):
+            sink.close()
+        if rollups:
+            rollups.close()
+    return launched.exit_code if launched else None
 
-    # Track previous ctx switch counts to compute per-second delta
-    prev_ctx_vol  = None
-    prev_ctx_invol = None
-    prev_time     = None
+def _end_launch(t, command, info_path):
+    """Terminate the child if the monitor stopped first, then record how it ended."""
+    if not t.exited.is_set():
+        print(f"Monitor stopping, terminating PID {t.pid}")
+        t.popen.terminate()
+        if not t.exited.wait(5):
+            t.popen.kill()
+        t.exited.wait()
+    print(f"PID {t.pid} exited with code {t.exit_code} after {t.lifetime:.3f}s")
+    if info_path:
+        with open(info_path, 'w', encoding='utf-8') as f:
+            json.dump({"command": command, "pid": t.pid, "exit_code": t.exit_code,
+                       "lifetime": round(t.lifetime, 3)}, f)
 
-    if target_pid:
-        try:
-            process = psutil.Process(target_pid)
-        except psutil.NoSuchProcess:
-            print(f"❌ PID {target_pid} not found.")
-            return
+def _open_sinks(csv_path, bin_path, columns, threaded):
+    sinks = []
+    if csv_path:
+        sinks.append(CsvSink(csv_path, columns, threaded=threaded))
+    if bin_path:
+        sinks.append(BinarySink(bin_path, columns, threaded=threaded))
+    return sinks
 
-    while True:
+def _monitor_loop(targets, collector, raw_sinks, trend_sinks, rollups, interval_sec, trend_limit,
+                  on_raw, on_trend, stop_event, tree_sinks=None, detail=None):
+    for t in targets:
+        if t.pid:
+            try:
+                t.process = psutil.Process(t.pid)
+                t.proc_name = t.process.name()
+            except psutil.NoSuchProcess:
+                print(f"❌ PID {t.pid} not found.")
+                t.finished = True
+
+    def step(t):
+        """Attach (if needed) and sample one target; True if it was sampled."""
         try:
-            # Re-check for process if it wasn't found or was closed
-            if process is None or not process.is_running():
-                if target_pid:
-                    print("Target process finished. Stopping monitor.")
-                    break
-                process = get_process_by_name(exe_name)
-                if process is None:
-                    print(f"Waiting for {exe_name} to start...")
-                    time.sleep(5)
-                    continue
-                else:
-                    print(f"Process {exe_name} found (PID: {process.pid})")
-                    # Reset ctx baseline when process is (re)found
-                    prev_ctx_vol   = None
-                    prev_ctx_invol = None
-                    prev_time      = None
-
-            # ── 1. Context Switches (delta per second) ───────────────────────
-            ctx        = process.num_ctx_switches()
-            now        = time.time()
-
-            if prev_ctx_vol is None:
-                # First sample — just capture baseline, record 0
-                ctx_vol_rate   = 0
-                ctx_invol_rate = 0
-            else:
-                elapsed        = now - prev_time if (now - prev_time) > 0 else 1
-                ctx_vol_rate   = (ctx.voluntary   - prev_ctx_vol)   / elapsed
-                ctx_invol_rate = (ctx.involuntary  - prev_ctx_invol) / elapsed
-
-            prev_ctx_vol   = ctx.voluntary
-            prev_ctx_invol = ctx.involuntary
-            prev_time      = now
-
-            # ── 2. Memory (RSS) ───────────────────────────────────────────────
-            mem_mb = process.memory_info().rss / (1024 * 1024)
-
-            # ── 3. Thread Count ───────────────────────────────────────────────
-            threads = process.num_threads()
-
-            # ── 4. Handle / FD Count ──────────────────────────────────────────
-            if platform.system() == "Windows":
-                handles = process.num_handles()
-            else:
-                handles = process.num_fds()
-
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            # RAW record: timestamp, ctx_vol/s, ctx_invol/s, threads, handles, memory_mb
-            record = [
-                timestamp,
-                round(ctx_vol_rate,   1),
-                round(ctx_invol_rate, 1),
-                threads,
-                handles,
-                round(mem_mb, 2)
-            ]
-
-            # Write raw CSV
-            with open(raw_csv, 'a', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(record)
-                f.flush()
-
-            data_buffer.append({
-                'ctx_vol':   ctx_vol_rate,
-                'ctx_invol': ctx_invol_rate,
-                'mem':       mem_mb,
-                'threads':   threads,
-                'handles':   handles,
-            })
-
-            # ── Aggregate into trend point ────────────────────────────────────
-            if len(data_buffer) >= trend_limit:
-                avg_ctx_vol   = sum(d['ctx_vol']   for d in data_buffer) / len(data_buffer)
-                avg_ctx_invol = sum(d['ctx_invol'] for d in data_buffer) / len(data_buffer)
-                avg_mem       = sum(d['mem']        for d in data_buffer) / len(data_buffer)
-                avg_thr       = sum(d['threads']    for d in data_buffer) / len(data_buffer)
-                avg_hnd       = sum(d['handles']    for d in data_buffer) / len(data_buffer)
-
-                f_tr_ex = os.path.exists(trend_csv)
-                with open(trend_csv, 'a', newline='') as f:
-                    writer = csv.writer(f)
-                    if not f_tr_ex:
-                        writer.writerow(C.TREND_COLUMNS)
-                    writer.writerow([
-                        timestamp,
-                        round(avg_ctx_vol,   1),
-                        round(avg_ctx_invol, 1),
-                        round(avg_mem,       2),
-                        int(avg_thr),
-                        int(avg_hnd)
-                    ])
-
-                data_buffer = []
-
-            time.sleep(interval_sec)
-
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            print("Process lost or access denied. Searching again...")
-            process        = None
-            prev_ctx_vol   = None
-            prev_ctx_invol = None
-            prev_time      = None
-            time.sleep(2)
+            if _attach(t):
+                if tree_sinks is not None:
+                    if t.tree is None or t.tree.root != t.process:     # psutil compares pid and create time
+                        t.tree = ProcessTree(t.process)
+                    t.tree.update(get_table(), interval_sec)
+                _sample(t, collector, raw_sinks, trend_sinks, rollups, trend_limit, on_raw, on_trend, tree_sinks,
+                        detail)
+                return True
+        except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+            print(f"{t.label}: process lost or access denied. Searching again...")
+            t.process = None
+            t.reset_baseline()
+            # An exited process is searched for again at once (a restart is picked up
+            # immediately); access errors back off
+            if isinstance(e, psutil.AccessDenied):
+                t.next_search = time.monotonic() + 2
         except Exception as e:
-            print(f"Unexpected error: {e}")
-            time.sleep(5)
\ No newline at end of file
+            print(f"{t.label}: unexpected error: {e}")
+            t.next_search = time.monotonic() + 5
+        return False
+
+    scheduler = DeadlineScheduler(interval_sec)
+    while stop_event is None or not stop_event.is_set():
+        active = [t for t in targets if not t.finished]
+        if not active:
+            print("All target processes finished. Stopping monitor.")
+            break
+
+        sampled = sum(step(t) for t in active)
+        for t in active:
+            if t.finished:
+                _flush_trend(t, trend_sinks, on_trend)   # final point from the last partial buffer
+
+        for sink in raw_sinks + trend_sinks + (tree_sinks or []):
+            sink.tick()
+        if rollups:
+            rollups.tick()
+
+        if sampled:
+            # A target that starts meanwhile is sampled right away, then joins the schedule
+            _idle(active, scheduler.next_delay(), stop_event, lambda t: step(t) and False)
+        else:
+            # Nothing attached yet: wake as soon as a target starts,
+            # then restart the sampling schedule from that point
+            _idle(active, interval_sec, stop_event, lambda t: True)
+            scheduler.reset()
+
+    if scheduler.missed:
+        print(f"⚠️ {scheduler.missed} sampling tick(s) missed during this run")
+
+def _idle(targets, delay, stop_event, on_found):
+    """
+    Wait `delay` seconds while watching the process table: a named target
+    whose process exits is let go once the table drops it, and on_found(t) is
+    called the moment a target that is not running starts. A true result ends
+    the wait, as does the exit of a launched child.
+    """
+    table    = get_table()
+    deadline = time.monotonic() + delay
+    named    = [t for t in targets if t.exe_name]   # fixed-PID targets are not looked up by name
+    launched = [t for t in targets if t.exited is not None]
+    if not named and not launched:
+        _wait(stop_event, delay)
+        return
+    while stop_event is None or not stop_event.is_set():
+        now = time.monotonic()
+        if now >= deadline or any(t.exited.is_set() for t in launched):
+            return
+        if not named:
+            launched[0].exited.wait(min(deadline - now, C.PROCESS_WAIT_POLL))
+            continue
+        for t in named:
+            if t.process is not None and not table.has(t.process.pid):
+                print(f"{t.label}: process exited. Waiting for it to restart...")
+                t.process = None
+                t.reset_baseline()
+            if t.process is None and t.next_search <= now and table.pids(t.exe_name) and on_found(t):
+                return
+        # Poll the table only while a target is missing; an exit of an attached
+        # one is picked up by the background refresh (or a proc event)
+        table.wait_change(deadline - now, poll=any(t.process is None for t in named))
+
+def _attach(t):
+    """Make sure target t has a live process. Returns False if it can't be sampled this tick."""
+    if t.process is not None and t.process.is_running():
+        return True
+    if t.pid:
+        print(f"Target process {t.label} finished.")
+        t.finished = True
+        return False
+    if time.monotonic() < t.next_search:
+        return False
+    t.process = get_process_by_name(t.exe_name)
+    if t.process is None:
+        if not t.waiting:
+            print(f"Waiting for {t.exe_name} to start...")
+            t.waiting = True
+        return False
+    print(f"Process {t.exe_name} found (PID: {t.process.pid})")
+    t.waiting = False
+    t.proc_name = t.process.name()
+    # Reset ctx baseline when process is (re)found
+    t.reset_baseline()
+    return True
+
+def _sample(t, collector, raw_sinks, trend_sinks, rollups, trend_limit, on_raw, on_trend, tree_sinks=None,
+            detail=None):
+    process = t.process
+    name    = t.name
+    blank   = [""] * len(C.MEMORY_DETAIL_COLUMNS)
+
+    if t.tree is not None:
+        # Tree mode: every member is read, the record carries the sums (see process_tree.py)
+        members = t.tree.collect(collector)
+        ctx_vol_rate, ctx_invol_rate, mem_mb, threads, handles = aggregate(members)
+        member_detail = [detail.values(m.process, m.name) if detail else blank for m, _, _, _ in members]
+        memory = total(member_detail)
+    else:
+        members = None
+        sample  = collector.collect(process)
+
+        # ── 1. Context Switches (delta per second, on the monotonic clock) ───
+        now = time.monotonic()
+        if t.prev_ctx_vol is None:
+            # First sample — just capture baseline, record 0
+            ctx_vol_rate   = 0
+            ctx_invol_rate = 0
+        else:
+            elapsed        = now - t.prev_time if (now - t.prev_time) > 0 else 1
+            ctx_vol_rate   = (sample.ctx_vol   - t.prev_ctx_vol)   / elapsed
+            ctx_invol_rate = (sample.ctx_invol - t.prev_ctx_invol) / elapsed
+
+        t.prev_ctx_vol   = sample.ctx_vol
+        t.prev_ctx_invol = sample.ctx_invol
+        t.prev_time      = now
+
+        # ── 2. Memory (RSS) / 3. Threads / 4. Handles (FDs on POSIX) ────────
+        mem_mb  = sample.rss / (1024 * 1024)
+        threads = sample.threads
+        handles = sample.handles
+
+        # ── 5. USS / PSS / heap vs. mmap: latest values of the slow reader ──
+        memory = detail.values(process, name) if detail else blank
+
+    wall_time = time.time()
+    timestamp = epoch_to_timestamp(wall_time)
+
+    # RAW record: timestamp, ctx_vol/s, ctx_invol/s, threads, handles, memory_mb, pid, name, memory detail
+    record = [
+        timestamp,
+        round(ctx_vol_rate,   1),
+        round(ctx_invol_rate, 1),
+        threads,
+        handles,
+        round(mem_mb, 2),
+        process.pid,
+        name
+    ] + list(memory)
+
+    # Tree mode: one row per member process
+    if members and tree_sinks:
+        for (m, ms, vol, invol), mem in zip(members, member_detail):
+            row = [timestamp, round(vol, 1), round(invol, 1), ms.threads, ms.handles,
+                   round(ms.rss / (1024 * 1024), 2), m.process.pid, m.name] + list(mem) + [m.ppid, process.pid]
+            for sink in tree_sinks:
+                sink.write(row)
+
+    # Write raw CSV / hand the sample to the embedding process
+    for sink in raw_sinks:
+        sink.write(record)
+    if on_raw or rollups:
+        row = dict(zip(C.RAW_COLUMNS, record))
+        if on_raw:
+            on_raw(row)
+        if rollups:
+            rollups.add(wall_time, process.pid, name, row)
+
+    t.data_buffer.append({
+        'ctx_vol':   ctx_vol_rate,
+        'ctx_invol': ctx_invol_rate,
+        'mem':       mem_mb,
+        'threads':   threads,
+        'handles':   handles,
+    })
+
+    # ── Aggregate into trend point ────────────────────────────────────
+    if len(t.data_buffer) >= trend_limit:
+        _flush_trend(t, trend_sinks, on_trend, timestamp, process.pid)
+
+def _flush_trend(t, trend_sinks, on_trend, timestamp=None, pid=None):
+    """Write the mean of t.data_buffer as one trend point (no-op when it is empty)."""
+    data_buffer = t.data_buffer
+    if not data_buffer:
+        return
+    avg_ctx_vol   = sum(d['ctx_vol']   for d in data_buffer) / len(data_buffer)
+    avg_ctx_invol = sum(d['ctx_invol'] for d in data_buffer) / len(data_buffer)
+    avg_mem       = sum(d['mem']        for d in data_buffer) / len(data_buffer)
+    avg_thr       = sum(d['threads']    for d in data_buffer) / len(data_buffer)
+    avg_hnd       = sum(d['handles']    for d in data_buffer) / len(data_buffer)
+
+    trend_record = [
+        timestamp or epoch_to_timestamp(time.time()),
+        round(avg_ctx_vol,   1),
+        round(avg_ctx_invol, 1),
+        round(avg_mem,       2),
+        round(avg_thr,       1),
+        round(avg_hnd,       1),
+        pid or t.pid,
+        t.name
+    ]
+    for sink in trend_sinks:
+        sink.write(trend_record)
+    if on_trend:
+        on_trend(dict(zip(C.TREND_COLUMNS, trend_record)))
+
+    t.data_buffer = []
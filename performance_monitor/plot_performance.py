@@ -5,6 +5,22 @@ import matplotlib.dates as mdates
 import argparse
 import os
 import sys
+from datetime import datetime
+import sample_store
+
+def read_samples(path):
+    """Load a raw/trend CSV or binary sample store (.bin) into a DataFrame."""
+    if path.endswith('.bin'):
+        df = pd.DataFrame(sample_store.load(path))
+        local_tz = datetime.now().astimezone().tzinfo
+        df['timestamp'] = (pd.to_datetime(df['timestamp'], unit='s', utc=True)
+                           .dt.tz_convert(local_tz).dt.tz_localize(None))
+        if 'name' in df.columns:
+            df['name'] = df['name'].map(dict(enumerate(sample_store.load_names(path))))
+        return df
+    df = pd.read_csv(path)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df
 
 def draw_perf_subplots(csv_file, output_name, title_prefix):
     """通用绘图逻辑"""
@@ -14,7 +30,7 @@ def draw_perf_subplots(csv_file, output_name, title_prefix):
         sys.exit(1) 
 
     try:
-        df = pd.read_csv(csv_file)
+        df = read_samples(csv_file)
         if df.empty:
             print(f"⚠️ Warning: {csv_file} is empty. Skipping.")
             return
@@ -22,19 +38,28 @@ def draw_perf_subplots(csv_file, output_name, title_prefix):
         # 智能识别表头 (Raw: memory_mb, Trend: avg_memory)
         mem_col = 'memory_mb' if 'memory_mb' in df.columns else 'avg_memory'
         hnd_col = 'handles' if 'handles' in df.columns else 'avg_handles'
-        
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+
 
         fig, (ax_mem, ax_hnd) = plt.subplots(2, 1, figsize=(11, 8), sharex=True)
 
-        # 内存趋势
-        ax_mem.plot(df['timestamp'], df[mem_col], color='#1f77b4', linewidth=1.5, marker='.', markersize=4)
+        # 多进程监控时每个目标一条曲线
+        groups = list(df.groupby('name', sort=False)) if 'name' in df.columns else [(None, df)]
+        multi  = len(groups) > 1
+
+        for name, g in groups:
+            # 内存趋势
+            ax_mem.plot(g['timestamp'], g[mem_col], color=None if multi else '#1f77b4',
+                        linewidth=1.5, marker='.', markersize=4, label=name)
+            # 句柄趋势
+            ax_hnd.plot(g['timestamp'], g[hnd_col], color=None if multi else '#d62728',
+                        linewidth=1.5, marker='.', markersize=4, label=name)
+
         ax_mem.set_ylabel('Memory (MB)')
         ax_mem.set_title(f'{title_prefix} Performance Metrics', fontsize=14)
         ax_mem.grid(True, alpha=0.3)
+        if multi:
+            ax_mem.legend()
 
-        # 句柄趋势
-        ax_hnd.plot(df['timestamp'], df[hnd_col], color='#d62728', linewidth=1.5, marker='.', markersize=4)
         ax_hnd.set_ylabel('Handles Count')
         ax_hnd.set_xlabel('Time')
         ax_hnd.grid(True, alpha=0.3)
@@ -0,0 +1,329 @@
+"""
+Cached table of running processes with a name -> pids index and a
+parent -> children index (for process-tree sampling).
+
+A refresh lists the pids (one listdir of /proc on Linux) and only reads
+the processes that appeared since the last refresh; pids that are gone are
+dropped. The name and the script arguments (*.py, for interpreters) are
+read once per process, so lookups are dictionary hits instead of a scan of
+every process. A process is read once more on the refresh after it first
+appeared, since a fork may not have exec'd its final program yet.
+
+start() keeps the table fresh from a background thread every `ttl`
+seconds. On Linux, if permitted (root / CAP_NET_ADMIN), the netlink proc
+connector additionally wakes that thread as soon as a process forks,
+execs, exits or renames itself. Without the thread, lookups refresh the table
+themselves once it is older than `ttl`.
+
+wait_for() / wait_change() block until a named process appears / the
+table changes, woken by every refresh that adds or drops a process; a launcher that knows the pid of what it just
+started can announce() it so waiters do not even wait for a refresh, and
+one in another process can make this one wake() (run_monitor.py does so
+on SIGUSR1).
+"""
+
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+import psutil
+import constants as C
+
+# create_time tells a reused pid apart from the process it was recorded for
+Entry = namedtuple("Entry", ["pid", "create_time", "name", "scripts", "ppid"])
+
+# ── Netlink proc connector (linux/connector.h, linux/cn_proc.h) ─────────────
+NETLINK_CONNECTOR    = 11
+CN_IDX_PROC          = 1
+CN_VAL_PROC          = 1
+PROC_CN_MCAST_LISTEN = 1
+NLMSG_DONE           = 3
+PROC_EVENT_FORK      = 0x00000001
+PROC_EVENT_EXEC      = 0x00000002
+PROC_EVENT_COMM      = 0x00000200
+PROC_EVENT_EXIT      = 0x80000000
+_EVENT_OFFSET        = 16 + 20   # nlmsghdr + cn_msg, then proc_event.what
+_EVENT_TGID_OFFSET   = _EVENT_OFFSET + 20   # what, cpu, timestamp_ns, pid, then tgid
+
+
+def proc_events_socket():
+    """A netlink socket subscribed to process events, or None if unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+        sock.bind((0, CN_IDX_PROC))
+        payload = struct.pack("=IIIIHHI", CN_IDX_PROC, CN_VAL_PROC, 0, 0, 4, 0, PROC_CN_MCAST_LISTEN)
+        sock.send(struct.pack("=IHHII", 16 + len(payload), NLMSG_DONE, 0, 0, 0) + payload)
+        return sock
+    except (OSError, AttributeError) as e:
+        print(f"DEBUG: Process events unavailable ({e}), polling every {C.PROCESS_TABLE_TTL}s")
+        return None
+
+
+def _read_entry(pid):
+    try:
+        p = psutil.Process(pid)
+        with p.oneshot():
+            name = p.name()
+            try:
+                scripts = tuple(os.path.basename(a).lower() for a in p.cmdline() if a.lower().endswith(".py"))
+            except psutil.AccessDenied:
+                scripts = ()
+            return Entry(pid, p.create_time(), name, scripts, p.ppid())
+    except psutil.NoSuchProcess:
+        return None
+    except (psutil.AccessDenied, psutil.ZombieProcess):
+        return Entry(pid, 0.0, "", (), None)   # kept (unnamed) so it is not re-read on every refresh
+
+
+class ProcessTable:
+    def __init__(self, ttl=C.PROCESS_TABLE_TTL, events=C.PROCESS_EVENTS):
+        self.ttl = ttl
+        self.events = events
+        self.refreshed = 0.0           # time.monotonic() of the last refresh
+        self.refreshes = 0
+        self._entries = {}             # pid -> Entry
+        self._by_name = {}             # lower-case name -> {pid}
+        self._by_script = {}           # lower-case script basename -> {pid}
+        self._children = {}            # ppid -> {pid}
+        self._names = None             # sorted display names, rebuilt when the table changed
+        self._recheck = set()          # pids to read again: new last refresh, or exec'd / renamed
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)   # notified when processes are added
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    # ── Refresh ──────────────────────────────────────────────────────────────
+    def refresh(self):
+        """Bring the table up to date; returns (added, removed) pid counts."""
+        with self._refresh_lock:
+            current = set(psutil.pids())
+            with self._lock:
+                known = set(self._entries)
+                recheck, self._recheck = self._recheck & current & known, set()
+            new = current - known
+            added = [e for e in map(_read_entry, new | recheck) if e is not None]
+            gone = known - current
+            with self._lock:
+                for pid in gone | recheck:
+                    self._remove(pid)
+                for entry in added:
+                    self._add(entry)
+                self._recheck |= new
+                if added or gone:
+                    self._names = None
+                    self._changed.notify_all()
+            self.refreshed = time.monotonic()
+            self.refreshes += 1
+            return len(new), len(gone)
+
+    def _add(self, entry):
+        self._entries[entry.pid] = entry
+        if entry.name:
+            self._by_name.setdefault(entry.name.lower(), set()).add(entry.pid)
+        for script in entry.scripts:
+            self._by_script.setdefault(script, set()).add(entry.pid)
+        if entry.ppid is not None:
+            self._children.setdefault(entry.ppid, set()).add(entry.pid)
+
+    def _remove(self, pid):
+        entry = self._entries.pop(pid, None)
+        if entry is None:
+            return
+        keys = [(self._by_name, entry.name.lower()), (self._children, entry.ppid)]
+        for index, key in keys + [(self._by_script, s) for s in entry.scripts]:
+            pids = index.get(key)
+            if pids is not None:
+                pids.discard(pid)
+                if not pids:
+                    del index[key]
+
+    def _ensure_fresh(self):
+        if not self._threads and time.monotonic() - self.refreshed >= self.ttl:
+            self.refresh()
+
+    # ── Lookups ──────────────────────────────────────────────────────────────
+    def names(self):
+        """Sorted unique names of the running processes."""
+        self._ensure_fresh()
+        with self._lock:
+            if self._names is None:
+                self._names = sorted({e.name for e in self._entries.values() if e.name})
+            return self._names
+
+    def pids(self, name):
+        """Pids whose name is `name` (case-insensitive); *.py names also match script arguments."""
+        self._ensure_fresh()
+        wanted = name.lower()
+        with self._lock:
+            pids = set(self._by_name.get(wanted, ()))
+            if wanted.endswith(".py"):
+                pids |= self._by_script.get(wanted, set())
+            return sorted(pids, key=lambda pid: self._entries[pid].create_time)
+
+    def find(self, name):
+        """The oldest live (non-zombie) process called `name` as a psutil.Process, or None."""
+        for pid in self.pids(name):
+            with self._lock:
+                entry = self._entries.get(pid)
+            try:
+                proc = psutil.Process(pid)
+                if (entry is not None and proc.create_time() == entry.create_time
+                        and proc.status() != psutil.STATUS_ZOMBIE):
+                    return proc
+            except psutil.NoSuchProcess:
+                pass
+            self._forget(pid)   # exited or pid reused since the last refresh
+        return None
+
+    def descendants(self, pid, limit=None):
+        """Pids below pid in the process tree, breadth-first (nearest first), at most `limit`."""
+        self._ensure_fresh()
+        found, seen, i = [], {pid}, -1
+        with self._lock:
+            parent = pid
+            while limit is None or len(found) < limit:
+                for child in sorted(self._children.get(parent, ())):
+                    if child not in seen:     # guards against cycles from a reused pid
+                        seen.add(child)
+                        found.append(child)
+                i += 1
+                if i >= len(found):
+                    break
+                parent = found[i]
+        return found[:limit] if limit is not None else found
+
+    def entry(self, pid):
+        """The table's Entry for pid, or None."""
+        with self._lock:
+            return self._entries.get(pid)
+
+    def has(self, pid):
+        """True while pid is in the table (it has not exited as of the last refresh)."""
+        with self._lock:
+            return pid in self._entries
+
+    def wait_change(self, timeout, poll=True):
+        """
+        Block until processes were added to or removed from the table, at most
+        `timeout` seconds; True if something changed. Without proc events the
+        table is refreshed every PROCESS_WAIT_POLL seconds while waiting; with
+        poll=False it is not, and a change is only seen once the background
+        refresh (every ttl), announce() or wake() finds it.
+        """
+        with self._changed:
+            changed = self._changed.wait(min(timeout, C.PROCESS_WAIT_POLL) if poll else timeout)
+        if not changed and poll and len(self._threads) < 2:     # no event listener: poll
+            changed = any(self.refresh())
+        return changed
+
+    def wait_for(self, names, timeout, stop_event=None):
+        """
+        Block until a process called one of `names` is in the table and return
+        that name; None after `timeout` seconds or once stop_event is set.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            for name in names:
+                if self.pids(name):
+                    return name
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (stop_event is not None and stop_event.is_set()):
+                return None
+            self.wait_change(remaining)
+
+    def announce(self, pid):
+        """Add a process its launcher just started, waking wait_for() right away."""
+        entry = _read_entry(pid)
+        if entry is None:
+            return
+        with self._lock:
+            self._remove(pid)
+            self._add(entry)
+            self._recheck.add(pid)
+            self._names = None
+            self._changed.notify_all()
+
+    def wake(self):
+        """Refresh from the background thread now instead of at the next ttl (signal-safe)."""
+        self._wake.set()
+
+    def _forget(self, pid):
+        entry = _read_entry(pid)
+        with self._lock:
+            self._remove(pid)
+            if entry is not None:
+                self._add(entry)
+            self._names = None
+
+    # ── Background refresh ───────────────────────────────────────────────────
+    def start(self):
+        if self._threads:
+            return self
+        self._stop.clear()
+        self.refresh()
+        self._threads = [threading.Thread(target=self._run, name="ProcessTable", daemon=True)]
+        sock = proc_events_socket() if self.events else None
+        if sock is not None:
+            self._threads.append(threading.Thread(target=self._listen, args=(sock,),
+                                                  name="ProcessEvents", daemon=True))
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._wake.wait(self.ttl):
+                self._stop.wait(C.PROCESS_EVENT_DEBOUNCE)   # 合并同一批事件
+                self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"ProcessTable refresh error: {e}")
+
+    def _listen(self, sock):
+        sock.settimeout(0.5)
+        with sock:
+            while not self._stop.is_set():
+                try:
+                    data = sock.recv(4096)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                if len(data) < _EVENT_TGID_OFFSET + 4:
+                    continue
+                what = struct.unpack_from("=I", data, _EVENT_OFFSET)[0]
+                if what & (PROC_EVENT_EXEC | PROC_EVENT_COMM):
+                    with self._lock:
+                        self._recheck.add(struct.unpack_from("=I", data, _EVENT_TGID_OFFSET)[0])
+                if what & (PROC_EVENT_FORK | PROC_EVENT_EXEC | PROC_EVENT_COMM | PROC_EVENT_EXIT):
+                    self._wake.set()
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_table():
+    """The process-wide table, started on first use."""
+    global _table
+    with _table_lock:
+        if _table is None:
+            _table = ProcessTable().start()
+        return _table
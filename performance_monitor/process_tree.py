@@ -0,0 +1,99 @@
+"""
+Process-tree sampling: a target together with everything it forked or spawned.
+
+ProcessTree keeps the target's descendants as a cached member set and
+diffs it every tick against the process table's parent -> children index
+(see process_cache.py), so no children(recursive=True) walk is made.
+Each member is read with the normal collector; the target is reported as
+one aggregated sample (sums of RSS, threads, handles and ctx switch rates)
+plus one row per member. At most TREE_MAX_PROCESSES members are sampled
+per tick, nearest to the root first, which bounds the cost of a tick.
+Members are keyed by (pid, create_time), so a reused pid is a new member.
+"""
+
+import time
+import psutil
+import constants as C
+
+MB = 1024 * 1024
+
+
+class Member:
+    __slots__ = ("process", "name", "ppid", "prev")
+
+    def __init__(self, process, name, ppid):
+        self.process = process
+        self.name    = name
+        self.ppid    = ppid
+        self.prev    = None     # (ctx_vol, ctx_invol, time.monotonic()) of the last sample
+
+
+class ProcessTree:
+    def __init__(self, root, max_processes=C.TREE_MAX_PROCESSES):
+        self.root = root
+        self.max_processes = max_processes
+        self.root_key = (root.pid, root.create_time())
+        self.members = {self.root_key: Member(root, root.name(), root.ppid())}
+        self.denied = set()     # (pid, create_time) we may not read; not retried while it lives
+        self.capped = False     # True when the tree was larger than max_processes
+
+    def update(self, table, max_age):
+        """Diff the member set against the table (refreshed first if older than max_age seconds)."""
+        if time.monotonic() - table.refreshed > max_age:
+            table.refresh()
+        below = table.descendants(self.root.pid, self.max_processes - 1)
+        capped = len(below) == self.max_processes - 1
+        if capped and not self.capped:
+            print(f"⚠️ Process tree of PID {self.root.pid} has more than {self.max_processes} processes; "
+                  f"sampling the {self.max_processes} nearest the root")
+        self.capped = capped
+
+        entries = {(e.pid, e.create_time): e for e in map(table.entry, below) if e is not None}
+        self.denied &= entries.keys()      # forget processes that exited (or left the tree)
+        wanted = entries.keys() - self.denied
+        wanted.add(self.root_key)
+        for key in self.members.keys() - wanted:
+            del self.members[key]
+        for key in wanted - self.members.keys():
+            entry = entries[key]
+            try:
+                self.members[key] = Member(psutil.Process(entry.pid), entry.name, entry.ppid)
+            except psutil.NoSuchProcess:
+                pass
+
+    def collect(self, collector):
+        """
+        [(member, Sample, ctx_vol_rate, ctx_invol_rate)] for every member that
+        could be read. Members that vanished are dropped; errors on the root
+        propagate (the target itself is gone).
+        """
+        now = time.monotonic()
+        rows = []
+        for key, m in list(self.members.items()):
+            try:
+                sample = collector.collect(m.process)
+            except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+                if key == self.root_key:
+                    raise
+                del self.members[key]
+                if isinstance(e, psutil.AccessDenied):
+                    self.denied.add(key)
+                continue
+            if m.prev is None:
+                vol = invol = 0.0     # first sample of this member: baseline only
+            else:
+                elapsed = now - m.prev[2] if (now - m.prev[2]) > 0 else 1
+                vol   = (sample.ctx_vol   - m.prev[0]) / elapsed
+                invol = (sample.ctx_invol - m.prev[1]) / elapsed
+            m.prev = (sample.ctx_vol, sample.ctx_invol, now)
+            rows.append((m, sample, vol, invol))
+        return rows
+
+
+def aggregate(rows):
+    """(ctx_vol_rate, ctx_invol_rate, memory_mb, threads, handles) summed over the members."""
+    return (sum(r[2] for r in rows),
+            sum(r[3] for r in rows),
+            sum(r[1].rss for r in rows) / MB,
+            sum(r[1].threads for r in rows),
+            sum(r[1].handles for r in rows))
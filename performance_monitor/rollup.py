@@ -0,0 +1,125 @@
+import os
+import threading
+from collections import deque
+import constants as C
+from csv_sink import CsvSink
+from timestamps import epoch_to_timestamp
+
+# Numeric RAW columns that get rolled up
+ROLLUP_METRICS = ["ctx_vol_per_sec", "ctx_invol_per_sec", "threads", "handles", "memory_mb"]
+ROLLUP_STATS   = ["min", "max", "mean", "last"]
+
+
+def rollup_columns(metrics=ROLLUP_METRICS):
+    return ["timestamp", "pid", "name", "count"] + [f"{m}_{s}" for m in metrics for s in ROLLUP_STATS]
+
+
+def rollup_file(resolution):
+    return C.ROLLUP_FILE_PATTERN.format(resolution)
+
+
+class _Bucket:
+    """Running min/max/sum/last/count for one time bucket of one target."""
+
+    __slots__ = ("start", "count", "min", "max", "sum", "last")
+
+    def __init__(self, start, values):
+        self.start = start
+        self.count = 1
+        self.min   = list(values)
+        self.max   = list(values)
+        self.sum   = list(values)
+        self.last  = list(values)
+
+    def add(self, values):
+        self.count += 1
+        for i, v in enumerate(values):
+            if v < self.min[i]:
+                self.min[i] = v
+            if v > self.max[i]:
+                self.max[i] = v
+            self.sum[i] += v
+        self.last = list(values)
+
+    def row(self, key):
+        pid, name = key
+        out = [epoch_to_timestamp(self.start), pid, name, self.count]
+        for i in range(len(self.sum)):
+            out += [round(self.min[i], 2), round(self.max[i], 2),
+                    round(self.sum[i] / self.count, 2), round(self.last[i], 2)]
+        return out
+
+
+class RollupEngine:
+    """
+    Streaming multi-resolution aggregation.
+
+    Every sample updates the open bucket of each resolution in O(1); when a
+    sample falls into the next bucket, the finished one is written to that
+    resolution's sinks and kept in a bounded in-memory history for queries.
+    Buckets are aligned to wall-clock multiples of the resolution and kept
+    per target (pid, name).
+    """
+
+    def __init__(self, resolutions=C.ROLLUP_RESOLUTIONS, metrics=ROLLUP_METRICS, history=C.ROLLUP_HISTORY):
+        self.resolutions = list(resolutions)
+        self.metrics = list(metrics)
+        self.columns = rollup_columns(self.metrics)
+        self.sinks = {res: [] for res in self.resolutions}
+        self.history = {res: deque(maxlen=history) for res in self.resolutions}
+        self._open = {}    # (res, key) -> _Bucket
+        self._lock = threading.Lock()
+
+    def add_csv_sinks(self, directory=".", threaded=False):
+        for res in self.resolutions:
+            self.sinks[res].append(CsvSink(os.path.join(directory, rollup_file(res)), self.columns,
+                                           threaded=threaded))
+        return self
+
+    def add(self, ts, pid, name, record):
+        """Feed one sample: ts = POSIX seconds, record = dict with the metric columns."""
+        key = (pid, name)
+        values = [float(record[m]) for m in self.metrics]
+        with self._lock:
+            for res in self.resolutions:
+                start = ts - ts % res
+                bucket = self._open.get((res, key))
+                if bucket is not None and bucket.start != start:
+                    self._emit(res, key, bucket)
+                    bucket = None
+                if bucket is None:
+                    self._open[(res, key)] = _Bucket(start, values)
+                else:
+                    bucket.add(values)
+
+    def _emit(self, res, key, bucket):
+        row = bucket.row(key)
+        self.history[res].append(dict(zip(self.columns, row)))
+        for sink in self.sinks[res]:
+            sink.write(row)
+
+    def query(self, resolution, since=None, include_open=False):
+        """Closed buckets of one resolution (optionally plus the in-progress ones), oldest first."""
+        with self._lock:
+            rows = list(self.history[resolution])
+            if include_open:
+                rows += [dict(zip(self.columns, b.row(key)))
+                         for (res, key), b in self._open.items() if res == resolution]
+        if since is not None:
+            rows = [r for r in rows if r["timestamp"] >= since]
+        return rows
+
+    def tick(self):
+        for sinks in self.sinks.values():
+            for sink in sinks:
+                sink.tick()
+
+    def close(self):
+        """Emit the partially filled buckets and close the sinks."""
+        with self._lock:
+            for (res, key), bucket in self._open.items():
+                self._emit(res, key, bucket)
+            self._open.clear()
+        for sinks in self.sinks.values():
+            for sink in sinks:
+                sink.close()
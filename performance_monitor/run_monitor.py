@@ -1,41 +1,130 @@
 # run_monitor.py
 import argparse
+import os
+import signal
+import sys
+import threading
 from monitor_module import start_performance_monitor
+from process_cache import get_table
+from rollup import RollupEngine
 import constants as C
 
+def _exit_on_sigterm(signum, frame):
+    # MonitorManager.stop() sends SIGTERM; turn it into SystemExit so the
+    # monitor's finally-block flushes the buffered CSV rows before exiting.
+    sys.exit(0)
+
+def _watch_stop_file(path, stop_event):
+    # MonitorManager.stop() creates the file on Windows, where it cannot send SIGTERM
+    while not stop_event.wait(C.STOP_FILE_POLL):
+        if os.path.exists(path):
+            print("Stop file found. Stopping monitor.")
+            stop_event.set()
+
 def main():
     # 1. 创建参数解析器
-    parser = argparse.ArgumentParser(description="Performance Monitor Tool")
+    # 启动模式: run_monitor.py [options] -- <cmd...>  由监控自己启动目标，从启动一直采样到退出
+    parser = argparse.ArgumentParser(description="Performance Monitor Tool",
+                                     usage="%(prog)s [options] [-- command ...]")
 
     # 2. 定义参数 (设置了默认值，如果你不输入，就用默认的)
+    # 多个目标: --exe "trading_system,MarketFetch.py" 或 --pid 123 --pid 456
     parser.add_argument("--exe", type=str, default=C.DEFAULT_EXE)
-    parser.add_argument("--interval", type=int, default=C.DEFAULT_INTERVAL)
+    parser.add_argument("--interval", type=float, default=C.DEFAULT_INTERVAL,
+                        help=f"Sampling interval in seconds (float, >= {C.MIN_INTERVAL})")
     parser.add_argument("--limit", type=int, default=C.DEFAULT_TREND_LIMIT)
     parser.add_argument("--raw", type=str, default=C.DEFAULT_RAW_FILE)
     parser.add_argument("--trend", type=str, default=C.DEFAULT_TREND_FILE)
-    parser.add_argument("--pid", type=int, default=None)
+    parser.add_argument("--pid", type=int, action="append", default=None)
+    # 可选：同时写入紧凑的二进制格式 (见 sample_store.py)
+    parser.add_argument("--raw_bin", type=str, default=None)
+    parser.add_argument("--trend_bin", type=str, default=None)
+    # 可选：多分辨率汇总，写入 rollup_<N>s.csv (min/max/mean/last/count)
+    parser.add_argument("--rollup", action="store_true",
+                        help=f"Write {', '.join(f'{r}s' for r in C.ROLLUP_RESOLUTIONS)} rollups next to the raw CSV")
+    parser.add_argument("--fast_proc", action="store_true", default=C.DEFAULT_FAST_PROC,
+                        help="Linux: read /proc/<pid>/status directly instead of via psutil")
+    # 可选：进程树模式，目标 + 所有子孙进程汇总采样，每个成员单独写入 tree_raw.csv
+    parser.add_argument("--tree", action="store_true", default=C.DEFAULT_TREE_MODE,
+                        help="Sample each target together with all its descendants")
+    parser.add_argument("--tree_csv", type=str, default=None,
+                        help=f"Per-process rows in tree mode (default: {C.DEFAULT_TREE_FILE} next to the raw CSV)")
+    # 可选：低频的内存细分 (USS/PSS、heap/匿名 mmap/文件映射)，增长最多的映射区域写入 memory_regions.csv
+    parser.add_argument("--memory_detail", action="store_true", default=C.DEFAULT_MEMORY_DETAIL,
+                        help=f"Fill the {', '.join(C.MEMORY_DETAIL_COLUMNS)} columns every "
+                             f"{C.MEMORY_DETAIL_INTERVAL:g}s per process")
+    parser.add_argument("--memory_regions", type=str, default=None,
+                        help=f"Per-mapping growth with --memory_detail "
+                             f"(default: {C.DEFAULT_MEMORY_REGION_FILE} next to the raw CSV)")
+    parser.add_argument("--launch_info", type=str, default=None,
+                        help=f"Launch mode: where to write exit code and lifetime "
+                             f"(default: {C.LAUNCH_INFO_FILE} next to the raw CSV)")
+    # 可选：该文件出现时优雅退出 (Windows 下 MonitorManager.stop() 使用)
+    parser.add_argument("--stop_file", type=str, default=None,
+                        help="Stop (flushing all files) as soon as this file exists")
 
-    # 3. 解析参数
-    args = parser.parse_args()
+    # 3. 解析参数 ("--" 之后是要启动的命令)
+    argv, command = sys.argv[1:], []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, command = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+    if "--" in sys.argv[1:] and not command:
+        parser.error("no command given after --")
 
-    target_display = f"PID {args.pid}" if args.pid else args.exe
+    if command:
+        target_display = f"launch: {' '.join(command)}"
+    else:
+        target_display = ", ".join(f"PID {p}" for p in args.pid) if args.pid else args.exe
 
     print("--- Monitor Configuration ---")
     print(f"Target      : {target_display}") # 这里改成动态显示
     print(f"Interval    : {args.interval}s")
+    if args.tree:
+        print(f"Tree mode   : on (up to {C.TREE_MAX_PROCESSES} processes per target)")
+    if args.memory_detail:
+        print(f"Memory      : USS/PSS + heap/mmap breakdown every {C.MEMORY_DETAIL_INTERVAL:g}s")
     print(f"Trend Limit : {args.limit} points")
     print(f"Output      : {args.raw}, {args.trend}")
+    if args.raw_bin or args.trend_bin:
+        print(f"Binary      : {args.raw_bin}, {args.trend_bin}")
     print("----------------------------")
 
-    # 4. 启动监控
-    start_performance_monitor(
+    # 4. 启动监控 (SIGTERM 时优雅退出，保证缓冲的数据写入文件)
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    # MonitorManager.notify_started() sends SIGUSR1 right after launching a target
+    if hasattr(signal, "SIGUSR1"):
+        table = get_table()
+        signal.signal(signal.SIGUSR1, lambda signum, frame: table.wake())
+    stop_event = None
+    if args.stop_file:
+        if os.path.exists(args.stop_file):
+            os.remove(args.stop_file)   # left over from an earlier run
+        stop_event = threading.Event()
+        threading.Thread(target=_watch_stop_file, args=(args.stop_file, stop_event), daemon=True).start()
+    exit_code = start_performance_monitor(
         exe_name=args.exe, 
         target_pid=args.pid,
         raw_csv=args.raw, 
         trend_csv=args.trend, 
         interval_sec=args.interval, 
-        trend_limit=args.limit
+        trend_limit=args.limit,
+        stop_event=stop_event,
+        fast_proc=args.fast_proc,
+        raw_bin=args.raw_bin,
+        trend_bin=args.trend_bin,
+        rollups=RollupEngine().add_csv_sinks(os.path.dirname(args.raw) or ".") if args.rollup else None,
+        launch=command or None,
+        tree=args.tree,
+        memory_detail=args.memory_detail,
+        memory_regions_csv=(args.memory_regions or os.path.join(os.path.dirname(args.raw), C.DEFAULT_MEMORY_REGION_FILE))
+        if args.memory_detail else None,
+        tree_csv=(args.tree_csv or os.path.join(os.path.dirname(args.raw), C.DEFAULT_TREE_FILE)) if args.tree else None,
+        launch_info=(args.launch_info or os.path.join(os.path.dirname(args.raw), C.LAUNCH_INFO_FILE)) if command else None
     )
+    # 启动模式: 以子进程的退出码退出 (被信号杀死时按 shell 习惯返回 128 + 信号)
+    if command:
+        sys.exit(exit_code if exit_code >= 0 else 128 - exit_code)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+run_store.py
+------------
+Index of archived monitoring runs, used for baseline comparison.
+
+MonitorManager.backup_and_clean registers every run it archives: the trend
+file is parsed once and its summary is kept in backups/index.json, so
+later comparisons only read the index, never the old CSVs (which may
+already have been pruned).
+
+  {"runs": [{"id":         first trend timestamp of the run,
+             "exe":        configured target, if known,
+             "archived":   when it was registered,
+             "files":      archived files,
+             "passed":     verdict,
+             "checked_by": "check_regression" (--record) or "defaults",
+             "targets": {"<name>": {"points":  trend points,
+                                    "summary": {<metric>: {"mean", "peak", "slope"}},
+                                    "rollup":  {<metric>: [RUN_ROLLUP_POINTS bucket means]}}}}]}
+
+compare() checks a run's summary against the median of the last N passing
+runs of the same process name.
+"""
+
+import json
+import os
+from datetime import datetime
+import numpy as np
+import analysis
+import constants as C
+from timestamps import epoch_to_timestamp
+
+COMPARE_STATS   = ["mean", "peak"]
+COMPARE_METRICS = [
+    ("ctx_invol/s", "ctx_invol",   "ctx switches/sec"),
+    ("memory",      "avg_memory",  "MB"),
+    ("threads",     "avg_threads", ""),
+    ("handles",     "avg_handles", ""),
+]
+
+
+def summarize(stats):
+    """{metric: {mean, peak, slope}} from analysis.MetricStats (batch or online)."""
+    # the least-squares line passes through the mean at the middle point
+    return {m: {"mean": s.intercept + s.slope * (s.n - 1) / 2.0, "peak": s.peak, "slope": s.slope}
+            for m, s in stats.items()}
+
+
+def compact_rollup(cols, points=C.RUN_ROLLUP_POINTS):
+    """Bucket means of every metric, at most `points` per metric."""
+    n = len(cols["name"])
+    if n == 0:
+        return {}
+    starts = np.linspace(0, n, min(points, n) + 1).astype(int)
+    counts = np.diff(starts)
+    return {m: np.round(np.add.reduceat(np.asarray(cols[m], dtype=np.float64), starts[:-1]) / counts, 3).tolist()
+            for m in analysis.METRICS}
+
+
+def run_id(cols):
+    first = cols["timestamp"][0]
+    return epoch_to_timestamp(float(first)) if isinstance(first, (float, np.floating)) else str(first)
+
+
+def file_run_id(path):
+    """run_id() of a trend file, read from its first row only (None if it has no rows)."""
+    if not os.path.exists(path) or not _is_trend_file(path):
+        return None
+    first = next(analysis.iter_trend_chunks(path, 1), None)
+    return run_id(first) if first is not None and len(first["name"]) else None
+
+
+def _is_trend_file(path):
+    if path.endswith('.bin'):
+        return True
+    with open(path, newline='', encoding='utf-8') as f:
+        header = f.readline()
+    return "avg_memory" in header or "memory_mb_mean" in header
+
+
+def _default_verdict(targets_stats):
+    """Pass/fail with check_regression's default thresholds (for runs nobody checked)."""
+    import check_regression as cr
+    return all(cr.check(stats, cr.DEFAULT_CTX_INVOL_LIMIT, cr.DEFAULT_MEM_LIMIT, cr.DEFAULT_THREAD_LIMIT,
+                        cr.DEFAULT_HANDLE_LIMIT, cr.DEFAULT_SLOPE_THRESHOLD)[0]
+               for stats in targets_stats.values() if stats[analysis.METRICS[0]].n >= 2)
+
+
+class RunStore:
+    def __init__(self, directory="backups"):
+        self.directory = directory
+        self.path = os.path.join(directory, C.RUN_STORE_INDEX)
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f).get("runs", [])
+        except FileNotFoundError:
+            return []
+        except (ValueError, OSError) as e:
+            print(f"DEBUG: Run index unreadable ({e}), starting a new one")
+            return []
+
+    def _save(self, runs):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"runs": runs}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def register(self, trend_path, exe=None, files=None, passed=None):
+        """
+        Parse one trend file (CSV, rollup CSV or .bin) and add its summary to the index.
+        passed=None means the run was not checked: it is judged with the default thresholds.
+        Returns the entry, or None if the file holds no trend data.
+        """
+        if not os.path.exists(trend_path) or not _is_trend_file(trend_path):
+            return None
+        cols = analysis.load_trend(trend_path)
+        if len(cols["name"]) == 0:
+            return None
+
+        per_target = analysis.split_by_target(cols)
+        stats = {name: analysis.analyze(tc) for name, tc in per_target.items()}
+        entry = {
+            "id":         run_id(cols),
+            "exe":        exe,
+            "archived":   datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "files":      files if files is not None else [trend_path],
+            "passed":     _default_verdict(stats) if passed is None else bool(passed),
+            "checked_by": "defaults" if passed is None else "check_regression",
+            "targets":    {name: {"points":  len(tc["name"]),
+                                  "summary": summarize(stats[name]),
+                                  "rollup":  compact_rollup(tc)}
+                           for name, tc in per_target.items()},
+        }
+        return self.add(entry)
+
+    def add(self, entry):
+        runs = self.load()
+        old = next((r for r in runs if r["id"] == entry["id"]), None)
+        if old is not None:
+            runs.remove(old)
+            # a verdict recorded by check_regression beats the default-threshold one
+            if old.get("checked_by") == "check_regression" and entry["checked_by"] == "defaults":
+                entry["passed"], entry["checked_by"] = old["passed"], old["checked_by"]
+            entry["exe"] = entry["exe"] or old.get("exe")
+        runs.append(entry)
+        runs.sort(key=lambda r: r["id"])
+        self._save(runs[-C.RUN_STORE_MAX_RUNS:])
+        return entry
+
+    def forget_files(self, paths):
+        """Drop deleted backup files from the index; the summaries stay."""
+        paths = set(paths)
+        runs = self.load()
+        for r in runs:
+            r["files"] = [f for f in r.get("files", []) if f not in paths]
+        self._save(runs)
+
+    def baseline(self, name, last_n=C.DEFAULT_BASELINE_RUNS, exclude_id=None):
+        """({metric: {stat: median}}, runs used) over the last N passing runs of one process."""
+        runs = [r for r in self.load()
+                if r.get("passed") and name in r.get("targets", {}) and r["id"] != exclude_id][-last_n:]
+        if not runs:
+            return None, 0
+        summaries = [r["targets"][name]["summary"] for r in runs]
+        return {m: {s: float(np.median([x[m][s] for x in summaries])) for s in COMPARE_STATS}
+                for m in summaries[0]}, len(runs)
+
+
+def compare(summary, baseline, runs_used, tolerance=C.DEFAULT_BASELINE_TOLERANCE):
+    """(info, failures) console lines, in check_regression's format."""
+    info, failures = [], []
+    for label, metric, unit in COMPARE_METRICS:
+        for stat in COMPARE_STATS:
+            current, base = summary[metric][stat], baseline[metric][stat]
+            change = (current - base) / base if base > 0 else 0.0
+            text = (f"{label + ' ' + stat:<14} {current:.1f}{unit}  baseline={base:.1f}{unit} "
+                    f"({change:+.0%}, median of {runs_used} runs)")
+            if change > tolerance:
+                failures.append(f"  ❌ BASELINE         {text}  tolerance={tolerance:.0%}")
+            else:
+                info.append(f"  ✅ {text}")
+    return info, failures
@@ -0,0 +1,56 @@
+import threading
+from monitor_module import start_performance_monitor
+
+
+class InProcessSampler:
+    """
+    Runs start_performance_monitor on a background thread inside the server.
+
+    Each raw/trend record is handed straight to `publish(msg_type, row)`
+    instead of making a round trip through the CSV files, which become an
+    optional sink written from their own thread.
+    """
+
+    def __init__(self, publish):
+        self.publish = publish
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, exe_name, interval_sec, trend_limit, raw_csv=None, trend_csv=None, target_pid=None,
+              fast_proc=False, rollups=None, tree=False, tree_csv=None,
+              memory_detail=False, memory_regions_csv=None):
+        if self.is_alive:
+            return False
+        self._stop_event.clear()
+        kwargs = dict(
+            exe_name=exe_name,
+            raw_csv=raw_csv,
+            trend_csv=trend_csv,
+            interval_sec=interval_sec,
+            trend_limit=trend_limit,
+            target_pid=target_pid,
+            on_raw=lambda row: self.publish("realtime", row),
+            on_trend=lambda row: self.publish("trend_push", row),
+            stop_event=self._stop_event,
+            async_csv=True,
+            fast_proc=fast_proc,
+            rollups=rollups,
+            tree=tree,
+            tree_csv=tree_csv,
+            memory_detail=memory_detail,
+            memory_regions_csv=memory_regions_csv,
+        )
+        self._thread = threading.Thread(target=start_performance_monitor, kwargs=kwargs,
+                                        name="InProcessSampler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
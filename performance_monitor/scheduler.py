@@ -0,0 +1,38 @@
+import time
+import constants as C
+
+
+class DeadlineScheduler:
+    """
+    Drift-free periodic schedule on the monotonic clock.
+
+    Tick k is due at start + k * interval, independent of how long the work
+    between ticks took. If the work overruns one or more deadlines, those
+    ticks are counted in `missed` and skipped, rather than silently
+    stretching the period.
+    """
+
+    def __init__(self, interval):
+        self.interval = max(float(interval), C.MIN_INTERVAL)
+        self.missed = 0
+        self._next = None
+
+    def reset(self):
+        """Restart the schedule from now (e.g. after waiting for a target to appear)."""
+        self._next = None
+
+    def next_delay(self):
+        """Seconds to sleep until the next deadline; advances the schedule."""
+        now = time.monotonic()
+        if self._next is None:
+            self._next = now
+        self._next += self.interval
+        delay = self._next - now
+        if delay < 0:
+            skipped = int(-delay // self.interval) + 1
+            self.missed += skipped
+            self._next += skipped * self.interval
+            delay = self._next - now
+            print(f"⚠️ Sampling overran the interval: skipped {skipped} tick(s) "
+                  f"({self.missed} missed in total)")
+        return delay
@@ -4,12 +4,15 @@ import json
 import subprocess
 import shutil
 from datetime import datetime
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-import psutil
 from MonitorManager import MonitorManager
 from TradingManager import TradingManager
+from csv_tail import CsvTailReader
+from broadcaster import Broadcaster, to_frames
+from history import HistoryStore
+from process_cache import get_table
 
 # 导入你定义的常量
 import constants as C
@@ -25,103 +28,153 @@ app.add_middleware(
     allow_headers=["*"],  # 允许所有请求头
 )
 
-# 实例化管理器
-manager_manager = MonitorManager()
+# 共享广播器：每个数据源只有一个读取器，解析一次后推送给所有客户端
+# 服务启动时文件已存在 (监控运行中重启服务)：只从文件末尾的最近几行开始读
+broadcaster = Broadcaster()
+broadcaster.add_source("realtime",
+                       CsvTailReader(C.DEFAULT_RAW_FILE, C.RAW_COLUMNS, min_fields=5,
+                                     tail_rows=C.INITIAL_LOAD_COUNT),
+                       C.INITIAL_LOAD_COUNT)
+broadcaster.add_source("trend_push",
+                       CsvTailReader(C.DEFAULT_TREND_FILE, C.TREND_COLUMNS, min_fields=4,
+                                     tail_rows=C.REPLAY_TREND_HISTORY),
+                       C.REPLAY_TREND_HISTORY,
+                       replay_points=C.DEFAULT_SERIES_POINTS,
+                       metrics=C.TREND_COLUMNS[1:6])
+
+# 历史查询：新连接回放最近的数据 (trend 降采样到固定点数)，更早的数据通过 /series 按需分页
+history = HistoryStore()
+
+# 实例化管理器 (inprocess 模式下采样线程直接把样本交给广播器)
+manager_manager = MonitorManager(publish=broadcaster.publish_threadsafe)
 trading_manager = TradingManager()
+# 进程表缓存：后台线程增量刷新，/processes 和按名字查找进程都直接查表
+process_table = get_table()
+build_task = None   # 正在运行的构建 (同一时间只允许一个)
+
+@app.on_event("startup")
+async def start_broadcaster():
+    broadcaster.start()
 
 @app.get("/processes")
 async def get_processes():
-    # Get all unique running .exe names, sorted alphabetically
-    processes = sorted(list(set([p.info['name'] for p in psutil.process_iter(['name']) if p.info['name']])))
-    return {"processes": processes}
+    # Get all unique running .exe names, sorted alphabetically (from the cached table, never a scan)
+    return {"processes": process_table.names()}
+
+@app.get("/series")
+def get_series(metric: str, start: str = Query(None, alias="from"), end: str = Query(None, alias="to"),
+               resolution: str = "auto",
+               points: int = C.DEFAULT_SERIES_POINTS, limit: int = C.INITIAL_LOAD_COUNT, name: str = None,
+               method: str = C.DOWNSAMPLE_METHOD):
+    """
+    /series?metric=avg_memory,avg_threads&from=...&to=...&resolution=auto&points=800&name=...&method=lttb
+    from/to: POSIX seconds or CSV timestamps. Without from: the last `limit` points before `to`.
+    """
+    try:
+        return history.series(metric.split(','), start, end, resolution, points, limit, name, method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def run_build(reply, stream, full=False):
+    """构建在后台任务中运行：输出逐行推送给发起的客户端，结束时发送最终结果"""
+    global build_task
+    try:
+        success, text = await trading_manager.update_and_build_async(log=stream, full=full)
+        await reply(success, text)
+    except Exception as e:
+        print(f"Build reporting stopped: {e}")   # 客户端已断开，构建本身已完成
+    finally:
+        build_task = None
+
+async def pump_subscriber(websocket, sub, send_lock):
+    """把广播器推给该客户端的数据按批发出去 (先回放历史，再发实时数据)"""
+    frames = to_frames(sub.replay)
+    sub.replay = []
+    while True:
+        for frame in frames:
+            async with send_lock:
+                await websocket.send_json(frame)
+        frames = to_frames(await sub.get_batch())
 
 # --- WebSocket 逻辑 ---
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
+    global build_task
     await websocket.accept()
     print("WebSocket client connected.")
-    
-    # 记录每个连接的文件读取位置，防止重复发送
-    last_raw_idx = 0
-    last_trend_idx = 0
+
+    # 订阅共享广播器；发送由独立任务完成，本循环只处理前端指令
+    sub = broadcaster.subscribe()
+    send_lock = asyncio.Lock()
+    pump = asyncio.create_task(pump_subscriber(websocket, sub, send_lock))
+
+    async def reply(success, text):
+        async with send_lock:
+            await websocket.send_json({"type": "status_log", "success": success, "message": text})
+
+    async def stream(text):
+        # 构建过程中的单行输出；stream=True 表示不是最终结果
+        try:
+            async with send_lock:
+                await websocket.send_json({"type": "status_log", "success": True, "message": text, "stream": True})
+        except Exception:
+            pass   # 客户端断开后构建继续运行
 
     try:
         while True:
-            # 1. 处理前端指令 (使用 wait_for 防止阻塞)
-            try:
-                raw_msg = await asyncio.wait_for(websocket.receive_text(), timeout=0.1)
-                msg = json.loads(raw_msg)
-                m_type = msg.get("type")
-                m_data = msg.get("data", {})
-
-                if m_type == "start":
-                    success, text = manager_manager.start()
-                    await websocket.send_json({"type": "status_log", "success": success, "message": text})
-                    # 重置读取位置，因为文件被删除了
-                    last_raw_idx = 0
-                    last_trend_idx = 0
-
-                elif m_type == "stop":
-                    success, text = manager_manager.stop()
-                    await websocket.send_json({"type": "status_log", "success": success, "message": text})
-                
-                elif m_type == "configure":
-                    success, text = manager_manager.configure(m_data)
-                    await websocket.send_json({"type": "status_log", "success": success, "message": text})
-                                
-                elif m_type == "trade_update":
-                    success, text = trading_manager.update_and_build()
-                    await websocket.send_json({"type": "status_log", "success": success, "message": text})
-                    
-                elif m_type == "trade_start":
-                    success, text = trading_manager.start_processes()
-                    await websocket.send_json({"type": "status_log", "success": success, "message": text})
-
-                elif m_type == "trade_stop":
-                    success, text = trading_manager.stop_processes()
-                    await websocket.send_json({"type": "status_log", "success": success, "message": text})
-
-
-            except asyncio.TimeoutError:
-                pass # 正常超时，继续往下跑文件读取逻辑
-
-            # 2. 增量读取 RAW CSV 并推送
-            if os.path.exists(C.DEFAULT_RAW_FILE):
-                with open(C.DEFAULT_RAW_FILE, 'r', encoding='utf-8', errors='ignore') as f:
-                    all_lines = f.readlines()
-                    if len(all_lines) > last_raw_idx:
-                        for line in all_lines[last_raw_idx:]:
-                            if not line.strip() or "timestamp" in line: continue
-                            vals = line.strip().split(',')
-                            if len(vals) >= 5:
-                                await websocket.send_json({
-                                    "type": "realtime",
-                                    "data": dict(zip(C.RAW_COLUMNS, vals))
-                                })
-                        last_raw_idx = len(all_lines)
-
-            # 3. 增量读取 TREND CSV 并推送
-            if os.path.exists(C.DEFAULT_TREND_FILE):
-                with open(C.DEFAULT_TREND_FILE, 'r', encoding='utf-8', errors='ignore') as f:
-                    all_lines = f.readlines()
-                    if len(all_lines) > last_trend_idx:
-                        for line in all_lines[last_trend_idx:]:
-                            if not line.strip() or "timestamp" in line: continue
-                            vals = line.strip().split(',')
-                            if len(vals) >= 4:
-                                await websocket.send_json({
-                                    "type": "trend_push",
-                                    "data": dict(zip(C.TREND_COLUMNS, vals))
-                                })
-                        last_trend_idx = len(all_lines)
-
-            await asyncio.sleep(0.5)
+            msg = json.loads(await websocket.receive_text())
+            m_type = msg.get("type")
+            m_data = msg.get("data", {})
+
+            if m_type == "start":
+                success, text = manager_manager.start()
+                if success:
+                    # 旧文件已被备份移走，清空历史并从新文件开头读取；
+                    # inprocess 模式下样本直接推送，不再轮询 CSV。
+                    # 启动失败 (如已在运行) 时不能重置，否则会把整个文件重新推送给所有客户端
+                    broadcaster.reset()
+                    broadcaster.polling = not manager_manager.in_process
+                await reply(success, text)
+
+            elif m_type == "stop":
+                # 停止时最多等待 5 秒 (采样线程 / 子进程写完缓冲)，放到线程里执行，不阻塞其他客户端
+                success, text = await asyncio.to_thread(manager_manager.stop)
+                await reply(success, text)
+
+            elif m_type == "configure":
+                success, text = manager_manager.configure(m_data)
+                await reply(success, text)
+
+            elif m_type == "trade_update":
+                if build_task is not None:
+                    await reply(False, "BUILD FAILED: a build is already running")
+                else:
+                    # 构建在独立任务中进行，采样推送和其他指令不受影响
+                    # data.full = true 时强制 make clean 全量重建
+                    build_task = asyncio.create_task(run_build(reply, stream, bool(m_data.get("full"))))
+
+            elif m_type == "trade_start":
+                success, text = trading_manager.start_processes()
+                if success:
+                    # 正在等待这些进程的监控立即开始采样
+                    manager_manager.notify_started(trading_manager.pids)
+                await reply(success, text)
+
+            elif m_type == "trade_stop":
+                # 回收进程最多等待 5 秒 / 进程，放到线程里执行，不阻塞其他客户端的数据推送
+                success, text = await asyncio.to_thread(trading_manager.stop_processes)
+                await reply(success, text)
 
     except WebSocketDisconnect:
         print("Client disconnected.")
     except Exception as e:
         print(f"Server Internal Error: {e}")
-        
+    finally:
+        pump.cancel()
+        broadcaster.unsubscribe(sub)
+        if sub.dropped:
+            print(f"Client dropped {sub.dropped} messages (slow consumer).")
+
 @app.get("/debug")
 async def debug():
     import os
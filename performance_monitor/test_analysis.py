@@ -0,0 +1,67 @@
+import time
+import numpy as np
+import analysis
+import leak_detection
+
+def test_analysis():
+    print("="*50)
+    print("🚀 STARTING ANALYSIS TEST")
+    print("="*50)
+
+    n = 500
+    rng = np.random.default_rng(0)
+    cols = {m: rng.normal(50, 1, n) for m in analysis.METRICS}
+    cols["avg_memory"] = 100 + 0.2 * np.arange(n) + rng.normal(0, 1, n)
+
+    # 1. 向量化结果与 np.polyfit 一致
+    print("\n[STEP 1] Batch analysis...")
+    stats = analysis.analyze(cols)
+    slope, intercept = np.polyfit(np.arange(n), cols["avg_memory"], 1)
+    mem = stats["avg_memory"]
+    assert abs(mem.slope - slope) < 1e-9 and abs(mem.intercept - intercept) < 1e-6
+    assert mem.ci_low < 0.2 < mem.ci_high and mem.r2 > 0.9
+    assert stats["avg_threads"].ci_low < 0 < stats["avg_threads"].ci_high
+    print(f"✅ memory slope={mem.slope:.4f}  R²={mem.r2:.3f}  CI=[{mem.ci_low:.4f}, {mem.ci_high:.4f}]")
+
+    # 2. 分块 + 逐点的增量回归与批量结果相同
+    print("\n[STEP 2] Online regression...")
+    online = analysis.OnlineRegression()
+    online.update_many({m: v[:300] for m, v in cols.items()})
+    for i in range(300, n):
+        online.update({m: v[i] for m, v in cols.items()})
+    for m, s in online.result().items():
+        assert s.n == n and s.peak == stats[m].peak
+        assert np.allclose([s.slope, s.r2, s.ci_low], [stats[m].slope, stats[m].r2, stats[m].ci_low])
+    print("✅ Running sums match the batch pass.")
+
+    # 3. 泄漏检测: 平稳 300 点后开始增长
+    print("\n[STEP 3] Leak detection...")
+    y = np.concatenate([np.full(300, 10.0), 10 + 0.5 * np.arange(200)]) + rng.normal(0, 0.1, 500)
+    k, after = leak_detection.change_point(y)
+    assert abs(k - 300) <= 5 and abs(after - 0.5) < 0.05
+    k_edge, _ = leak_detection.change_point(np.arange(20.0) ** 2)      # 两侧至少各有 MIN 个点
+    assert leak_detection.CHANGE_POINT_MIN_POINTS - 1 <= k_edge <= 20 - 1 - leak_detection.CHANGE_POINT_MIN_POINTS
+    windows = leak_detection.rolling_slopes(y[100:], 20)
+    assert abs(windows[-1] - 0.5) < 0.05 and abs(windows[0]) < 0.05
+    y[450] = 1000                                        # 单个尖峰不影响 Theil-Sen
+    assert abs(leak_detection.theil_sen(y[300:]) - 0.5) < 0.01
+    print(f"✅ growth found at point {k}, slope after={after:.3f}")
+
+    # 4. 变点只在趋势超限时计算，并且是 O(n) (百万点也很快)
+    print("\n[STEP 4] Change point cost...")
+    flat = {"timestamp": np.arange(500.0), "avg_memory": rng.normal(10, 0.1, 500), "avg_threads": y}
+    report = leak_detection.detect(flat, ["avg_memory", "avg_threads"], slope_threshold=0.05)
+    assert "change_point" not in report["avg_memory"] and "change_point" in report["avg_threads"]
+    big = np.concatenate([np.zeros(500000), 0.01 * np.arange(500000)]) + rng.normal(0, 1, 1000000)
+    started = time.perf_counter()
+    k, after = leak_detection.change_point(big)
+    elapsed = time.perf_counter() - started
+    assert abs(k - 500000) <= 5000 and elapsed < 2
+    print(f"✅ 1M points in {elapsed:.3f}s, growth found at point {k}")
+
+    print("\n" + "="*50)
+    print("🏁 ANALYSIS TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_analysis()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import constants as C
+from broadcaster import Broadcaster, Subscriber, to_frames
+from csv_tail import CsvTailReader
+
+def write_rows(path, values, mode='a'):
+    with open(path, mode, newline='') as f:
+        if mode == 'w':
+            f.write(",".join(C.RAW_COLUMNS) + "\n")
+        for v in values:
+            f.write(f"2024-01-01 00:00:00,1,2,3,4,{v}\n")
+
+def test_broadcaster():
+    print("="*50)
+    print("🚀 STARTING BROADCASTER TEST")
+    print("="*50)
+
+    work_dir = tempfile.mkdtemp()
+    path = os.path.join(work_dir, C.DEFAULT_RAW_FILE)
+    try:
+        asyncio.run(run_steps(path))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n" + "="*50)
+    print("🏁 BROADCASTER TEST COMPLETE")
+    print("="*50)
+
+async def run_steps(path):
+    # 1. 慢客户端: 队列满时丢弃最旧的消息，并计数
+    print("\n[STEP 1] Drop oldest...")
+    sub = Subscriber(maxsize=3)
+    for k in range(5):
+        sub.push({"type": "realtime", "data": k})
+    assert sub.dropped == 2
+    assert [(await sub.get())["data"] for _ in range(3)] == [2, 3, 4]
+    print(f"✅ {sub.dropped} dropped, newest 3 kept")
+
+    # 2. 一个读取器，多个订阅者；新订阅者先收到历史回放
+    print("\n[STEP 2] Fan-out & replay...")
+    b = Broadcaster(poll_interval=0.01)
+    b.add_source("realtime", CsvTailReader(path, C.RAW_COLUMNS, min_fields=5), history_limit=3)
+    a, c = b.subscribe(), b.subscribe()
+    write_rows(path, ["1.0", "2.0", "3.0", "4.0"], 'w')
+    b.poll_once()
+    assert a.queue.qsize() == c.queue.qsize() == 4
+    late = b.subscribe()
+    assert [m["data"]["memory_mb"] for m in late.replay] == ["2.0", "3.0", "4.0"]
+    print("✅ every subscriber got 4 rows, late subscriber replays the last 3")
+
+    # 3. 后台轮询在线程里读文件；reset 后 (新的一次运行) 从新文件开头读，旧文件的行不再推送
+    print("\n[STEP 3] Polling task & reset...")
+    b.unsubscribe(a)
+    b.unsubscribe(c)
+    b.start()
+    write_rows(path, ["5.0"])
+    batch = await asyncio.wait_for(late.get_batch(), 5)
+    assert [m["data"]["memory_mb"] for m in batch] == ["5.0"]
+    b.reset()
+    assert not b.history["realtime"]
+    os.remove(path)
+    write_rows(path, ["6.0", "7.0"], 'w')
+    batch = await asyncio.wait_for(late.get_batch(), 5)
+    assert [m["data"]["memory_mb"] for m in batch] == ["6.0", "7.0"]
+    b._task.cancel()
+    print("✅ new run read from the top of the new file")
+
+    # 4. 分帧: 相邻的同类消息合并成一个批量帧，每帧最多 max_size 条
+    print("\n[STEP 4] Batch framing...")
+    msgs = ([{"type": "realtime", "data": k} for k in range(5)] + [{"type": "trend_push", "data": "t"}]
+            + [{"type": "realtime", "data": 5}] + [{"type": "status_log", "data": "s"}])
+    frames = to_frames(msgs, max_size=2)
+    assert [(f["type"], f["data"]) for f in frames] == [
+        ("realtime_batch", [0, 1]), ("realtime_batch", [2, 3]), ("realtime_batch", [4]),
+        ("trend_batch", ["t"]), ("realtime_batch", [5]), ("status_log", ["s"])]
+    print(f"✅ {len(msgs)} messages -> {len(frames)} frames, order kept")
+
+    # 5. get_batch: 已排队的消息立即凑满 max_size；不足时最多再等 window 秒
+    print("\n[STEP 5] get_batch...")
+    sub = Subscriber(maxsize=100)
+    for k in range(7):
+        sub.push(k)
+    assert await sub.get_batch(max_size=5, window=10) == [0, 1, 2, 3, 4]
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert await sub.get_batch(max_size=5, window=0.1) == [5, 6]
+    assert 0.09 <= loop.time() - started < 1
+    loop.call_later(0.02, sub.push, 7)
+    assert await sub.get_batch(max_size=5, window=0.2) == [7]
+    print("✅ full batches returned at once, partial ones after the window")
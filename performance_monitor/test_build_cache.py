@@ -0,0 +1,131 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import build_cache
+from TradingManager import TradingManager, GEN_SCRIPT
+
+MAKEFILE = """all: output/app
+output/app: src/gen/strategy.h src/main.cpp
+\tmkdir -p output && cat $^ > $@
+clean:
+\trm -rf output
+"""
+GENERATOR = """import os
+os.makedirs(os.path.join("src", "gen"), exist_ok=True)
+with open(os.path.join("src", "gen", "strategy.h"), "w") as f:
+    f.write("int strategy;\\n")
+"""
+
+def write(root, rel, text):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+def test_build_cache():
+    print("="*50)
+    print("🚀 STARTING BUILD CACHE TEST")
+    print("="*50)
+
+    # 项目根目录里同时有生成代码 (src/) 和本工具的工作目录 (tools/performance_monitor)
+    root  = tempfile.mkdtemp()
+    tools = os.path.join(root, "tools", "performance_monitor")
+    write(root, "src/gen/strategy.h", "int a;\n")
+    write(root, "src/main.cpp", "int main() {}\n")
+    write(root, "tools/performance_monitor/build_metrics.csv", "timestamp\n")
+    dirs = ["src"]
+
+    # 1. 快照只包含输出目录，跳过排除的目录
+    print("\n[STEP 1] Scoped snapshot...")
+    snap = build_cache.snapshot(root, dirs)
+    assert set(snap) == {os.path.join("src", "gen", "strategy.h"), os.path.join("src", "main.cpp")}
+    assert build_cache.snapshot(root, ["."], exclude=[tools]).keys() == snap.keys()
+    print(f"✅ {len(snap)} files, tools checkout not included")
+
+    # 2. 生成器运行期间其他地方的写入不算生成的文件
+    print("\n[STEP 2] First generation...")
+    state = build_cache.BuildState(os.path.join(tempfile.mkdtemp(), "state.json"))
+    before = build_cache.snapshot(root, dirs)
+    time.sleep(0.01)
+    write(root, "src/gen/strategy.h", "int a;\n")
+    write(root, "tools/performance_monitor/build_metrics.csv", "timestamp\n1\n")
+    changed, written, unchanged = state.track_generated(root, dirs, before)
+    assert changed and written == 1 and unchanged == 0
+    assert list(state.data["files"]) == [os.path.join("src", "gen", "strategy.h")]
+    assert state.generated_intact(root, dirs)
+    print(f"✅ tracked {list(state.data['files'])}")
+
+    # 3. 内容相同的重新生成恢复旧 mtime，make 不会重编；内容变化时报告变化
+    print("\n[STEP 3] Regeneration...")
+    gen = os.path.join(root, "src", "gen", "strategy.h")
+    mtime = os.stat(gen).st_mtime_ns
+    before = build_cache.snapshot(root, dirs)
+    time.sleep(0.01)
+    write(root, "src/gen/strategy.h", "int a;\n")
+    changed, written, unchanged = state.track_generated(root, dirs, before)
+    assert not changed and unchanged == 1 and os.stat(gen).st_mtime_ns == mtime
+    before = build_cache.snapshot(root, dirs)
+    time.sleep(0.01)
+    write(root, "src/gen/strategy.h", "int b;\n")
+    changed, _, _ = state.track_generated(root, dirs, before)
+    assert changed
+    print("✅ unchanged output keeps its mtime, changed output is reported")
+
+    # 4. 无改动的更新: 生成代码和 make clean 都被跳过 (工具目录里的 CSV 在构建期间照常写入)
+    print("\n[STEP 4] No-op update & build...")
+    if not shutil.which("git") or not shutil.which("make"):
+        print("⚠️  git / make not installed, skipped")
+    else:
+        noop_build()
+
+    print("\n" + "="*50)
+    print("🏁 BUILD CACHE TEST COMPLETE")
+    print("="*50)
+
+def noop_build():
+    git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    upstream = tempfile.mkdtemp()
+    write(upstream, "Makefile", MAKEFILE)
+    write(upstream, GEN_SCRIPT, GENERATOR)
+    write(upstream, "src/main.cpp", "int main() {}\n")
+    write(upstream, ".gitignore", "src/gen/\noutput/\ntools/\n")
+    for cmd in (["init", "-q"], ["add", "-A"], ["commit", "-q", "-m", "init"]):
+        subprocess.run(git + cmd, cwd=upstream, check=True)
+    project = os.path.join(tempfile.mkdtemp(), "TradeSystem")
+    subprocess.run(git + ["clone", "-q", upstream, project], check=True)
+
+    # 和 Windows 下一样: 本工具的工作目录位于项目根目录之内，构建期间监控一直在写 CSV
+    tools = os.path.join(project, "tools", "performance_monitor")
+    os.makedirs(tools)
+    done = threading.Event()
+    def monitor():
+        with open(os.path.join(tools, "raw_performance.csv"), 'a') as f:
+            while not done.wait(0.005):
+                f.write("sample\n")
+                f.flush()
+    writer = threading.Thread(target=monitor)
+    writer.start()
+    cwd = os.getcwd()
+    os.chdir(tools)
+    try:
+        manager = TradingManager()
+        manager.project_root, manager.python_exe = project, sys.executable
+        results = [manager.update_and_build() for _ in range(3)]
+    finally:
+        os.chdir(cwd)
+        done.set()
+        writer.join()
+    for success, msg in results:
+        assert success, msg
+    assert "generate code skipped" not in results[0][1] and "make clean skipped" not in results[0][1]
+    for success, msg in results[1:]:
+        skipped = msg.split("Skipped:")[1].split(".")[0]
+        assert "generate code" in skipped and "make clean" in skipped, msg
+    print(f"✅ {results[-1][1]}")
+
+if __name__ == "__main__":
+    test_build_cache()
@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import constants as C
+from timestamps import epoch_to_timestamp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CHECK = os.path.join(HERE, "check_regression.py")
+
+def trend_row(t, memory):
+    # timestamp, ctx_vol, ctx_invol, memory, threads, handles, pid, name
+    return f"{epoch_to_timestamp(t)},10.0,1.0,{memory:.2f},8,40,4242,leaky\n"
+
+def test_check_regression():
+    print("="*50)
+    print("🚀 STARTING LIVE REGRESSION GATE TEST")
+    print("="*50)
+
+    work_dir = tempfile.mkdtemp()
+    trend, report = os.path.join(work_dir, "trend.csv"), os.path.join(work_dir, "report.json")
+
+    # 1. 内存持续增长: 确认后终止被测进程，提前结束，并在 JSON 中记录 aborted
+    print("\n[STEP 1] Live abort on a growing trend...")
+    with open(trend, 'w', newline='') as f:
+        f.write(",".join(C.TREND_COLUMNS) + "\n")
+    done = threading.Event()
+    def monitor():
+        t0 = time.time()
+        with open(trend, 'a', newline='') as f:
+            for i in range(1000):
+                if done.wait(0.02):
+                    return
+                f.write(trend_row(t0 + i, 50 + 0.5 * i))
+                f.flush()
+    writer = threading.Thread(target=monitor)
+    writer.start()
+    victim = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    try:
+        gate = subprocess.run([sys.executable, CHECK, "--trend_csv", trend, "--live", "--abort_pid", str(victim.pid),
+                               "--json_out", report, "--timeout", "30"],
+                              cwd=HERE, capture_output=True, text=True, timeout=60)
+    finally:
+        done.set()
+        writer.join()
+        victim.kill()
+    assert gate.returncode == 1, gate.stdout
+    assert "run stopped early" in gate.stdout and "UPWARD TREND" in gate.stdout, gate.stdout
+    assert victim.wait() != 0      # 被门禁终止，而不是被上面的 kill
+    with open(report, encoding='utf-8') as f:
+        result = json.load(f)
+    assert result["aborted"] is True and result["passed"] is False
+    assert any("UPWARD TREND" in line for line in result["targets"]["leaky"]["failures"])
+    print(f"✅ aborted after {result['targets']['leaky']['metrics']['avg_memory']['points']} points")
+
+    # 2. 平稳的运行: 超时后做完整的结束检查，通过，JSON 中没有 aborted
+    print("\n[STEP 2] Live pass on a flat trend...")
+    t0 = time.time()
+    with open(trend, 'w', newline='') as f:
+        f.write(",".join(C.TREND_COLUMNS) + "\n")
+        for i in range(50):
+            f.write(trend_row(t0 + i, 50 + (i % 2) * 0.1))
+    gate = subprocess.run([sys.executable, CHECK, "--trend_csv", trend, "--live", "--json_out", report,
+                           "--timeout", "1"],
+                          cwd=HERE, capture_output=True, text=True, timeout=60)
+    assert gate.returncode == 0, gate.stdout
+    with open(report, encoding='utf-8') as f:
+        result = json.load(f)
+    assert result["passed"] is True and "aborted" not in result
+    print("✅ end-of-run check passed")
+
+    print("\n" + "="*50)
+    print("🏁 LIVE REGRESSION GATE TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_check_regression()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from csv_tail import CsvTailReader
+import constants as C
+
+def test_csv_tail():
+    print("="*50)
+    print("🚀 STARTING CSV TAIL READER TEST")
+    print("="*50)
+
+    work_dir = tempfile.mkdtemp()
+    path = os.path.join(work_dir, C.DEFAULT_RAW_FILE)
+    reader = CsvTailReader(path, C.RAW_COLUMNS, min_fields=5)
+
+    try:
+        # 1. 文件不存在时不报错
+        print("\n[STEP 1] Missing file...")
+        assert reader.poll() == []
+        print("✅ No rows from missing file.")
+
+        # 2. 只返回新增的完整行，半行保留到下次
+        print("\n[STEP 2] Incremental + partial line...")
+        with open(path, 'w', newline='') as f:
+            f.write(",".join(C.RAW_COLUMNS) + "\n")
+            f.write("2024-01-01 00:00:00,1,2,3,4,5.0\n")
+            f.write("2024-01-01 00:00:01,1,2")
+        rows = reader.poll()
+        assert [r['timestamp'] for r in rows] == ["2024-01-01 00:00:00"]
+        with open(path, 'a', newline='') as f:
+            f.write(",3,4,6.0\n")
+        rows = reader.poll()
+        assert len(rows) == 1 and rows[0]['memory_mb'] == "6.0"
+        assert reader.poll() == []
+        print(f"✅ Offset now {reader.offset} bytes.")
+
+        # 3. 轮转 (backup_and_clean 移走文件后重建) 从头开始
+        print("\n[STEP 3] Rotation...")
+        shutil.move(path, path + ".bak")
+        with open(path, 'w', newline='') as f:
+            f.write(",".join(C.RAW_COLUMNS) + "\n")
+            f.write("2024-01-02 00:00:00,1,2,3,4,7.0\n")
+        rows = reader.poll()
+        assert [r['memory_mb'] for r in rows] == ["7.0"]
+        print("✅ Rotated file re-read from the start.")
+
+        # 4. 原地截断
+        print("\n[STEP 4] Truncation...")
+        with open(path, 'w', newline='') as f:
+            f.write("2024-01-03 00:00:00,1,2,3,4,8.0\n")
+        rows = reader.poll()
+        assert [r['memory_mb'] for r in rows] == ["8.0"]
+        print("✅ Truncated file re-read from the start.")
+
+        # 5. 已存在的大文件: 第一次只读末尾 tail_rows 行，轮转后的新文件从头读
+        print("\n[STEP 5] Start near EOF...")
+        with open(path, 'w', newline='') as f:
+            f.write(",".join(C.RAW_COLUMNS) + "\n")
+            for i in range(100000):
+                f.write(f"2024-01-04 00:00:00,1,2,3,4,{i}.0\n")
+        tail = CsvTailReader(path, C.RAW_COLUMNS, min_fields=5, tail_rows=200)
+        rows = tail.poll()
+        assert [r['memory_mb'] for r in rows] == [f"{i}.0" for i in range(99800, 100000)]
+        shutil.move(path, path + ".bak2")
+        with open(path, 'w', newline='') as f:
+            f.write(",".join(C.RAW_COLUMNS) + "\n")
+            for i in range(300):
+                f.write(f"2024-01-05 00:00:00,1,2,3,4,{i}.0\n")
+        assert len(tail.poll()) == 300
+        print("✅ Existing file tailed from its last 200 rows, rotated file read whole.")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n" + "="*50)
+    print("🏁 CSV TAIL READER TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_csv_tail()
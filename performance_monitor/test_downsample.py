@@ -0,0 +1,61 @@
+import numpy as np
+import downsample
+
+def test_downsample():
+    print("="*50)
+    print("🚀 STARTING DOWNSAMPLE TEST")
+    print("="*50)
+
+    rng = np.random.default_rng(0)
+    y = rng.normal(0, 1, 10000)
+    y[1234], y[8765] = 50.0, -50.0          # 尖峰和低谷
+
+    # 1. LTTB: 恰好 n 个点，保留首尾和尖峰，索引递增
+    print("\n[STEP 1] LTTB...")
+    idx = downsample.lttb(y, 500)
+    assert len(idx) == 500 and idx[0] == 0 and idx[-1] == len(y) - 1
+    assert np.all(np.diff(idx) > 0) and 1234 in idx and 8765 in idx
+    assert list(downsample.lttb(y[:10], 500)) == list(range(10))
+    print(f"✅ 10000 -> {len(idx)} points, spike and dip kept")
+
+    # 2. min/max: 每个桶的最小值和最大值都保留
+    print("\n[STEP 2] Min/max...")
+    idx = downsample.minmax(y, 500)
+    assert len(idx) <= 502 and idx[0] == 0 and idx[-1] == len(y) - 1
+    edges = np.linspace(0, len(y), 251).astype(int)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        assert lo + np.argmin(y[lo:hi]) in idx and lo + np.argmax(y[lo:hi]) in idx
+    print(f"✅ 10000 -> {len(idx)} points, every bucket's extremes kept")
+
+    # 3. 多个指标共享时间轴: 每个指标分到一份预算，取索引并集
+    print("\n[STEP 3] Shared time axis...")
+    flat = np.zeros(10000)
+    flat[4321] = 7.0
+    idx = downsample.indices({"a": y, "b": flat}, 500, "minmax")
+    assert len(idx) <= 504 and 1234 in idx and 4321 in idx
+    try:
+        downsample.indices({"a": y}, 500, "bogus")
+        assert False, "unknown method accepted"
+    except ValueError:
+        pass
+    print(f"✅ {len(idx)} rows cover the extremes of both metrics")
+
+    # 4. 记录列表: 每个目标单独降采样，保持原顺序；不足 n 行时原样返回
+    print("\n[STEP 4] Records by target...")
+    records = [{"i": i, "name": "a" if i % 2 else "b", "v": str(i % 97)} for i in range(4000)]
+    out = downsample.downsample_records(records, ["v"], 400, "lttb")
+    positions = [r["i"] for r in out]
+    assert positions == sorted(positions)
+    counts = {name: sum(r["name"] == name for r in out) for name in "ab"}
+    assert counts["a"] == counts["b"] == 200
+    assert downsample.downsample_records(records[:300], ["v"], 400) == records[:300]
+    rows = [[str(i), str(i % 7)] for i in range(1000)]
+    assert len(downsample.downsample_records(rows, [1], 100, "lttb", group=None)) == 100
+    print(f"✅ {len(records)} records -> {len(out)} ({counts})")
+
+    print("\n" + "="*50)
+    print("🏁 DOWNSAMPLE TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_downsample()
@@ -0,0 +1,39 @@
+import os
+import tempfile
+from history import HistoryStore
+import constants as C
+
+def test_history():
+    print("="*50)
+    print("🚀 STARTING HISTORY STORE TEST")
+    print("="*50)
+
+    work_dir = tempfile.mkdtemp()
+    with open(os.path.join(work_dir, C.DEFAULT_TREND_FILE), 'w', newline='') as f:
+        f.write(",".join(C.TREND_COLUMNS) + "\n")
+        f.write("2024-01-01 00:00:00,1,2,100.0,4,5,11,a.exe\n")
+        f.write("2024-01-01 00:00:01,1,2,101.0,4,5\n")          # 截断的行 (写到一半)
+        f.write("2024-01-01 00:00:02,1,2,102.0,4,5,11,a.exe\n")
+    store = HistoryStore(work_dir)
+
+    # 1. 字段不足的行被丢弃，不会把 pid/name 当成缺失值返回
+    print("\n[STEP 1] Short rows...")
+    result = store.series(["avg_memory"], limit=10)
+    assert result["series"]["avg_memory"] == [100.0, 102.0], result
+    print(f"✅ {result['timestamps']}")
+
+    # 2. 未知指标和非数值列都报错 (/series 返回 400)
+    print("\n[STEP 2] Metric validation...")
+    for metrics in (["bogus"], ["name"], ["pid"], [""], ["avg_memory", "timestamp"]):
+        try:
+            store.series(metrics)
+            assert False, f"{metrics} accepted"
+        except ValueError as e:
+            print(f"✅ {metrics}: {str(e)[:40]}")
+
+    print("\n" + "="*50)
+    print("🏁 HISTORY STORE TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_history()
@@ -0,0 +1,66 @@
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import psutil
+import constants as C
+from memory_detail import MemoryDetail, total
+
+def test_memory_detail():
+    print("="*50)
+    print("🚀 STARTING MEMORY DETAIL TEST")
+    print("="*50)
+
+    workdir = tempfile.mkdtemp()
+    regions_csv = os.path.join(workdir, C.DEFAULT_MEMORY_REGION_FILE)
+    # 每 0.1s 泄漏 32 KB (malloc -> [heap]) 和 256 KB (malloc -> 匿名 mmap)
+    child = subprocess.Popen([sys.executable, "-c",
+                              "import time\nkeep = []\nwhile True:\n"
+                              "    keep += [bytes(32 * 1024) + b'x', bytearray(256 * 1024)]\n"
+                              "    time.sleep(0.1)\n"])
+    detail = MemoryDetail(regions_csv, interval=0.5).start()
+    try:
+        proc = psutil.Process(child.pid)
+
+        # 1. 第一次调用只登记进程，立即返回空值 (不阻塞采样)
+        print("\n[STEP 1] First lookup...")
+        started = time.perf_counter()
+        values = detail.values(proc, "leaker")
+        assert values == [""] * len(C.MEMORY_DETAIL_COLUMNS)
+        assert time.perf_counter() - started < 0.01
+        print("✅ Blank values, no read on the caller's thread.")
+
+        # 2. 后台线程填入 USS / PSS (Linux: 以及 heap / anon / file 细分)
+        print("\n[STEP 2] Background passes...")
+        for _ in range(11):     # 像采样循环一样持续取值，否则进程会被当作不再监控
+            time.sleep(0.2)
+            uss, pss, heap, anon, file = detail.values(proc, "leaker")
+        assert 0 < uss <= pss or pss == ""
+        if sys.platform.startswith("linux"):
+            assert heap > 0 and anon > 0 and file > 0
+        print(f"✅ uss={uss} pss={pss} heap={heap} anon={anon} file={file} after {detail.passes} passes")
+    finally:
+        child.kill()
+        child.wait()
+        detail.stop()
+
+    # 3. 增长被归到具体的映射区域
+    if sys.platform.startswith("linux"):
+        print("\n[STEP 3] Region growth...")
+        with open(regions_csv, newline='') as f:
+            rows = list(csv.DictReader(f))
+        kinds = {r['kind'] for r in rows if float(r['delta_mb']) > 0}
+        assert {"heap", "anon"} <= kinds, rows
+        print(f"✅ {len(rows)} region rows, growth in {sorted(kinds)}")
+
+    # 4. 进程树汇总: 空列不参与求和
+    assert total([[1.0, "", 2.0], [2.5, "", ""]]) == [3.5, "", 2.0]
+
+    print("\n" + "="*50)
+    print("🏁 MEMORY DETAIL TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_memory_detail()
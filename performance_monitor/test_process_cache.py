@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from process_cache import ProcessTable
+
+def test_process_cache():
+    print("="*50)
+    print("🚀 STARTING PROCESS TABLE TEST")
+    print("="*50)
+
+    table = ProcessTable(ttl=0.1, events=False)
+
+    # 1. 全量建表后，按名字查找当前进程
+    print("\n[STEP 1] Initial refresh...")
+    added, _ = table.refresh()
+    me = table.find(os.path.basename(sys.executable))
+    assert added > 0 and table.names()
+    assert os.getpid() in table.pids(os.path.basename(sys.executable).upper())
+    print(f"✅ {added} processes indexed, found {me.name()}")
+
+    # 2. 新启动的脚本可以按 .py 名字找到 (匹配命令行)，退出后从表中消失
+    print("\n[STEP 2] Incremental refresh...")
+    script = os.path.join(tempfile.mkdtemp(), "cache_probe.py")
+    with open(script, 'w') as f:
+        f.write("import time\ntime.sleep(30)\n")
+    child = subprocess.Popen([sys.executable, script])
+    try:
+        time.sleep(0.3)
+        added, removed = table.refresh()
+        proc = table.find("cache_probe.py")
+        assert proc is not None and proc.pid == child.pid
+        print(f"✅ +{added}/-{removed} processes, script found (PID: {proc.pid})")
+    finally:
+        child.kill()
+        child.wait()
+    table.refresh()
+    assert table.find("cache_probe.py") is None and child.pid not in table.pids(os.path.basename(sys.executable))
+    print("✅ Exited process dropped from the index.")
+
+    # 3. 后台线程保持表新鲜
+    print("\n[STEP 3] Background refresh...")
+    table.start()
+    refreshes = table.refreshes
+    time.sleep(0.35)
+    table.stop()
+    assert table.refreshes > refreshes
+    print(f"✅ {table.refreshes - refreshes} background refreshes")
+
+    # 4. wait_for: 启动器 announce 后立即返回，不等下一次刷新
+    print("\n[STEP 4] Waiting for a process to start...")
+    assert table.wait_for(["cache_probe.py"], 0.2) is None
+    child = subprocess.Popen([sys.executable, script])
+    try:
+        table.announce(child.pid)
+        started = time.monotonic()
+        assert table.wait_for(["cache_probe.py"], 5) == "cache_probe.py"
+        assert time.monotonic() - started < 0.05
+    finally:
+        child.kill()
+        child.wait()
+    print("✅ Announced process found without a refresh.")
+
+    # 4b. 目标都已找到时 (poll=False) 等待期间不刷新进程表
+    refreshes = table.refreshes
+    assert not table.wait_change(0.3, poll=False)
+    assert table.refreshes == refreshes
+    table.wait_change(0.3)
+    assert table.refreshes > refreshes
+    print("✅ No polling while every target is attached.")
+
+    # 5. 进程树: 子孙进程来自 ppid 索引
+    print("\n[STEP 5] Descendants...")
+    parent = subprocess.Popen([sys.executable, "-c",
+                               "import subprocess, sys; subprocess.run([sys.executable, '-c', 'import time; time.sleep(30)'])"])
+    below = []
+    try:
+        time.sleep(0.5)
+        table.refresh()
+        below = table.descendants(parent.pid)
+        assert len(below) == 1 and table.entry(below[0]).ppid == parent.pid
+        assert table.descendants(parent.pid, limit=0) == []
+    finally:
+        for pid in below:
+            os.kill(pid, 9)
+        parent.wait()
+    print(f"✅ PID {parent.pid} -> {below}")
+
+    print("\n" + "="*50)
+    print("🏁 PROCESS TABLE TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_process_cache()
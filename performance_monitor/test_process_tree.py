@@ -0,0 +1,99 @@
+import subprocess
+import sys
+import time
+import psutil
+from collectors import Sample
+from process_cache import ProcessTable
+from process_tree import ProcessTree, aggregate, MB
+
+CHILD = "import time; time.sleep(30)"
+PARENT = ("import subprocess, sys, time\n"
+          f"kids = [subprocess.Popen([sys.executable, '-c', {CHILD!r}]) for _ in range(2)]\n"
+          "kids[0].wait()\n"          # 回收第一个子进程，避免它退出后变成僵尸
+          "time.sleep(30)\n")
+
+class FakeCollector:
+    """每次采样 ctx 计数加 10，RSS 1 MB，2 个线程；denied 中的 pid 没有权限读取"""
+    def __init__(self):
+        self.calls = {}
+        self.denied = set()
+
+    def collect(self, process):
+        if process.pid in self.denied:
+            raise psutil.AccessDenied(process.pid)
+        n = self.calls[process.pid] = self.calls.get(process.pid, 0) + 1
+        return Sample(10 * n, 5 * n, MB, 2, 3)
+
+def test_process_tree():
+    print("="*50)
+    print("🚀 STARTING PROCESS TREE TEST")
+    print("="*50)
+
+    table = ProcessTable(events=False)
+    parent = subprocess.Popen([sys.executable, "-c", PARENT])
+    kids = []
+    try:
+        time.sleep(0.5)
+        table.refresh()
+        root = psutil.Process(parent.pid)
+        kids = table.descendants(parent.pid)
+        assert len(kids) == 2
+
+        # 1. 成员按 (pid, create_time) 记录
+        print("\n[STEP 1] Members...")
+        tree = ProcessTree(root)
+        tree.update(table, 60)
+        assert set(tree.members) == {(p, table.entry(p).create_time) for p in [parent.pid] + kids}
+        print(f"✅ {len(tree.members)} members")
+
+        # 2. 汇总: 第一次采样只建立基线，之后是 ctx 速率之和；RSS / 线程 / 句柄直接求和
+        print("\n[STEP 2] Aggregation...")
+        collector = FakeCollector()
+        vol, invol, mem, threads, handles = aggregate(tree.collect(collector))
+        assert (vol, invol, mem, threads, handles) == (0, 0, 3, 6, 9)
+        time.sleep(0.1)
+        vol, invol, mem, threads, handles = aggregate(tree.collect(collector))
+        assert 3 * 10 / 0.2 < vol < 3 * 10 / 0.09 and 0 < invol < vol and mem == 3
+        print(f"✅ vol={vol:.1f}/s invol={invol:.1f}/s mem={mem} MB threads={threads}")
+
+        # 3. 没有权限的子进程被跳过，不再重试
+        print("\n[STEP 3] Access denied...")
+        collector.denied.add(kids[0])
+        assert len(tree.collect(collector)) == 2
+        tree.update(table, 60)
+        assert len(tree.members) == 2 and len(tree.denied) == 1
+        print(f"✅ denied {tree.denied}")
+
+        # 4. 该进程退出后从 denied 中清除
+        print("\n[STEP 4] Denied set pruned...")
+        psutil.Process(kids[0]).kill()
+        deadline = time.monotonic() + 5
+        while psutil.pid_exists(kids[0]) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        table.refresh()
+        tree.update(table, 60)
+        assert tree.denied == set() and len(tree.members) == 2
+        print("✅ exited process forgotten")
+
+        # 5. 根进程没有权限读取时异常向上抛出
+        collector.denied.add(parent.pid)
+        try:
+            tree.collect(collector)
+            assert False, "root error swallowed"
+        except psutil.AccessDenied:
+            pass
+    finally:
+        for pid in kids:
+            try:
+                psutil.Process(pid).kill()
+            except psutil.NoSuchProcess:
+                pass
+        parent.kill()
+        parent.wait()
+
+    print("\n" + "="*50)
+    print("🏁 PROCESS TREE TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_process_tree()
@@ -0,0 +1,68 @@
+import csv
+import os
+import tempfile
+from rollup import RollupEngine, rollup_file, ROLLUP_METRICS
+from timestamps import epoch_to_timestamp
+
+T0 = 1_700_000_040          # 10 和 60 的整数倍: 对齐的桶边界
+
+def sample(memory):
+    record = {m: 1.0 for m in ROLLUP_METRICS}
+    record["memory_mb"] = memory
+    return record
+
+def test_rollup():
+    print("="*50)
+    print("🚀 STARTING ROLLUP ENGINE TEST")
+    print("="*50)
+
+    work_dir = tempfile.mkdtemp()
+    engine = RollupEngine(resolutions=[10, 60]).add_csv_sinks(work_dir)
+
+    # 1. 桶边界: [T0, T0+10) 是一个桶，T0+10 开始下一个桶
+    print("\n[STEP 1] Bucket boundaries...")
+    for offset, memory in [(0, 10.0), (3.5, 30.0), (9.999, 20.0), (10, 50.0), (15, 70.0)]:
+        engine.add(T0 + offset, 1, "svc", sample(memory))
+    closed = engine.query(10)
+    assert len(closed) == 1
+    row = closed[0]
+    assert row["timestamp"] == epoch_to_timestamp(T0) and row["count"] == 3
+    assert (row["memory_mb_min"], row["memory_mb_max"], row["memory_mb_mean"], row["memory_mb_last"]) == \
+        (10.0, 30.0, 20.0, 20.0)
+    assert engine.query(60) == []            # 60s 的桶还没结束
+    print(f"✅ [{row['timestamp']}, +10s): count={row['count']} min/max/mean/last = 10/30/20/20")
+
+    # 2. 未结束的桶可以一起查询；不同目标各自成桶
+    print("\n[STEP 2] Open buckets & targets...")
+    engine.add(T0 + 12, 2, "other", sample(5.0))
+    current = engine.query(10, include_open=True)
+    assert [(r["name"], r["count"]) for r in current] == [("svc", 3), ("svc", 2), ("other", 1)]
+    assert engine.query(10, since=epoch_to_timestamp(T0 + 10), include_open=True)[0]["count"] == 2
+    print(f"✅ {len(current)} buckets including the open ones")
+
+    # 3. 跳过空桶: 下一个样本在几个周期之后，只输出有数据的桶
+    print("\n[STEP 3] Gap...")
+    engine.add(T0 + 65, 1, "svc", sample(90.0))
+    assert [r["timestamp"] for r in engine.query(10)] == [epoch_to_timestamp(T0), epoch_to_timestamp(T0 + 10)]
+    sixty = engine.query(60)
+    assert len(sixty) == 1 and sixty[0]["count"] == 5 and sixty[0]["memory_mb_mean"] == 36.0
+    print("✅ empty buckets are not written")
+
+    # 4. close 输出剩余的桶并写入 CSV
+    print("\n[STEP 4] Close...")
+    engine.close()
+    with open(os.path.join(work_dir, rollup_file(60)), newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert sorted((r["timestamp"], r["name"], r["count"]) for r in rows) == [
+        (epoch_to_timestamp(T0), "other", "1"), (epoch_to_timestamp(T0), "svc", "5"),
+        (epoch_to_timestamp(T0 + 60), "svc", "1")]
+    with open(os.path.join(work_dir, rollup_file(10)), newline='') as f:
+        assert len(list(csv.DictReader(f))) == 4
+    print(f"✅ {len(rows)} rows in {rollup_file(60)}")
+
+    print("\n" + "="*50)
+    print("🏁 ROLLUP ENGINE TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_rollup()
@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RUN_MONITOR = os.path.join(HERE, "run_monitor.py")
+
+def count_rows(path):
+    with open(path) as f:
+        return sum(1 for _ in f) - 1
+
+def test_run_monitor():
+    print("="*50)
+    print("🚀 STARTING RUN MONITOR TEST")
+    print("="*50)
+
+    work_dir = tempfile.mkdtemp()
+    raw, trend = os.path.join(work_dir, "raw.csv"), os.path.join(work_dir, "trend.csv")
+
+    # 1. 停止文件: 出现后监控自己退出，缓冲的行全部写入 (Windows 下 MonitorManager.stop() 的方式)
+    print("\n[STEP 1] Stop file...")
+    stop_file = os.path.join(work_dir, "monitor.stop")
+    target = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    monitor = subprocess.Popen([sys.executable, RUN_MONITOR, "--pid", str(target.pid), "--interval", "0.1",
+                                "--raw", raw, "--trend", trend, "--stop_file", stop_file],
+                               cwd=HERE, stdout=subprocess.DEVNULL)
+    try:
+        time.sleep(1.5)
+        open(stop_file, 'w').close()
+        started = time.monotonic()
+        assert monitor.wait(timeout=5) == 0
+        assert time.monotonic() - started < 1.0
+        assert target.poll() is None      # 只停止监控，不影响按 PID 跟踪的目标
+        assert count_rows(raw) >= 5
+        print(f"✅ Exited in {time.monotonic() - started:.2f}s with {count_rows(raw)} raw rows")
+    finally:
+        monitor.kill()
+        target.kill()
+        target.wait()
+
+    # 2. 启动模式: 监控以子进程的退出码退出，并写入 launch_info.json
+    print("\n[STEP 2] Launch mode exit code...")
+    info = os.path.join(work_dir, "launch_info.json")
+    for code in (0, 3):
+        os.remove(raw)
+        monitor = subprocess.run([sys.executable, RUN_MONITOR, "--interval", "0.1", "--raw", raw, "--trend", trend,
+                                  "--", sys.executable, "-c", f"import sys, time; time.sleep(0.5); sys.exit({code})"],
+                                 cwd=HERE, stdout=subprocess.DEVNULL, timeout=30)
+        assert monitor.returncode == code
+        with open(info, encoding='utf-8') as f:
+            launch = json.load(f)
+        assert launch["exit_code"] == code and launch["command"][0] == sys.executable
+        assert 0.5 <= launch["lifetime"] < 5
+        assert count_rows(raw) >= 2      # 从启动开始就在采样
+        print(f"✅ exit {code}: {launch}")
+
+    # 3. 子进程被信号杀死: 按 shell 习惯返回 128 + 信号
+    if os.name != 'nt':
+        print("\n[STEP 3] Launch mode signal exit...")
+        monitor = subprocess.run([sys.executable, RUN_MONITOR, "--interval", "0.1", "--raw", raw, "--trend", trend,
+                                  "--", sys.executable, "-c", "import os, signal; os.kill(os.getpid(), signal.SIGKILL)"],
+                                 cwd=HERE, stdout=subprocess.DEVNULL, timeout=30)
+        with open(info, encoding='utf-8') as f:
+            launch = json.load(f)
+        assert monitor.returncode == 128 + 9 and launch["exit_code"] == -9
+        print(f"✅ killed child -> exit {monitor.returncode}")
+
+    print("\n" + "="*50)
+    print("🏁 RUN MONITOR TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_run_monitor()
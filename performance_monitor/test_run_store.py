@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import tempfile
+import analysis
+import constants as C
+import run_store
+from timestamps import epoch_to_timestamp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CHECK = os.path.join(HERE, "check_regression.py")
+
+def write_run(path, start, memory, points=60):
+    with open(path, 'w', newline='') as f:
+        f.write(",".join(C.TREND_COLUMNS) + "\n")
+        for i in range(points):
+            f.write(f"{epoch_to_timestamp(start + i)},10.0,1.0,{memory + (i % 2) * 0.1:.2f},8,40,4242,svc\n")
+
+def test_run_store():
+    print("="*50)
+    print("🚀 STARTING RUN STORE BASELINE TEST")
+    print("="*50)
+
+    work_dir = tempfile.mkdtemp()
+    store_dir = os.path.join(work_dir, "backups")
+    store = run_store.RunStore(store_dir)
+
+    # 三次通过的历史运行 (内存约 100 MB)
+    for k in range(3):
+        path = os.path.join(work_dir, f"run{k}.csv")
+        write_run(path, 1_700_000_000 + k * 1000, 100)
+        assert store.register(path, passed=True)["passed"]
+    # 当前运行 (内存约 150 MB)，之前已被 --record 为通过
+    current = os.path.join(work_dir, "trend.csv")
+    write_run(current, 1_700_010_000, 150)
+    store.register(current, passed=True)
+
+    # 1. 基线按 id 排除当前运行
+    print("\n[STEP 1] Baseline excludes the current run...")
+    current_id = run_store.file_run_id(current)
+    assert current_id == epoch_to_timestamp(1_700_010_000)
+    baseline, runs = store.baseline("svc", exclude_id=current_id)
+    assert runs == 3 and abs(baseline["avg_memory"]["mean"] - 100.05) < 0.01
+    assert store.baseline("svc")[1] == 4
+    print(f"✅ {runs} runs, memory mean {baseline['avg_memory']['mean']:.2f} MB")
+
+    # 2. compare 报告 +50% 的回归 (当前运行不会把自己的中位数拉高)
+    print("\n[STEP 2] Compare...")
+    cols = analysis.split_by_target(analysis.load_trend(current))["svc"]
+    summary = run_store.summarize(analysis.analyze(cols))
+    info, failures = run_store.compare(summary, baseline, runs)
+    assert any("memory mean" in line for line in failures), failures
+    print(f"✅ regression: {failures[0].split('BASELINE')[1].strip()}")
+
+    # 3. check_regression --compare --record: 失败，并把当前运行重新记录为未通过
+    print("\n[STEP 3] check_regression --compare --record...")
+    gate = subprocess.run([sys.executable, CHECK, "--trend_csv", current, "--compare", "--record",
+                           "--store", store_dir],
+                          cwd=HERE, capture_output=True, text=True, timeout=60)
+    assert gate.returncode == 1 and "BASELINE" in gate.stdout and "median of 3 runs" in gate.stdout, gate.stdout
+    entry = next(r for r in store.load() if r["id"] == current_id)
+    assert entry["passed"] is False and entry["checked_by"] == "check_regression"
+    assert store.baseline("svc")[1] == 3
+    print("✅ regression reported against 3 runs, current run recorded as failed")
+
+    print("\n" + "="*50)
+    print("🏁 RUN STORE BASELINE TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_run_store()
@@ -0,0 +1,55 @@
+import os
+import csv
+import shutil
+import tempfile
+import sample_store
+import constants as C
+
+def test_sample_store():
+    print("="*50)
+    print("🚀 STARTING SAMPLE STORE TEST")
+    print("="*50)
+
+    work_dir = tempfile.mkdtemp()
+    csv_path = os.path.join(work_dir, C.DEFAULT_TREND_FILE)
+    bin_path = os.path.join(work_dir, "trend_performance.bin")
+    back_path = os.path.join(work_dir, "back.csv")
+
+    rows = [
+        ["2024-01-01 00:00:00.250", 1.5, 2.0, 10.25, 4, 7, 100, "trading_system"],
+        ["2024-01-01 00:00:03.500", 1.0, 3.0, 11.5,  5, 8, 200, "MarketFetch.py"],
+        ["2024-01-01 00:00:06.750", 2.0, 4.0, 12.75, 6, 9, 100, "trading_system"],
+    ]
+
+    try:
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(C.TREND_COLUMNS)
+            writer.writerows(rows)
+
+        # 1. CSV -> binary, 再映射为 NumPy 数组
+        print("\n[STEP 1] CSV -> binary...")
+        assert sample_store.csv_to_bin(csv_path, bin_path) == 3
+        data = sample_store.load(bin_path)
+        assert list(data.dtype.names) == C.TREND_COLUMNS
+        assert list(data['avg_memory']) == [10.25, 11.5, 12.75]
+        assert sample_store.load_names(bin_path) == ["trading_system", "MarketFetch.py"]
+        print(f"✅ {len(data)} records, {data.dtype.itemsize} bytes each.")
+
+        # 2. binary -> CSV 往返
+        print("\n[STEP 2] binary -> CSV...")
+        sample_store.bin_to_csv(bin_path, back_path)
+        with open(back_path, newline='') as f:
+            back = list(csv.DictReader(f))
+        assert [r['timestamp'] for r in back] == [r[0] for r in rows]
+        assert [r['name'] for r in back] == [r[7] for r in rows]
+        print("✅ Round trip preserved timestamps and names.")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n" + "="*50)
+    print("🏁 SAMPLE STORE TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_sample_store()
@@ -0,0 +1,58 @@
+import scheduler
+import constants as C
+from scheduler import DeadlineScheduler
+
+class FakeClock:
+    """代替 time 模块: monotonic() 只在测试推进时变化"""
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+def test_scheduler():
+    print("="*50)
+    print("🚀 STARTING DEADLINE SCHEDULER TEST")
+    print("="*50)
+
+    real_time, clock = scheduler.time, FakeClock()
+    scheduler.time = clock
+    try:
+        # 1. 截止时间是 start + k * interval，不随每次工作的耗时漂移
+        print("\n[STEP 1] Drift-free deadlines...")
+        s = DeadlineScheduler(1.0)
+        delay = s.next_delay()
+        assert delay == 1.0
+        for work in (0.2, 0.7, 0.0, 0.95):
+            clock.now += delay + work          # 睡到截止时间，再采样 work 秒
+            delay = s.next_delay()
+            assert abs(delay - (1.0 - work)) < 1e-9
+        assert s.missed == 0
+        print(f"✅ deadlines stay on the {s.interval}s grid")
+
+        # 2. 超时: 跳过的 tick 计入 missed，下一个截止时间仍在网格上
+        print("\n[STEP 2] Missed ticks...")
+        due = s._next
+        clock.now = due + 2.5                  # 工作耗时 2.5 个周期: due+1、due+2 两个 tick 错过
+        delay = s.next_delay()
+        assert s.missed == 2 and abs(delay - 0.5) < 1e-9 and abs(s._next - (due + 3)) < 1e-9
+        clock.now = s._next + 1.0              # 正好落在下一个截止时间上: 不算错过
+        assert s.next_delay() == 0 and s.missed == 2
+        print(f"✅ {s.missed} missed ticks counted")
+
+        # 3. reset 从当前时间重新开始；间隔不小于 MIN_INTERVAL
+        print("\n[STEP 3] Reset & minimum interval...")
+        clock.now += 50
+        s.reset()
+        assert s.next_delay() == 1.0 and s.missed == 2
+        assert DeadlineScheduler(0).interval == C.MIN_INTERVAL
+        print("✅ schedule restarted without counting the pause as missed")
+    finally:
+        scheduler.time = real_time
+
+    print("\n" + "="*50)
+    print("🏁 DEADLINE SCHEDULER TEST COMPLETE")
+    print("="*50)
+
+if __name__ == "__main__":
+    test_scheduler()
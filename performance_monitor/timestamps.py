@@ -0,0 +1,20 @@
+from datetime import datetime
+import constants as C
+
+# 旧版本 CSV 的时间戳没有毫秒
+_LEGACY_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def format_timestamp(dt=None):
+    """Millisecond-resolution timestamp used in every CSV row."""
+    return (dt or datetime.now()).strftime(C.TIMESTAMP_FORMAT)[:-3]
+
+
+def parse_timestamp(text):
+    """CSV timestamp (with or without milliseconds) -> POSIX seconds."""
+    fmt = C.TIMESTAMP_FORMAT if '.' in text else _LEGACY_FORMAT
+    return datetime.strptime(text.strip(), fmt).timestamp()
+
+
+def epoch_to_timestamp(seconds):
+    return format_timestamp(datetime.fromtimestamp(seconds))